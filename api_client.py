@@ -1,94 +1,288 @@
-﻿import krakenex
-import logging
+﻿import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
+from asset_pairs import AssetPairs
+from kraken_common import order_fields, pair_altname, parse_balance, ticker_prices
+from metrics import REGISTRY, MetricsRegistry, timed
+from models.trade_ledger import TradeHistorySync, TradeLedger
+from order_book import OrderBook
+from rate_limiter import RateLimitScheduler, RateLimitBudgetExceeded, PRIORITY_ORDER, PRIORITY_REFRESH
+from resilience import ResilientCaller
+
+logger = logging.getLogger(__name__)
+
+# Kraken nimmt höchstens so viele Orders in einem AddOrderBatch-Aufruf an
+MAX_BATCH_ORDERS = 15
 
 class KrakenAPIClient:
-    def __init__(self, api_key: str, api_secret: str):
+    def __init__(self, api_key: str, api_secret: str, ledger: Optional[TradeLedger] = None,
+                 scheduler: Optional[RateLimitScheduler] = None, asset_pairs: Optional[AssetPairs] = None,
+                 metrics: Optional[MetricsRegistry] = None, resilience: Optional[ResilientCaller] = None):
         """
         Initialisiert den Kraken API-Client mit den angegebenen API-Schlüsseln.
 
         :param api_key: Der API-Schlüssel für die Kraken API.
         :param api_secret: Das API-Geheimnis für die Kraken API.
+        :param ledger: Das lokale Handelsjournal. Standardmäßig wird 'trades.db' verwendet.
+        :param scheduler: Der Scheduler für das Kraken-Aufrufbudget. Standardmäßig für die Stufe 'starter'.
+        :param asset_pairs: Der Cache der Paar-/Asset-Metadaten. Standardmäßig 'asset_pairs.json'.
+        :param metrics: Die Registry für Latenzen und Fehler je Endpunkt. Standardmäßig metrics.REGISTRY.
+        :param resilience: Fristen, Wiederholungen und Schutzschalter der Aufrufe. Standardmäßig ResilientCaller().
+        """
+        self._api_key, self._api_secret = api_key, api_secret
+        self._api = None  # krakenex wird erst bei der ersten Anfrage geladen (schnellerer Start)
+        self._api_lock = threading.Lock()
+        self.ledger = ledger if ledger is not None else TradeLedger()
+        self.scheduler = scheduler if scheduler is not None else RateLimitScheduler()
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self.resilience = resilience if resilience is not None else ResilientCaller()
+        self.asset_pairs = asset_pairs if asset_pairs is not None else AssetPairs(self._query_public)
+        self.order_books = None  # Optional ein OrderBookStream mit den lokalen Orderbüchern
+        logger.info("Connected to Kraken API.")
+
+    @property
+    def api(self):
+        """
+        Das krakenex-Backend; wird beim ersten Zugriff erstellt.
+        """
+        if self._api is None:
+            with self._api_lock:
+                if self._api is None:
+                    from kraken_transport import ThreadSafeKrakenAPI
+                    self._api = ThreadSafeKrakenAPI(key=self._api_key, secret=self._api_secret)
+        return self._api
+
+    @api.setter
+    def api(self, api):
+        self._api = api
+
+    def _query_public(self, method: str, data: Optional[Dict] = None, priority: int = PRIORITY_REFRESH,
+                      allow_stale: bool = True) -> Dict:
+        """
+        Führt eine öffentliche Anfrage über den Rate-Limit-Scheduler aus.
+        """
+        return self._call(method, lambda timeout: self.api.query_public(method, data, timeout=timeout), data, priority,
+                          public=True, allow_stale=allow_stale)
+
+    def _query_private(self, method: str, data: Optional[Dict] = None, priority: int = PRIORITY_REFRESH,
+                       allow_stale: bool = True) -> Dict:
+        """
+        Führt eine private Anfrage über den Rate-Limit-Scheduler aus.
+        """
+        return self._call(method, lambda timeout: self.api.query_private(method, data, timeout=timeout), data, priority,
+                          allow_stale=allow_stale)
+
+    def _call(self, method: str, request, data: Optional[Dict], priority: int, public: bool = False,
+              allow_stale: bool = True) -> Dict:
+        """
+        Führt eine Anfrage über den Schutzschalter und den Scheduler aus (mit Frist und, bei öffentlichen Endpunkten,
+        Wiederholungen) und erfasst Latenz, Fehler und Rate-Limit-Ablehnungen.
+
+        :param request: Führt die Anfrage mit dem angegebenen Timeout (Sekunden) aus.
+        :param allow_stale: False, damit bei offenem Schutzschalter keine zwischengespeicherte Antwort geliefert wird.
+        """
+        cached = self.resilience.guard(method, data, public, allow_stale)
+        if cached is not None:
+            return cached
+        attempt = lambda timeout: self.metrics.timed_call(method, lambda: request(timeout))
+        # Jede Wiederholung und jeder Hedge-Versuch holt sich erneut Budget beim Scheduler
+        before_retry = lambda: self.scheduler.acquire(method, priority, public)
+        run = lambda: self.resilience.run(method, attempt, data, public, before_retry, allow_stale)
+        # Aufrufe ohne zwischengespeicherte Antworten nicht mit solchen zusammenfassen, die sie erlauben
+        coalesce_params = data if allow_stale else dict(data or {}, _fresh=True)
+        try:
+            return self.scheduler.call(method, run, coalesce_params, priority, public=public)
+        except RateLimitBudgetExceeded:
+            self.resilience.breaker(method).release_trial()
+            self.metrics.count_rate_limited(method)
+            raise
+
+    def _altname(self, pair: str) -> str:
+        """
+        Gibt den Kurznamen eines Paares aus den AssetPairs-Metadaten zurück (z. B. 'XXBTZEUR' -> 'XBTEUR');
+        nur ohne Metadaten oder für dort unbekannte Paare wird die X/Z-Heuristik verwendet.
         """
-        self.api = krakenex.API(key=api_key, secret=api_secret)
-        logging.info("Connected to Kraken API.")
+        return pair_altname(self.asset_pairs, pair)
 
-    def check_balance(self, favorites: List[str]) -> Dict[str, float]:
+    @timed('check_balance')
+    def check_balance(self, favorites: List[str], fresh: bool = False) -> Dict[str, float]:
         """
         Ruft den Kontostand für die angegebenen Favoriten-Paare ab.
 
         :param favorites: Eine Liste von Favoriten-Paaren (z. B. ['ADAEUR', 'CQTEUR']).
+        :param fresh: True für die Orderplanung: keine zwischengespeicherte Antwort, Fehler werden weitergereicht.
         :return: Ein Dictionary mit den verfügbaren Beträgen für die Favoriten-Paare.
         """
         try:
-            logging.info("Fetching balance...")
-            balance = self.api.query_private('Balance')
-            logging.info(f"Balance response: {balance}")
+            logger.info("Fetching balance...")
+            balance = self._query_private('Balance', allow_stale=not fresh)
+            logger.debug("Balance response: %s", balance)
             if 'result' in balance:
-                valid_balance = {}
-                for asset, amount in balance['result'].items():
-                    pair = f"{asset}EUR"
-                    if pair in favorites:
-                        try:
-                            amount_float = float(amount)
-                            if amount_float >= 0.0001:
-                                valid_balance[asset] = amount_float
-                        except ValueError:
-                            logging.warning(f"Invalid value for {asset}: {amount}")
-                logging.info(f"Valid balance: {valid_balance}")
+                valid_balance = parse_balance(balance['result'], favorites, self.asset_pairs, self.asset_pairs.ensure_loaded())
+                logger.info("Valid balance: %s", valid_balance)
                 return valid_balance
             else:
-                logging.error(f"Error fetching balance: {balance}")
+                logger.error("Error fetching balance: %s", balance)
+                if fresh:
+                    raise Exception(f"Balance request failed: {balance.get('error')}")
         except Exception as e:
-            logging.error(f"Error fetching balance: {e}")
+            logger.error("Error fetching balance: %s", e)
+            if fresh:
+                raise
         return {}
 
-    def get_market_price(self, pair: str) -> Optional[float]:
+    def get_cash_balance(self, currency: str = "EUR", fresh: bool = False) -> float:
+        """
+        Ruft das Guthaben einer Fiat-Währung ab (Kraken führt EUR als 'ZEUR').
+
+        :param currency: Die Währung (z. B. 'EUR').
+        :param fresh: True für die Orderplanung: keine zwischengespeicherte Antwort, Fehler werden weitergereicht.
+        :return: Das Guthaben oder 0.0, falls es nicht abgefragt werden konnte.
+        """
+        try:
+            balance = self._query_private('Balance', allow_stale=not fresh)
+            if balance.get('error'):
+                logger.error("Error fetching balance: %s", balance['error'])
+                if fresh:
+                    raise Exception(f"Balance request failed: {balance['error']}")
+                return 0.0
+            result = balance['result']
+            return float(result.get(f"Z{currency}", result.get(currency, 0.0)))
+        except Exception as e:
+            logger.error("Error fetching %s balance: %s", currency, e)
+            if fresh:
+                raise
+        return 0.0
+
+    def get_market_price(self, pair: str, fresh: bool = False) -> Optional[float]:
         """
         Ruft den aktuellen Marktpreis für ein bestimmtes Paar ab.
 
         :param pair: Das HandelsPaar (z. B. 'CQTEUR').
+        :param fresh: True für die Orderplanung: keine zwischengespeicherte Antwort, Netzwerkfehler werden weitergereicht.
         :return: Der aktuelle Marktpreis oder None, falls ein Fehler auftritt.
         """
         try:
-            response = self.api.query_public('Ticker', {'pair': pair.replace("/", "")})
+            response = self._query_public('Ticker', {'pair': pair.replace("/", "")}, allow_stale=not fresh)
             if response['error']:
                 return None
             ticker_info = list(response['result'].values())[0]
             market_price = float(ticker_info['c'][0])
             return market_price
         except Exception as e:
-            logging.error(f"Error fetching market price for {pair}: {e}")
+            logger.error("Error fetching market price for %s: %s", pair, e)
+            if fresh:
+                raise
         return None
 
-    def get_buy_price(self, pair: str) -> Optional[float]:
+    def get_market_prices(self, pairs: List[str], fresh: bool = False) -> Dict[str, float]:
+        """
+        Ruft die aktuellen Marktpreise für mehrere Paare mit einer einzigen Ticker-Anfrage ab.
+
+        Kraken liefert die Ergebnisse unter den kanonischen Paarnamen (z. B. 'XXBTZEUR' für 'XBTEUR'),
+        diese werden wieder auf die übergebenen Paarnamen abgebildet.
+
+        :param pairs: Eine Liste von HandelsPaaren (z. B. ['ADAEUR', 'CQTEUR']).
+        :param fresh: True für die Orderplanung: keine zwischengespeicherte Antwort, Netzwerkfehler werden weitergereicht.
+        :return: Ein Dictionary mit den Marktpreisen je Paar. Paare ohne Preis fehlen im Ergebnis.
+        """
+        requested = {pair: pair.replace("/", "") for pair in dict.fromkeys(pairs)}
+        if not requested:
+            return {}
+        try:
+            response = self._query_public('Ticker', {'pair': ",".join(requested.values())}, allow_stale=not fresh)
+            if response['error']:
+                # Ein unbekanntes Paar lässt die gesamte Anfrage scheitern, daher einzeln nachfragen
+                logger.warning("Batched ticker request failed (%s), falling back to single requests.", response['error'])
+                prices = {}
+                for pair in requested:
+                    market_price = self.get_market_price(pair, fresh)
+                    if market_price is not None:
+                        prices[pair] = market_price
+                return prices
+            return ticker_prices(requested, response['result'], self._altname)
+        except Exception as e:
+            logger.error("Error fetching market prices for %s: %s", ', '.join(requested), e)
+            if fresh:
+                raise
+        return {}
+
+    def sync_trades(self) -> int:
+        """
+        Gleicht das lokale Handelsjournal inkrementell mit der Handelshistorie ab.
+
+        Es werden nur Trades ab dem letzten vollständigen Abgleich abgefragt; mehrere Seiten
+        werden über den 'ofs'-Parameter nachgeladen (siehe TradeHistorySync).
+
+        :return: Die Anzahl neu gespeicherter Trades.
+        """
+        sync = TradeHistorySync(self.ledger, self._altname)
+        try:
+            while (params := sync.next_request()) is not None:
+                sync.handle(self._query_private('TradesHistory', params))
+        except Exception as e:
+            logger.error("Error syncing trades history: %s", e)
+        if sync.added:
+            logger.info("Stored %s new trades in the ledger.", sync.added)
+        return sync.added
+
+    def get_buy_price(self, pair: str, fallback_price: Optional[float] = None) -> Optional[float]:
         """
-        Ruft den Kaufpreis für ein bestimmtes Paar aus der Handelshistorie ab.
+        Ermittelt den Kaufpreis für ein bestimmtes Paar aus dem lokalen Handelsjournal.
+
+        Das Journal wird über sync_trades() aktuell gehalten; die Abfrage selbst benötigt keine Netzwerkanfrage.
 
         :param pair: Das HandelsPaar (z. B. 'CQTEUR').
+        :param fallback_price: Preis, der verwendet wird, falls kein Kauf gefunden wird. Ohne Angabe wird der Marktpreis abgefragt.
         :return: Der Kaufpreis oder None, falls kein Kauf gefunden wird.
         """
         try:
-            logging.info(f"Fetching order history for {pair}...")
-            response = self.api.query_private('TradesHistory', {'pair': pair.replace("/", "")})
-            if 'error' in response and response['error']:
-                logging.error(f"Error fetching order history: {response['error']}")
-                return None
-            trades = response.get('result', {}).get('trades', {})
-            if not trades:
-                logging.warning(f"No trades found for {pair}.")
-                return self.get_market_price(pair)  # Fallback to market price
-            buy_price = None
-            for trade_id, trade_data in trades.items():
-                if trade_data['type'] == 'buy' and trade_data['pair'] == pair:
-                    buy_price = float(trade_data['price'])
-                    break
+            buy_price = self.ledger.get_last_buy_price(pair.replace("/", ""))
             if buy_price is None:
-                logging.warning(f"No buy price found for {pair}.")
+                logger.warning("No buy price found for %s.", pair)
+                if fallback_price is not None:
+                    return fallback_price
                 return self.get_market_price(pair)  # Fallback to market price
             return buy_price
         except Exception as e:
-            logging.error(f"Error fetching buy price for {pair}: {e}")
+            logger.error("Error fetching buy price for %s: %s", pair, e)
+        return None
+
+    def get_order_book(self, pair: str, count: int = 100):
+        """
+        Ruft einen Snapshot des Orderbuchs über die REST-Depth-Abfrage ab.
+
+        :param pair: Das HandelsPaar (z. B. 'CQTEUR').
+        :param count: Die Anzahl Preisniveaus je Seite.
+        :return: Ein Tupel (asks, bids) mit Preisniveaus [Preis, Volumen, Zeitstempel].
+        """
+        response = self._query_public('Depth', {'pair': pair.replace("/", ""), 'count': count})
+        if response['error']:
+            raise Exception(f"Depth request failed: {response['error']}")
+        book = next(iter(response['result'].values()))
+        return book['asks'], book['bids']
+
+    def estimate_fill(self, pair: str, volume: float, side: str = 'buy') -> Optional[Dict]:
+        """
+        Schätzt den durchschnittlichen Ausführungspreis und die Slippage einer Market-Order.
+
+        Verwendet das lokale Orderbuch aus dem Stream, sofern vorhanden und gültig, sonst einen REST-Snapshot.
+
+        :param pair: Das HandelsPaar (z. B. 'CQTEUR').
+        :param volume: Das Handelsvolumen.
+        :param side: Die Handelsseite ('buy' oder 'sell').
+        :return: Das Ergebnis von OrderBook.estimate_fill oder None, falls ein Fehler auftritt.
+        """
+        try:
+            book = self.order_books.get_book(pair) if self.order_books is not None else None
+            if book is None:
+                asks, bids = self.get_order_book(pair)
+                book = OrderBook(depth=len(asks) + len(bids))
+                book.apply_snapshot(asks, bids)
+            return book.estimate_fill(side, volume)
+        except Exception as e:
+            logger.error("Error estimating fill for %s: %s", pair, e)
         return None
 
     def execute_trade(self, pair: str, volume: float, side: str = 'buy') -> Optional[Dict]:
@@ -101,19 +295,94 @@ class KrakenAPIClient:
         :return: Das Ergebnis des Trades oder None, falls ein Fehler auftritt.
         """
         try:
-            response = self.api.query_private('AddOrder', {
-                'pair': pair,
-                'type': side,
-                'ordertype': 'market',
-                'volume': str(volume)
-            })
+            response = self._query_private('AddOrder', dict(self._order_fields({'pair': pair, 'side': side, 'volume': volume}), pair=pair),
+                                           priority=PRIORITY_ORDER)
             if 'result' in response:
-                logging.info(f"Trade executed: {response['result']}")
+                logger.info("Trade executed: %s", response['result'])
                 return response['result']
             else:
                 error_message = response.get('error', 'Unknown error')
-                logging.error(f"Error executing trade: {error_message}")
+                logger.error("Error executing trade: %s", error_message)
                 raise Exception(f"Trade execution failed: {error_message}")
         except Exception as e:
-            logging.error(f"Error executing trade: {e}")
-            raise
\ No newline at end of file
+            logger.error("Error executing trade: %s", e)
+            raise
+
+    def execute_trades(self, orders: List[Dict], max_workers: int = 4) -> List[Dict]:
+        """
+        Führt mehrere Orders mit möglichst wenigen Roundtrips aus.
+
+        Mehrere Orders desselben Paares werden per AddOrderBatch (bis zu 15 je Aufruf) gesendet, alle
+        übrigen als einzelne AddOrder-Aufrufe. Die Paare laufen parallel über einen kleinen Thread-Pool
+        (Wartezeiten auf das Aufrufbudget überlappen); ThreadSafeKrakenAPI vergibt die Nonces threadsicher
+        und sendet private Anfragen in Nonce-Reihenfolge.
+
+        :param orders: Die Orders als Dictionaries mit 'pair', 'volume', 'side' und optional 'ordertype' und 'price'.
+        :param max_workers: Die maximale Anzahl gleichzeitig bearbeiteter Paare.
+        :return: Ein Ergebnis je Order in der Reihenfolge der Eingabe: das Order-Dictionary ergänzt um
+                 'ok', 'txid' und 'error'.
+        """
+        groups: Dict[str, List[int]] = {}
+        for index, order in enumerate(orders):
+            groups.setdefault(order['pair'], []).append(index)
+        if not groups:
+            return []
+        results: List[Optional[Dict]] = [None] * len(orders)
+
+        def submit_group(indices: List[int]) -> int:
+            # Mehr als 15 Orders eines Paares: die Stapel dieses Paares nacheinander senden
+            requests = 0
+            for start in range(0, len(indices), MAX_BATCH_ORDERS):
+                chunk = indices[start:start + MAX_BATCH_ORDERS]
+                for index, leg in zip(chunk, self._submit_chunk([orders[index] for index in chunk])):
+                    results[index] = leg
+                requests += 1
+            return requests
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(groups)), thread_name_prefix="orders") as executor:
+            requests = sum(executor.map(submit_group, groups.values()))
+        failed = sum(1 for leg in results if not leg['ok'])
+        logger.info("Batch execution finished: %s of %s orders placed in %s requests.", len(orders) - failed, len(orders), requests)
+        return results
+
+    def _order_fields(self, order: Dict) -> Dict:
+        """
+        Erzeugt die AddOrder-Felder einer Order (siehe kraken_common.order_fields).
+        """
+        return order_fields(self.asset_pairs, order)
+
+    def _submit_chunk(self, orders: List[Dict]) -> List[Dict]:
+        """
+        Sendet Orders desselben Paares als einen AddOrderBatch-Aufruf (bzw. eine einzelne Order per AddOrder).
+        """
+        if len(orders) == 1:
+            return [self._submit_single(orders[0])]
+        data = {'pair': orders[0]['pair']}
+        try:
+            for position, order in enumerate(orders):
+                for field, value in self._order_fields(order).items():
+                    data[f"orders[{position}][{field}]"] = value
+            response = self._query_private('AddOrderBatch', data, priority=PRIORITY_ORDER)
+        except Exception as e:
+            return [dict(order, ok=False, txid=None, error=str(e)) for order in orders]
+        if response.get('error'):
+            if any('Unknown method' in error for error in response['error']):
+                logger.warning("AddOrderBatch not available, falling back to single orders.")
+                return [self._submit_single(order) for order in orders]
+            return [dict(order, ok=False, txid=None, error=", ".join(response['error'])) for order in orders]
+        legs = []
+        for order, placed in zip(orders, response['result']['orders']):
+            if placed.get('error'):
+                legs.append(dict(order, ok=False, txid=None, error=placed['error']))
+            else:
+                legs.append(dict(order, ok=True, txid=placed.get('txid'), error=None))
+        return legs
+
+    def _submit_single(self, order: Dict) -> Dict:
+        try:
+            response = self._query_private('AddOrder', dict(self._order_fields(order), pair=order['pair']), priority=PRIORITY_ORDER)
+        except Exception as e:
+            return dict(order, ok=False, txid=None, error=str(e))
+        if response.get('error'):
+            return dict(order, ok=False, txid=None, error=", ".join(response['error']))
+        return dict(order, ok=True, txid=response['result'].get('txid'), error=None)
@@ -0,0 +1,217 @@
+﻿import json
+import logging
+import os
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class UnknownPairError(ValueError):
+    """
+    Das Paar ist laut den AssetPairs-Metadaten kein Kraken-Handelspaar.
+    """
+
+class AssetPairs:
+    def __init__(self, query_public: Callable[[str, Optional[Dict]], Dict], cache_file: Optional[str] = "asset_pairs.json",
+                 ttl: float = 24 * 3600, retry_interval: float = 60.0, clock: Callable[[], float] = time.time):
+        """
+        Initialisiert den Cache der Kraken-Metadaten (AssetPairs und Assets).
+
+        Die Metadaten werden beim ersten Zugriff geladen, auf der Festplatte zwischengespeichert und erst
+        nach Ablauf der TTL neu abgefragt. Alle Nachschlagewerke sind Dictionaries (O(1)) in beide Richtungen:
+        Kurzname/WebSocket-Name -> kanonischer Name, Asset -> Paar und umgekehrt.
+
+        :param query_public: Funktion (method, data) -> Antwort, z. B. KrakenAPIClient._query_public.
+        :param cache_file: Die Cache-Datei (None: nur im Speicher).
+        :param ttl: Die Gültigkeitsdauer des Caches in Sekunden.
+        :param retry_interval: Die Wartezeit in Sekunden nach einem fehlgeschlagenen Laden.
+        :param clock: Die Zeitquelle (für Tests).
+        """
+        self.query_public = query_public
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self.pairs: Dict[str, Dict] = {}
+        self.assets: Dict[str, Dict] = {}
+        self.pair_names: Dict[str, str] = {}  # kanonisch/Kurzname/WebSocket-Name -> kanonischer Paarname
+        self.asset_names: Dict[str, str] = {}  # kanonisch/Kurzname -> kanonischer Asset-Name
+        self.pair_by_assets: Dict[tuple, str] = {}  # (Basis, Quote) kanonisch -> kanonischer Paarname
+
+    def ensure_loaded(self) -> bool:
+        """
+        Lädt die Metadaten aus dem Cache oder von Kraken, falls sie fehlen oder abgelaufen sind.
+
+        :return: True, wenn Metadaten verfügbar sind.
+        """
+        with self.lock:
+            now = self.clock()
+            if not self._needs_fetch(now):
+                return self.loaded_at is not None
+            try:
+                self._fetch(now)
+                return True
+            except Exception as e:
+                self.failed_at = now
+                logger.error("Error loading asset pair metadata: %s", e)
+                return self.loaded_at is not None
+
+    def needs_fetch(self) -> bool:
+        """
+        Prüft, ob die Metadaten von Kraken geladen werden müssen (für Clients, die sie selbst abfragen).
+
+        :return: True, wenn weder gültige Metadaten noch ein gültiger Cache vorliegen und kein Laden kürzlich fehlschlug.
+        """
+        with self.lock:
+            return self._needs_fetch(self.clock())
+
+    def load_responses(self, pairs_response: Dict, assets_response: Dict) -> bool:
+        """
+        Übernimmt selbst abgefragte AssetPairs- und Assets-Antworten (z. B. vom AsyncKrakenAPIClient).
+
+        :return: True, wenn Metadaten verfügbar sind.
+        """
+        with self.lock:
+            now = self.clock()
+            try:
+                self._store(pairs_response, assets_response, now)
+                return True
+            except Exception as e:
+                self.failed_at = now
+                logger.error("Error loading asset pair metadata: %s", e)
+                return self.loaded_at is not None
+
+    def _needs_fetch(self, now: float) -> bool:
+        if self.loaded_at is not None and now - self.loaded_at < self.ttl:
+            return False
+        if self.loaded_at is None and self._load_cache_file(now):
+            return False
+        return self.failed_at is None or now - self.failed_at >= self.retry_interval
+
+    def _load_cache_file(self, now: float) -> bool:
+        if self.cache_file is None or not os.path.exists(self.cache_file):
+            return False
+        try:
+            with open(self.cache_file, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable asset pair cache %s: %s", self.cache_file, e)
+            return False
+        if now - cached['fetched_at'] >= self.ttl:
+            return False
+        self._index(cached['pairs'], cached['assets'], cached['fetched_at'])
+        return True
+
+    def _fetch(self, now: float):
+        self._store(self.query_public('AssetPairs', None), self.query_public('Assets', None), now)
+
+    def _store(self, pairs_response: Dict, assets_response: Dict, now: float):
+        for response in (pairs_response, assets_response):
+            if response.get('error'):
+                raise Exception(", ".join(response['error']))
+        self._index(pairs_response['result'], assets_response['result'], now)
+        logger.info("Loaded metadata for %s asset pairs and %s assets.", len(self.pairs), len(self.assets))
+        if self.cache_file is None:
+            return
+        temp_file = self.cache_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({'fetched_at': now, 'pairs': self.pairs, 'assets': self.assets}, f)
+        os.replace(temp_file, self.cache_file)
+
+    def _index(self, pairs: Dict[str, Dict], assets: Dict[str, Dict], fetched_at: float):
+        pair_names, asset_names, pair_by_assets = {}, {}, {}
+        for name, info in assets.items():
+            asset_names[name] = name
+            asset_names.setdefault(info.get('altname', name), name)
+        for name, info in pairs.items():
+            for alias in (name, info.get('altname'), info.get('wsname')):
+                if alias:
+                    pair_names[alias] = name
+                    pair_names.setdefault(alias.replace("/", ""), name)
+            pair_by_assets.setdefault((info['base'], info['quote']), name)
+        self.pairs, self.assets = pairs, assets
+        self.pair_names, self.asset_names, self.pair_by_assets = pair_names, asset_names, pair_by_assets
+        self.loaded_at = fetched_at
+        self.failed_at = None
+
+    def resolve_pair(self, pair: str) -> Optional[str]:
+        """
+        Gibt den kanonischen Namen eines Paares zurück (z. B. 'XBTEUR' oder 'XBT/EUR' -> 'XXBTZEUR').
+        """
+        self.ensure_loaded()
+        return self.pair_names.get(pair) or self.pair_names.get(pair.replace("/", ""))
+
+    def is_valid_pair(self, pair: str) -> bool:
+        return self.resolve_pair(pair) is not None
+
+    def altname(self, pair: str) -> Optional[str]:
+        """
+        Gibt den Kurznamen eines Paares zurück (z. B. 'XXBTZEUR' -> 'XBTEUR').
+        """
+        canonical = self.resolve_pair(pair)
+        return self.pairs[canonical]['altname'] if canonical else None
+
+    def wsname(self, pair: str) -> Optional[str]:
+        """
+        Gibt den WebSocket-Namen eines Paares zurück (z. B. 'XBTEUR' -> 'XBT/EUR').
+        """
+        canonical = self.resolve_pair(pair)
+        return self.pairs[canonical].get('wsname') if canonical else None
+
+    def ws_names(self, pairs: Iterable[str]) -> Dict[str, str]:
+        """
+        Gibt die WebSocket-Namen mehrerer Paare zurück (für KrakenWebSocketFeed); unbekannte Paare fehlen.
+        """
+        return {pair: name for pair in pairs if (name := self.wsname(pair))}
+
+    def asset_altname(self, asset: str) -> str:
+        """
+        Gibt den Kurznamen eines Assets zurück (z. B. 'XXBT' -> 'XBT'); unbekannte Assets unverändert.
+        """
+        self.ensure_loaded()
+        canonical = self.asset_names.get(asset)
+        return self.assets[canonical].get('altname', asset) if canonical else asset
+
+    def pair_for_asset(self, asset: str, quote: str = "EUR") -> Optional[str]:
+        """
+        Gibt den Kurznamen des Paares eines Assets gegen eine Quote-Währung zurück (z. B. 'XXBT' -> 'XBTEUR').
+
+        :param asset: Das Asset in kanonischer oder kurzer Schreibweise (z. B. 'XXBT', 'XBT', 'ADA').
+        :param quote: Die Quote-Währung (z. B. 'EUR' oder 'ZEUR').
+        :return: Der Kurzname des Paares oder None, wenn es kein solches Paar gibt.
+        """
+        self.ensure_loaded()
+        base = self.asset_names.get(asset)
+        quote_name = self.asset_names.get(quote)
+        canonical = self.pair_by_assets.get((base, quote_name)) if base and quote_name else None
+        return self.pairs[canonical]['altname'] if canonical else None
+
+    def lot_decimals(self, pair: str) -> Optional[int]:
+        canonical = self.resolve_pair(pair)
+        return self.pairs[canonical].get('lot_decimals') if canonical else None
+
+    def pair_decimals(self, pair: str) -> Optional[int]:
+        canonical = self.resolve_pair(pair)
+        return self.pairs[canonical].get('pair_decimals') if canonical else None
+
+    def format_volume(self, pair: str, volume: float) -> str:
+        """
+        Formatiert ein Ordervolumen mit den zulässigen Nachkommastellen des Paares (lot_decimals). Es wird
+        abgerundet, damit ein Verkauf des gesamten Bestands nicht am Guthaben scheitert.
+        """
+        decimals = self.lot_decimals(pair)
+        if decimals is None:
+            return str(volume)
+        return str(Decimal(str(volume)).quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_DOWN))
+
+    def format_price(self, pair: str, price: float) -> str:
+        """
+        Formatiert einen Preis mit den zulässigen Nachkommastellen des Paares (pair_decimals).
+        """
+        decimals = self.pair_decimals(pair)
+        return f"{price:.{decimals}f}" if decimals is not None else str(price)
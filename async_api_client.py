@@ -0,0 +1,294 @@
+﻿import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import time
+import urllib.parse
+from typing import Dict, List, Optional
+import aiohttp
+from asset_pairs import AssetPairs
+from kraken_common import order_fields, pair_altname, parse_balance, ticker_prices
+from metrics import REGISTRY, MetricsRegistry
+from models.trade_ledger import TradeHistorySync, TradeLedger
+
+logger = logging.getLogger(__name__)
+
+def _no_blocking_query(method: str, data: Optional[Dict] = None) -> Dict:
+    """
+    Abfragefunktion für den AssetPairs-Cache des asynchronen Clients: Die Metadaten werden dort über
+    AsyncKrakenAPIClient.ensure_asset_pairs() geladen, nie blockierend aus der Event-Loop.
+    """
+    return {'error': [f"{method} is loaded asynchronously"]}
+
+class AsyncKrakenAPIClient:
+    def __init__(self, api_key: str, api_secret: str, ledger: Optional[TradeLedger] = None,
+                 base_url: str = "https://api.kraken.com", max_in_flight: int = 8, timeout: float = 10.0,
+                 keepalive_timeout: float = 30.0, metrics: Optional[MetricsRegistry] = None,
+                 asset_pairs: Optional[AssetPairs] = None):
+        """
+        Initialisiert den asynchronen Kraken API-Client.
+
+        Alle Anfragen laufen über eine gemeinsame aiohttp-Session mit Keep-Alive-Verbindungen.
+
+        :param api_key: Der API-Schlüssel für die Kraken API.
+        :param api_secret: Das API-Geheimnis für die Kraken API (Base64).
+        :param ledger: Das lokale Handelsjournal. Standardmäßig wird 'trades.db' verwendet.
+        :param base_url: Die Basis-URL der API (für Tests z. B. ein lokaler Server).
+        :param max_in_flight: Die maximale Anzahl gleichzeitig laufender Anfragen.
+        :param timeout: Die Standard-Frist in Sekunden für eine einzelne Anfrage.
+        :param keepalive_timeout: Wie lange ungenutzte Verbindungen offen gehalten werden (Sekunden).
+        :param metrics: Die Registry für Latenzen und Fehler je Endpunkt. Standardmäßig metrics.REGISTRY.
+        :param asset_pairs: Der Cache der Paar-/Asset-Metadaten. Standardmäßig 'asset_pairs.json'.
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.ledger = ledger if ledger is not None else TradeLedger()
+        self.base_url = base_url.rstrip("/")
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self.asset_pairs = asset_pairs if asset_pairs is not None else AssetPairs(_no_blocking_query)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._private_lock: Optional[asyncio.Lock] = None
+        self._last_nonce = 0
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """
+        Öffnet die HTTP-Session. Wird bei der ersten Anfrage automatisch aufgerufen.
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=self.keepalive_timeout)
+            self.session = aiohttp.ClientSession(connector=connector, headers={'User-Agent': 'kraken-bot'})
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._private_lock = asyncio.Lock()
+            logger.info("Connected to Kraken API (async).")
+
+    async def close(self):
+        """
+        Schließt die HTTP-Session und alle offenen Verbindungen.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _next_nonce(self) -> int:
+        """
+        Erzeugt eine streng monoton steigende Nonce, auch wenn mehrere Aufrufe in dieselbe Millisekunde fallen.
+        """
+        self._last_nonce = max(self._last_nonce + 1, int(time.time() * 1000))
+        return self._last_nonce
+
+    def _sign(self, urlpath: str, data: Dict) -> str:
+        """
+        Berechnet die API-Sign-Signatur einer privaten Anfrage (wie krakenex).
+        """
+        postdata = urllib.parse.urlencode(data)
+        encoded = (str(data['nonce']) + postdata).encode()
+        message = urlpath.encode() + hashlib.sha256(encoded).digest()
+        signature = hmac.new(base64.b64decode(self.api_secret), message, hashlib.sha512)
+        return base64.b64encode(signature.digest()).decode()
+
+    async def query_public(self, method: str, data: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+        """
+        Führt eine öffentliche API-Anfrage aus.
+
+        :param method: Der API-Endpunkt (z. B. 'Ticker').
+        :param data: Die Anfrageparameter.
+        :param timeout: Die Frist in Sekunden für diese Anfrage (Standard: self.timeout).
+        :return: Die dekodierte JSON-Antwort.
+        """
+        return await self._timed(method, self._query_public(method, data, timeout))
+
+    async def _query_public(self, method: str, data: Optional[Dict], timeout: Optional[float]) -> Dict:
+        await self.open()
+        url = f"{self.base_url}/0/public/{method}"
+        async with self._in_flight:
+            async with self.session.get(url, params=data or {}, timeout=aiohttp.ClientTimeout(total=timeout or self.timeout)) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+    async def query_private(self, method: str, data: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+        """
+        Führt eine signierte private API-Anfrage aus.
+
+        Kraken verlangt streng steigende Nonces in Eingangsreihenfolge; private Anfragen werden daher
+        nacheinander gesendet, während öffentliche Anfragen parallel laufen.
+
+        :param method: Der API-Endpunkt (z. B. 'Balance').
+        :param data: Die Anfrageparameter.
+        :param timeout: Die Frist in Sekunden für diese Anfrage (Standard: self.timeout).
+        :return: Die dekodierte JSON-Antwort.
+        """
+        return await self._timed(method, self._query_private(method, data, timeout))
+
+    async def _timed(self, method: str, request) -> Dict:
+        """
+        Wartet auf eine Anfrage und erfasst Latenz und Fehler in der Metrik-Registry.
+        """
+        start = self.metrics.clock()
+        try:
+            response = await request
+        except Exception as e:
+            self.metrics.observe_call(method, self.metrics.clock() - start, [type(e).__name__])
+            raise
+        self.metrics.observe_call(method, self.metrics.clock() - start, (response or {}).get('error'))
+        return response
+
+    async def _query_private(self, method: str, data: Optional[Dict], timeout: Optional[float]) -> Dict:
+        await self.open()
+        urlpath = f"/0/private/{method}"
+        async with self._private_lock, self._in_flight:
+            data = dict(data or {}, nonce=self._next_nonce())
+            headers = {'API-Key': self.api_key, 'API-Sign': self._sign(urlpath, data)}
+            async with self.session.post(self.base_url + urlpath, data=data, headers=headers,
+                                         timeout=aiohttp.ClientTimeout(total=timeout or self.timeout)) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+    async def ensure_asset_pairs(self) -> bool:
+        """
+        Lädt die AssetPairs-Metadaten asynchron, falls sie fehlen oder abgelaufen sind.
+
+        :return: True, wenn Metadaten verfügbar sind; sonst gilt die X/Z-Heuristik bzw. '<Asset>EUR'.
+        """
+        if self.asset_pairs.needs_fetch():
+            try:
+                pairs_response, assets_response = await asyncio.gather(self.query_public('AssetPairs'), self.query_public('Assets'))
+            except Exception as e:
+                pairs_response = assets_response = {'error': [repr(e)]}
+            return self.asset_pairs.load_responses(pairs_response, assets_response)
+        return self.asset_pairs.ensure_loaded()
+
+    def _altname(self, pair: str) -> str:
+        return pair_altname(self.asset_pairs, pair)
+
+    async def check_balance(self, favorites: List[str]) -> Dict[str, float]:
+        """
+        Ruft den Kontostand für die angegebenen Favoriten-Paare ab.
+
+        :param favorites: Eine Liste von Favoriten-Paaren (z. B. ['ADAEUR', 'CQTEUR']).
+        :return: Ein Dictionary mit den verfügbaren Beträgen für die Favoriten-Paare.
+        """
+        try:
+            logger.info("Fetching balance...")
+            use_metadata = await self.ensure_asset_pairs()
+            balance = await self.query_private('Balance')
+            if 'result' in balance:
+                valid_balance = parse_balance(balance['result'], favorites, self.asset_pairs, use_metadata)
+                logger.info("Valid balance: %s", valid_balance)
+                return valid_balance
+            else:
+                logger.error("Error fetching balance: %s", balance)
+        except Exception as e:
+            logger.error("Error fetching balance: %r", e)
+        return {}
+
+    async def get_market_price(self, pair: str) -> Optional[float]:
+        """
+        Ruft den aktuellen Marktpreis für ein bestimmtes Paar ab.
+
+        :param pair: Das HandelsPaar (z. B. 'CQTEUR').
+        :return: Der aktuelle Marktpreis oder None, falls ein Fehler auftritt.
+        """
+        try:
+            response = await self.query_public('Ticker', {'pair': pair.replace("/", "")})
+            if response['error']:
+                return None
+            ticker_info = list(response['result'].values())[0]
+            return float(ticker_info['c'][0])
+        except Exception as e:
+            logger.error("Error fetching market price for %s: %r", pair, e)
+        return None
+
+    async def get_market_prices(self, pairs: List[str]) -> Dict[str, float]:
+        """
+        Ruft die aktuellen Marktpreise für mehrere Paare mit einer einzigen Ticker-Anfrage ab.
+
+        :param pairs: Eine Liste von HandelsPaaren (z. B. ['ADAEUR', 'CQTEUR']).
+        :return: Ein Dictionary mit den Marktpreisen je Paar. Paare ohne Preis fehlen im Ergebnis.
+        """
+        requested = {pair: pair.replace("/", "") for pair in dict.fromkeys(pairs)}
+        if not requested:
+            return {}
+        try:
+            response = await self.query_public('Ticker', {'pair': ",".join(requested.values())})
+            if response['error']:
+                logger.warning("Batched ticker request failed (%s), falling back to single requests.", response['error'])
+                single_prices = await asyncio.gather(*(self.get_market_price(pair) for pair in requested))
+                return {pair: price for pair, price in zip(requested, single_prices) if price is not None}
+            await self.ensure_asset_pairs()
+            return ticker_prices(requested, response['result'], self._altname)
+        except Exception as e:
+            logger.error("Error fetching market prices for %s: %r", ', '.join(requested), e)
+        return {}
+
+    async def sync_trades(self) -> int:
+        """
+        Gleicht das lokale Handelsjournal inkrementell mit der Handelshistorie ab (siehe TradeHistorySync).
+
+        :return: Die Anzahl neu gespeicherter Trades.
+        """
+        await self.ensure_asset_pairs()
+        sync = TradeHistorySync(self.ledger, self._altname)
+        try:
+            while (params := sync.next_request()) is not None:
+                sync.handle(await self.query_private('TradesHistory', params))
+        except Exception as e:
+            logger.error("Error syncing trades history: %r", e)
+        if sync.added:
+            logger.info("Stored %s new trades in the ledger.", sync.added)
+        return sync.added
+
+    async def get_buy_price(self, pair: str, fallback_price: Optional[float] = None) -> Optional[float]:
+        """
+        Ermittelt den Kaufpreis für ein bestimmtes Paar aus dem lokalen Handelsjournal.
+
+        :param pair: Das HandelsPaar (z. B. 'CQTEUR').
+        :param fallback_price: Preis, der verwendet wird, falls kein Kauf gefunden wird. Ohne Angabe wird der Marktpreis abgefragt.
+        :return: Der Kaufpreis oder None, falls kein Kauf gefunden wird.
+        """
+        try:
+            buy_price = self.ledger.get_last_buy_price(pair.replace("/", ""))
+            if buy_price is None:
+                logger.warning("No buy price found for %s.", pair)
+                if fallback_price is not None:
+                    return fallback_price
+                return await self.get_market_price(pair)  # Fallback to market price
+            return buy_price
+        except Exception as e:
+            logger.error("Error fetching buy price for %s: %r", pair, e)
+        return None
+
+    async def execute_trade(self, pair: str, volume: float, side: str = 'buy') -> Optional[Dict]:
+        """
+        Führt einen Trade für ein bestimmtes Paar aus.
+
+        :param pair: Das HandelsPaar (z. B. 'CQTEUR').
+        :param volume: Das Handelsvolumen.
+        :param side: Die Handelsseite ('buy' oder 'sell').
+        :return: Das Ergebnis des Trades.
+        """
+        try:
+            await self.ensure_asset_pairs()
+            fields = order_fields(self.asset_pairs, {'pair': pair, 'side': side, 'volume': volume})
+            response = await self.query_private('AddOrder', dict(fields, pair=pair))
+            if 'result' in response:
+                logger.info("Trade executed: %s", response['result'])
+                return response['result']
+            else:
+                error_message = response.get('error', 'Unknown error')
+                logger.error("Error executing trade: %s", error_message)
+                raise Exception(f"Trade execution failed: {error_message}")
+        except Exception as e:
+            logger.error("Error executing trade: %r", e)
+            raise
@@ -1,30 +1,72 @@
-import backtrader as bt
-from datetime import datetime
+﻿import backtrader as bt
+from typing import Optional
+from ohlc_store import OHLCStore
+from strategy import SmaThresholdStrategy, BUY, SELL
 
 class MyStrategy(bt.Strategy):
+    params = (
+        ('period', 15),  # Periode des SMA
+        ('threshold', 0.0),  # Relativer Mindestabstand zwischen SMA und Schlusskurs
+    )
+
     def __init__(self):
         """
         Initialisiert die Handelsstrategie.
         """
-        self.sma = bt.indicators.SimpleMovingAverage(self.data.close, period=15)
+        self.rule = SmaThresholdStrategy(self.p.period, self.p.threshold)
+        self.fills = []
 
     def next(self):
         """
-        Fhrt die Handelslogik aus.
+        Führt die Handelslogik aus.
         """
-        if self.sma > self.data.close:
+        signal = self.rule.on_bar(self.data.open[0], self.data.high[0], self.data.low[0], self.data.close[0])
+        if signal == BUY:
             self.buy()
-        elif self.sma < self.data.close:
+        elif signal == SELL:
             self.sell()
 
-def run_backtest():
+    def notify_order(self, order):
+        """
+        Merkt sich ausgeführte Orders als (Bar-Index, Stückzahl, Preis, Gebühr).
+        """
+        if order.status == order.Completed:
+            self.fills.append((len(self.data) - 1, order.executed.size, order.executed.price, order.executed.comm))
+
+def run_backtrader_backtest(dataframe, fee: float = 0.0026, cash: float = 10000.0, **strategy_params):
+    """
+    Führt MyStrategy mit backtrader auf einem DataFrame mit OHLC-Daten aus.
+
+    :param dataframe: Ein pandas DataFrame mit DatetimeIndex und den Spalten open, high, low, close, volume.
+    :param fee: Die Handelsgebühr (z. B. 0.0026 für 0,26 %).
+    :param cash: Das Startkapital.
+    :param strategy_params: Parameter für MyStrategy (period, threshold).
+    :return: Ein Tupel (Liste der Fills, Endwert des Portfolios).
+    """
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.addstrategy(MyStrategy, **strategy_params)
+    cerebro.adddata(bt.feeds.PandasData(dataname=dataframe))
+    cerebro.broker.setcash(cash)
+    cerebro.broker.setcommission(commission=fee)
+    strategy = cerebro.run()[0]
+    return strategy.fills, cerebro.broker.getvalue()
+
+def run_backtest(pair: str = "XBTEUR", interval: int = 1440, store: Optional[OHLCStore] = None):
     """
-    Fhrt das Backtesting der Strategie aus.
+    Führt das Backtesting der Strategie aus.
+
+    Die Kraken-Kerzen werden zuerst inkrementell in den lokalen OHLC-Speicher nachgeladen und dann
+    ohne Kopie aus den gespeicherten Arrays gelesen.
+
+    :param pair: Das HandelsPaar (z. B. 'XBTEUR').
+    :param interval: Das Kerzenintervall in Minuten.
+    :param store: Der OHLC-Speicher (Standard: OHLCStore() im Verzeichnis 'ohlc').
     """
+    store = store if store is not None else OHLCStore()
+    store.update(pair, interval)
     cerebro = bt.Cerebro()
     cerebro.addstrategy(MyStrategy)
-    data = bt.feeds.YahooFinanceData(dataname="BTC-USD", fromdate=datetime(2020, 1, 1), todate=datetime(2023, 1, 1))
-    cerebro.adddata(data)
+    cerebro.adddata(store.backtrader_feed(pair, interval))
     cerebro.run()
 
 if __name__ == '__main__':
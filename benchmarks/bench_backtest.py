@@ -0,0 +1,64 @@
+﻿import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtesting import run_backtrader_backtest
+from vector_backtest import run_vectorized_backtest
+
+def synthetic_ohlc(bars: int, seed: int = 1) -> pd.DataFrame:
+    """
+    Erzeugt eine reproduzierbare synthetische OHLC-Zeitreihe (Random Walk) mit Minuten-Bars.
+
+    :param bars: Die Anzahl Bars.
+    :param seed: Der Startwert des Zufallsgenerators.
+    :return: Ein DataFrame mit den Spalten open, high, low, close, volume.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close),
+        'low': np.minimum(open_, close),
+        'close': close,
+        'volume': 1.0,
+    }, index=pd.date_range('2024-01-01', periods=bars, freq='min'))
+
+def bench_backtrader(data: pd.DataFrame) -> float:
+    """
+    Misst den Durchsatz von MyStrategy mit backtrader in Bars pro Sekunde.
+    """
+    start = time.perf_counter()
+    run_backtrader_backtest(data, cash=1e9)
+    return len(data) / (time.perf_counter() - start)
+
+def bench_vectorized(data: pd.DataFrame, repeat: int = 5) -> float:
+    """
+    Misst den Durchsatz der vektorisierten Engine in Bars pro Sekunde (bester von repeat Läufen).
+    """
+    open_, close = data['open'].to_numpy(), data['close'].to_numpy()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_vectorized_backtest(open_, close, cash=1e9)
+        best = min(best, time.perf_counter() - start)
+    return len(data) / best
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest-Durchsatz: backtrader vs. vektorisierte Engine")
+    parser.add_argument("--bars", type=int, default=50000, help="Anzahl Bars der synthetischen Zeitreihe")
+    args = parser.parse_args()
+    data = synthetic_ohlc(args.bars)
+    backtrader_rate = bench_backtrader(data)
+    vectorized_rate = bench_vectorized(data)
+    print(f"backtrader:  {backtrader_rate:14,.0f} bars/s")
+    print(f"vectorized:  {vectorized_rate:14,.0f} bars/s")
+    print(f"speedup:     {vectorized_rate / backtrader_rate:14,.1f}x")
+
+if __name__ == '__main__':
+    main()
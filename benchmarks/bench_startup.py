@@ -0,0 +1,78 @@
+﻿import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startbudget je Messung in Millisekunden (Median über mehrere kalte Starts)
+DEFAULT_BUDGETS = {
+    'import.main': 150.0,
+    'import.gui': 400.0,
+    'import.kraken_bot': 300.0,
+}
+
+# Diese Module dürfen beim Import der Einstiegsmodule noch nicht geladen sein
+DEFERRED_MODULES = ('krakenex', 'keyring', 'pystray', 'PIL', 'numpy')
+
+MEASURE_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{'ms': elapsed, 'loaded': [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+def measure_import(module: str, repeat: int) -> Dict:
+    """
+    Misst den Import eines Moduls in jeweils frischen Interpretern (kalter Start ohne geladene Module).
+
+    :return: Der Median in Millisekunden und die bereits geladenen, eigentlich verzögerten Module.
+    """
+    timings, loaded = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", MEASURE_IMPORT.format(module=module, deferred=DEFERRED_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['ms'])
+        loaded = result['loaded']
+    return {'value': statistics.median(timings), 'unit': 'ms', 'loaded': loaded}
+
+def bench_startup(repeat: int = 5) -> Dict[str, Dict]:
+    """
+    Misst die Importzeit der Einstiegsmodule (main, gui, kraken_bot).
+    """
+    return {f"import.{module}": measure_import(module, repeat) for module in ('main', 'gui', 'kraken_bot')}
+
+def check_budget(results: Dict[str, Dict], budgets: Dict[str, float]) -> bool:
+    """
+    Gibt die Messwerte aus und prüft sie gegen das Budget.
+
+    :return: True, wenn alle Messungen im Budget liegen und keine verzögerten Module vorzeitig geladen werden.
+    """
+    ok = True
+    for name, result in results.items():
+        budget = budgets.get(name)
+        over = budget is not None and result['value'] > budget
+        early = name == 'import.main' and result['loaded']
+        ok = ok and not over and not early
+        flag = "  OVER BUDGET" if over else ""
+        flag += f"  LOADS {', '.join(result['loaded'])}" if early else ""
+        print(f"  {name:20s} {result['value']:8.1f} ms (budget {budget:.0f} ms){flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Misst die Startzeit (Importzeit der Einstiegsmodule) gegen ein Budget")
+    parser.add_argument("--repeat", type=int, default=5, help="Anzahl kalter Starts je Messung (Median)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Faktor für alle Budgets (z. B. 2 für langsame CI-Maschinen)")
+    args = parser.parse_args()
+    budgets = {name: budget * args.scale for name, budget in DEFAULT_BUDGETS.items()}
+    print("Cold start:")
+    if not check_budget(bench_startup(args.repeat), budgets):
+        sys.exit("Startup regressed past its budget.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+﻿import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_backtest import synthetic_ohlc
+from param_sweep import run_sweep
+
+def main():
+    parser = argparse.ArgumentParser(description="Skalierung des Parameter-Sweeps über die Anzahl Prozesse")
+    parser.add_argument("--bars", type=int, default=200000, help="Anzahl Bars der synthetischen Zeitreihe")
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1, help="Höchste getestete Prozessanzahl")
+    args = parser.parse_args()
+    data = synthetic_ohlc(args.bars)
+    open_, close = data['open'].to_numpy(), data['close'].to_numpy()
+    baseline = None
+    processes = 1
+    while processes <= args.max_processes:
+        start = time.perf_counter()
+        table = run_sweep(open_, close, processes=processes)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{processes:3d} processes: {elapsed:8.2f} s  {len(table) / elapsed:8.1f} runs/s  speedup {baseline / elapsed:5.2f}x")
+        processes *= 2
+    print(table.head(10).to_string())
+
+if __name__ == '__main__':
+    main()
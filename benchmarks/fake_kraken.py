@@ -0,0 +1,107 @@
+﻿import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import KrakenAPIClient
+from asset_pairs import AssetPairs
+from models.trade_ledger import TradeLedger
+from rate_limiter import RateLimitScheduler
+
+# Seitengröße der TradesHistory-Antworten (wie bei Kraken)
+TRADES_PAGE_SIZE = 50
+
+class FakeKrakenex:
+    def __init__(self, pair_count: int, latency: float = 0.0, trades_per_pair: int = 10, dust_assets: int = 0):
+        """
+        Ein krakenex.API-kompatibles Backend im Prozess, das Kraken-Antworten synthetisch erzeugt.
+
+        Jedes zweite Asset verwendet einen Legacy-Code (z. B. 'XT00' / Paar 'XT00ZEUR'), damit auch die
+        Namensauflösung gemessen wird. Jede Anfrage wartet latency Sekunden (per time.sleep, wie ein
+        Netzwerkaufruf ohne GIL).
+
+        :param pair_count: Die Anzahl EUR-Paare (entspricht der Anzahl Favoriten).
+        :param latency: Die simulierte Antwortzeit je Anfrage in Sekunden.
+        :param trades_per_pair: Die Anzahl Trades je Paar in der Handelshistorie.
+        :param dust_assets: Zusätzliche Assets im Kontostand, die zu keinem Favoriten gehören.
+        """
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self.assets = {'ZEUR': {'altname': 'EUR', 'decimals': 4}}
+        self.pairs = {}
+        self.balance = {'ZEUR': '10000.0000'}
+        self.favorites: List[str] = []
+        for index in range(pair_count):
+            base = f"T{index:02d}"
+            asset = f"X{base}" if index % 2 == 0 else base
+            canonical = f"{asset}ZEUR" if index % 2 == 0 else f"{base}EUR"
+            self.assets[asset] = {'altname': base, 'decimals': 8}
+            self.pairs[canonical] = {'altname': f"{base}EUR", 'wsname': f"{base}/EUR", 'base': asset, 'quote': 'ZEUR',
+                                     'pair_decimals': 5, 'lot_decimals': 8}
+            self.balance[asset] = f"{100 + index}.00000000"
+            self.favorites.append(f"{base}EUR")
+        for index in range(dust_assets):
+            self.balance[f"D{index:03d}"] = "0.00001000"
+        self.trades = {}
+        start = 1700000000.0
+        for index, canonical in enumerate(self.pairs):
+            for number in range(trades_per_pair):
+                trade_time = start + index * trades_per_pair + number
+                self.trades[f"T{index:04d}-{number:05d}"] = {
+                    'ordertxid': f"O{index:04d}-{number:05d}", 'pair': canonical, 'time': trade_time,
+                    'type': 'buy' if number % 3 else 'sell', 'ordertype': 'market', 'price': f"{1 + index:.5f}",
+                    'cost': f"{(1 + index) * 10:.5f}", 'fee': '0.02600', 'vol': '10.00000000',
+                }
+
+    def _respond(self, method: str, result: Dict) -> Dict:
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {'error': [], 'result': result}
+
+    def query_public(self, method: str, data: Optional[Dict] = None, timeout=None) -> Dict:
+        if method == 'AssetPairs':
+            return self._respond(method, self.pairs)
+        if method == 'Assets':
+            return self._respond(method, self.assets)
+        if method == 'Ticker':
+            requested = set(data['pair'].split(","))
+            result = {}
+            for index, (canonical, info) in enumerate(self.pairs.items()):
+                if canonical in requested or info['altname'] in requested:
+                    price = f"{1 + index:.5f}"
+                    result[canonical] = {'a': [price, '1', '1.0'], 'b': [price, '1', '1.0'], 'c': [price, '0.5']}
+            return self._respond(method, result)
+        raise KeyError(method)
+
+    def query_private(self, method: str, data: Optional[Dict] = None, timeout=None) -> Dict:
+        if method == 'Balance':
+            return self._respond(method, dict(self.balance))
+        if method == 'TradesHistory':
+            data = data or {}
+            start = data.get('start')
+            matching = [(txid, trade) for txid, trade in self.trades.items() if start is None or trade['time'] > start]
+            offset = data.get('ofs', 0)
+            page = dict(matching[offset:offset + TRADES_PAGE_SIZE])
+            return self._respond(method, {'trades': page, 'count': len(matching)})
+        raise KeyError(method)
+
+def unlimited_scheduler() -> RateLimitScheduler:
+    """
+    Ein Scheduler ohne Budgetgrenze, damit die Messungen nicht durch das simulierte Kraken-Limit gedrosselt werden.
+    """
+    scheduler = RateLimitScheduler()
+    for bucket in scheduler.buckets.values():
+        bucket.capacity = bucket.tokens = float('inf')
+    return scheduler
+
+def make_fake_client(fake: FakeKrakenex) -> KrakenAPIClient:
+    """
+    Erstellt einen KrakenAPIClient, der gegen das Fake-Backend läuft (Journal und Metadaten nur im Speicher).
+    """
+    client = KrakenAPIClient("key", "c2VjcmV0", ledger=TradeLedger(":memory:"), scheduler=unlimited_scheduler(),
+                             asset_pairs=AssetPairs(fake.query_public, cache_file=None))
+    client.api = fake
+    return client
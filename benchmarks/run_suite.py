@@ -0,0 +1,187 @@
+﻿import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_backtest import synthetic_ohlc, bench_backtrader, bench_vectorized
+from bench_startup import bench_startup
+from fake_kraken import FakeKrakenex, make_fake_client
+from refresh_worker import fetch_portfolio_rows, build_row
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """
+    Führt fn repeat-mal aus und gibt den Median der Laufzeit in Millisekunden zurück.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def bench_update_balance(favorite_counts, latency: float, repeat: int) -> Dict[str, Dict]:
+    """
+    Misst eine vollständige Aktualisierung (fetch_portfolio_rows wie im RefreshWorker) je Anzahl Favoriten.
+    Der erste Lauf (kompletter Abgleich der Handelshistorie) wird getrennt als 'cold' erfasst.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for count in favorite_counts:
+            fake = FakeKrakenex(count, latency=latency)
+            client = make_fake_client(fake)
+            refresh = lambda: fetch_portfolio_rows(client, fake.favorites, executor)
+            results[f"update_balance.cold.{count}_favorites"] = {'value': measure(refresh, 1), 'unit': 'ms'}
+            results[f"update_balance.warm.{count}_favorites"] = {'value': measure(refresh, repeat), 'unit': 'ms'}
+    return results
+
+def bench_parsing(pair_count: int, dust_assets: int, repeat: int) -> Dict[str, Dict]:
+    """
+    Misst die Auswertung der Antworten ohne Latenz: check_balance und get_buy_price über alle Paare.
+    """
+    fake = FakeKrakenex(pair_count, dust_assets=dust_assets, trades_per_pair=50)
+    client = make_fake_client(fake)
+    client.sync_trades()
+    client.asset_pairs.ensure_loaded()
+    return {
+        f"check_balance.{pair_count}_pairs_{dust_assets}_dust": {
+            'value': measure(lambda: client.check_balance(fake.favorites), repeat), 'unit': 'ms'},
+        f"get_buy_price.{pair_count}_pairs": {
+            'value': measure(lambda: [client.get_buy_price(pair) for pair in fake.favorites], repeat), 'unit': 'ms'},
+    }
+
+def bench_treeview(row_count: int, repeat: int) -> Optional[Dict[str, Dict]]:
+    """
+    Misst KrakenBotGUI.apply_balance (Einfügen und zellenweises Aktualisieren) inklusive Neuzeichnen.
+
+    :return: Die Ergebnisse oder None, wenn kein Display verfügbar ist.
+    """
+    import tkinter as tk
+    from tkinter import ttk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    from gui import KrakenBotGUI
+    root.withdraw()
+    view = type("TreeviewBench", (), {})()
+    view.tree = ttk.Treeview(root, columns=("pair", "available", "market_price", "buy_price", "current_value", "deviation"), show='headings')
+    view.update_tree_row = lambda pair, row: KrakenBotGUI.update_tree_row(view, pair, row)
+
+    def rows(price_factor: float):
+        return [build_row(f"T{index:03d}EUR", 100.0 + index, (1 + index) * price_factor, 1.0 + index) for index in range(row_count)]
+
+    def insert():
+        view.tree.delete(*view.tree.get_children())
+        view.rows, view.tree_items, view.pending_rows = {}, {}, {}
+        KrakenBotGUI.apply_balance(view, rows(1.0))
+        root.update_idletasks()
+
+    factors = iter(range(1, 10 ** 9))
+    def update():
+        KrakenBotGUI.apply_balance(view, rows(1.0 + next(factors) * 1e-4))
+        root.update_idletasks()
+
+    results = {f"treeview.insert.{row_count}_rows": {'value': measure(insert, repeat), 'unit': 'ms'}}
+    results[f"treeview.update.{row_count}_rows"] = {'value': measure(update, repeat), 'unit': 'ms'}
+    root.destroy()
+    return results
+
+def bench_backtests(bars: int) -> Dict[str, Dict]:
+    data = synthetic_ohlc(bars)
+    return {
+        f"backtest.backtrader.{bars}_bars": {'value': bench_backtrader(data), 'unit': 'bars/s', 'higher_is_better': True},
+        f"backtest.vectorized.{bars}_bars": {'value': bench_vectorized(data), 'unit': 'bars/s', 'higher_is_better': True},
+    }
+
+def current_commit() -> str:
+    """
+    Gibt den Kurz-Hash des aktuellen Commits zurück (mit '-dirty' bei uncommitteten Änderungen).
+    """
+    root = os.path.dirname(RESULTS_DIR)
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> bool:
+    """
+    Gibt die Abweichungen gegenüber einem früheren Lauf aus.
+
+    :return: True, wenn mindestens ein Messwert um mehr als threshold schlechter geworden ist.
+    """
+    regressed = False
+    print(f"\nComparison with {baseline['commit']}:")
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None or not old['value']:
+            continue
+        change = result['value'] / old['value'] - 1
+        worse = -change if result.get('higher_is_better') else change
+        flag = "  REGRESSION" if worse > threshold else ""
+        regressed = regressed or bool(flag)
+        print(f"  {name:45s} {old['value']:14.3f} -> {result['value']:14.3f} {result['unit']:7s} {change * 100:+7.1f}%{flag}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Benchmarks gegen ein simuliertes Kraken-Backend")
+    parser.add_argument("--favorites", type=int, nargs="+", default=[5, 14, 50], help="Anzahl Favoriten für update_balance")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulierte Antwortzeit je Anfrage in Sekunden")
+    parser.add_argument("--repeat", type=int, default=5, help="Wiederholungen je Messung (Median)")
+    parser.add_argument("--bars", type=int, default=20000, help="Anzahl Bars für den Backtest-Durchsatz")
+    parser.add_argument("--compare", help="Commit (bzw. Präfix einer Ergebnisdatei), mit dem verglichen wird")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative Verschlechterung, ab der ein Wert als Regression gilt")
+    parser.add_argument("--no-save", action="store_true", help="Ergebnisse nicht speichern")
+    args = parser.parse_args()
+
+    results = {}
+    results.update(bench_update_balance(args.favorites, args.latency, args.repeat))
+    results.update(bench_parsing(100, 500, args.repeat))
+    treeview = bench_treeview(200, args.repeat)
+    if treeview is None:
+        print("No display available, skipping Treeview benchmark.")
+    else:
+        results.update(treeview)
+    results.update(bench_backtests(args.bars))
+    results.update(bench_startup(args.repeat))
+
+    run = {
+        'commit': current_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': vars(args),
+        'results': results,
+    }
+    for name, result in results.items():
+        print(f"{name:45s} {result['value']:14.3f} {result['unit']}")
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        result_file = os.path.join(RESULTS_DIR, f"{run['commit']}.json")
+        with open(result_file, 'w') as f:
+            json.dump(run, f, indent=4)
+        print(f"Results saved to {result_file}")
+    if args.compare:
+        matches = sorted(glob.glob(os.path.join(RESULTS_DIR, f"{args.compare}*.json")))
+        if not matches:
+            sys.exit(f"No stored results for {args.compare}.")
+        with open(matches[0], 'r') as f:
+            baseline = json.load(f)
+        if compare(run, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
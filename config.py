@@ -1,7 +1,53 @@
-﻿import keyring
+﻿import json
 import logging
+import os
 from typing import Optional, Tuple
 
+logger = logging.getLogger(__name__)
+
+# Merkt sich das beim ersten Start gewählte Keyring-Backend, damit nicht bei jedem Start alle Backends geprüft werden
+KEYRING_BACKEND_CACHE = "keyring_backend.json"
+
+_keyring = None
+
+def get_keyring(cache_file: Optional[str] = KEYRING_BACKEND_CACHE):
+    """
+    Importiert keyring und setzt das zwischengespeicherte Backend, statt alle Backends (KWallet, SecretService,
+    Windows, macOS, ...) zu prüfen. Ist PYTHON_KEYRING_BACKEND gesetzt, bleibt die Auswahl bei keyring.
+
+    :param cache_file: Die Datei mit dem Namen des Backends (None: keinen Cache verwenden).
+    :return: Das keyring-Modul mit gesetztem Backend.
+    """
+    global _keyring
+    if _keyring is not None:
+        return _keyring
+    import keyring
+    from keyring.core import load_keyring
+    if cache_file is None or os.environ.get("PYTHON_KEYRING_BACKEND"):
+        _keyring = keyring
+        return keyring
+    try:
+        with open(cache_file, 'r') as f:
+            keyring.set_keyring(load_keyring(json.load(f)['backend']))
+        _keyring = keyring
+        return keyring
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("Ignoring cached keyring backend: %s", e)
+    backend = keyring.get_keyring()  # Prüft alle verfügbaren Backends (langsam)
+    name = f"{type(backend).__module__}.{type(backend).__qualname__}"
+    # Der Chainer prüft beim Laden erneut alle Backends, das Fail-Backend (Priorität 0) soll nicht dauerhaft gelten
+    if not name.startswith("keyring.backends.chainer") and backend.priority > 0:
+        try:
+            with open(cache_file, 'w') as f:
+                json.dump({'backend': name}, f)
+            logger.info("Cached keyring backend %s.", name)
+        except OSError as e:
+            logger.warning("Could not cache keyring backend: %s", e)
+    _keyring = keyring
+    return keyring
+
 def get_api_credentials() -> Tuple[Optional[str], Optional[str]]:
     """
     Lädt die API-Schlüssel aus einem sicheren Speicher (z. B. dem Schlüsselbund des Betriebssystems).
@@ -9,16 +55,17 @@ def get_api_credentials() -> Tuple[Optional[str], Optional[str]]:
     :return: Ein Tupel mit dem API-Schlüssel und dem API-Geheimnis. Falls keine Schlüssel gefunden werden, wird (None, None) zurückgegeben.
     """
     try:
+        keyring = get_keyring()
         api_key = keyring.get_password('kraken_bot', 'api_key')
         api_secret = keyring.get_password('kraken_bot', 'api_secret')
         if api_key and api_secret:
-            logging.info("API credentials loaded from keyring.")
+            logger.info("API credentials loaded from keyring.")
             return api_key, api_secret
         else:
-            logging.warning("No API credentials found in keyring.")
+            logger.warning("No API credentials found in keyring.")
             return None, None
     except Exception as e:
-        logging.error(f"Error loading API credentials: {e}")
+        logger.error("Error loading API credentials: %s", e)
         return None, None
 
 def save_api_credentials(api_key: str, api_secret: str) -> bool:
@@ -30,12 +77,13 @@ def save_api_credentials(api_key: str, api_secret: str) -> bool:
     :return: True, wenn die Schlüssel erfolgreich gespeichert wurden, sonst False.
     """
     try:
+        keyring = get_keyring()
         keyring.set_password('kraken_bot', 'api_key', api_key)
         keyring.set_password('kraken_bot', 'api_secret', api_secret)
-        logging.info("API credentials saved to keyring.")
+        logger.info("API credentials saved to keyring.")
         return True
     except Exception as e:
-        logging.error(f"Error saving API credentials: {e}")
+        logger.error("Error saving API credentials: %s", e)
         return False
 
 def prompt_for_api_credentials() -> Tuple[str, str]:
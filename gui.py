@@ -3,35 +3,53 @@ from tkinter import ttk, messagebox, simpledialog, filedialog
 import json
 import logging
 import sys
-import pystray
-from PIL import Image
+import threading
 from api_client import KrakenAPIClient
+from asset_pairs import UnknownPairError
 from models.portfolio import Portfolio
 from models.favorites import Favorites
 from utils import TextWidgetHandler
+from refresh_worker import MAX_REFRESH_WORKERS, RefreshWorker, fetch_portfolio_rows, build_row
+from market_stream import TickerStream
+from live_engine import LiveSignalEngine
+from order_book import OrderBookStream
+from rebalance import plan_rebalance, execute_rebalance
+from metrics import timed
+from profiler import PROFILER
 import csv
+import queue
+import time
+
+logger = logging.getLogger(__name__)
 
 class KrakenBotGUI:
-    def __init__(self, root, api_key: str, api_secret: str):
+    def __init__(self, root, api_key: str, api_secret: str, api_client=None):
         """
         Initialisiert die GUI mit den angegebenen API-Schlüsseln.
 
         :param root: Das Hauptfenster der Anwendung.
         :param api_key: Der API-Schlüssel für die Kraken API.
         :param api_secret: Das API-Geheimnis für die Kraken API.
+        :param api_client: Optional ein bereits erstellter Client, z. B. eine PaperExchange für Paper-Trading.
         """
         self.root = root
-        self.root.title("Kraken Bot")
+        self.paper_mode = hasattr(api_client, 'start_replay')  # PaperExchange (ohne paper_exchange/NumPy zu importieren)
+        self.root.title("Kraken Bot (Paper)" if self.paper_mode else "Kraken Bot")
         self.dark_mode = False
         self.update_interval = 60000  # Default: 60 seconds
         self.trading_fee = 0.0026  # Default trading fee: 0.26%
+        self.refresh_parallelism = MAX_REFRESH_WORKERS  # Ticker and trade history run in parallel per refresh
+        self.tree_render_interval = 500  # Minimum time between price-driven table redraws (ms)
+        self.console_max_lines = 1000  # Lines kept in the log console
 
         # Initialize API client with provided credentials
-        self.api_client = KrakenAPIClient(api_key, api_secret)
+        self.api_client = api_client if api_client is not None else KrakenAPIClient(api_key, api_secret)
+        if self.paper_mode:
+            self.api_client.set_trading_fee(self.trading_fee)
 
         # Initialize portfolio and favorites
         self.portfolio = Portfolio(portfolio_file="portfolio.json")
-        self.favorites = Favorites(favorites_file="favorites.json")
+        self.favorites = Favorites(favorites_file="favorites.json", asset_pairs=self.api_client.asset_pairs)
 
         # Create menu bar
         self.create_menu_bar()
@@ -44,6 +62,10 @@ class KrakenBotGUI:
         self.balance_label = ttk.Label(self.frame, text="Balance:")
         self.balance_label.grid(row=0, column=0, sticky=tk.W)
 
+        # API budget label (Kraken call counter)
+        self.budget_label = ttk.Label(self.frame, text="API Budget:")
+        self.budget_label.grid(row=0, column=1, sticky=tk.W)
+
         # Treeview for portfolio
         self.tree = ttk.Treeview(self.frame, columns=("pair", "available", "market_price", "buy_price", "current_value", "deviation"), show='headings')
         self.tree.heading("pair", text="Pair")
@@ -89,16 +111,46 @@ class KrakenBotGUI:
         self.console_output.grid(row=5, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S))
 
         # Add custom logging handler for GUI
-        text_handler = TextWidgetHandler(self.console_output)
+        text_handler = TextWidgetHandler(self.console_output, max_lines=self.console_max_lines, level=logging.INFO)
         text_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
         logging.getLogger().addHandler(text_handler)
 
-        # Start auto-update
-        self.update_balance()
-        self.auto_update()
+        # Streaming ticker feed (prices between the REST refreshes)
+        self.rows = {}
+        self.tree_items = {}
+        self.pending_rows = {}
+        self.render_job = None
+        self.last_render = 0.0
+        self.price_updates = queue.Queue()
+        self.live_engine = LiveSignalEngine(self.api_client, clock=self.api_client.clock.time) if self.paper_mode else LiveSignalEngine(self.api_client)
+        # WebSocket names follow once the pair metadata is loaded (load_metadata), so the window is not blocked
+        self.ticker_stream = TickerStream(self.favorites.get_favorites(), on_price=self.on_stream_price)
+        self.apply_price_updates()
+
+        # Local order books (slippage estimates before submitting a trade)
+        self.order_book_stream = OrderBookStream(self.favorites.get_favorites())
+        if self.paper_mode:
+            # Prices come from the replay; order books are simulated by the paper exchange
+            self.api_client.add_listener(self.on_stream_price)
+            self.api_client.start_replay()
+        else:
+            self.ticker_stream.start()
+            self.order_book_stream.start()
+            self.api_client.order_books = self.order_book_stream
+
+        # Background refresh worker (network I/O outside the Tk main thread)
+        self.refresh_worker = RefreshWorker(
+            self.root,
+            lambda executor: fetch_portfolio_rows(self.api_client, list(self.favorites.get_favorites()), executor, self.ticker_stream),
+            self.apply_balance,
+            max_workers=self.refresh_parallelism
+        )
 
-        # Tray Icon
-        self.create_tray_icon()
+        # Start auto-update once the window is shown; pair metadata loads in the background
+        self.icon = None  # Tray icon (pystray/PIL) is created on first minimize
+        threading.Thread(target=self.load_metadata, name="metadata", daemon=True).start()
+        self.root.after_idle(self.auto_update)
+        self.update_budget_label()
 
     def create_tooltip(self, widget, text):
         """
@@ -128,10 +180,23 @@ class KrakenBotGUI:
         widget.bind("<Enter>", enter)
         widget.bind("<Leave>", leave)
 
+    def load_metadata(self):
+        """
+        Lädt die Paar-Metadaten im Hintergrund, prüft die Favoriten und übergibt die WebSocket-Namen an die Streams.
+        """
+        if not self.api_client.asset_pairs.ensure_loaded():
+            return
+        for pair in self.favorites.invalid_favorites():
+            logger.warning("Favorite %s is not a Kraken trading pair.", pair)
+        self.set_stream_pairs(self.favorites.get_favorites())
+
     def create_tray_icon(self):
         """
         Erstellt ein Tray-Icon mit einem Menü.
         """
+        import pystray
+        from PIL import Image
+
         # Bild für das Tray-Icon (verwendet das konvertierte PNG)
         try:
             image = Image.open("icon.png")  # Pfad zum Icon-Bild
@@ -151,20 +216,30 @@ class KrakenBotGUI:
         Minimiert das Fenster in das System-Tray.
         """
         self.root.withdraw()  # Fenster verstecken
+        if self.icon is None:
+            self.create_tray_icon()
         self.icon.run()  # Tray-Icon starten
 
     def restore_window(self, icon=None, item=None):
         """
         Stellt das Fenster aus dem System-Tray wieder her.
         """
-        self.icon.stop()  # Tray-Icon beenden
+        if self.icon is not None:
+            self.icon.stop()  # Tray-Icon beenden
         self.root.deiconify()  # Fenster wiederherstellen
 
     def quit_app(self, icon=None, item=None):
         """
         Beendet die Anwendung.
         """
-        self.icon.stop()  # Tray-Icon beenden
+        if self.icon is not None:
+            self.icon.stop()  # Tray-Icon beenden
+        self.ticker_stream.stop()
+        if self.paper_mode:
+            self.api_client.stop_replay()
+        self.live_engine.stop()
+        self.order_book_stream.stop()
+        self.portfolio.close()
         self.root.quit()  # Anwendung beenden
 
     def create_menu_bar(self):
@@ -179,24 +254,41 @@ class KrakenBotGUI:
         settings_menu.add_command(label="Update API Credentials", command=self.update_api_credentials)
         settings_menu.add_command(label="Set Update Interval", command=self.set_update_interval)
         settings_menu.add_command(label="Set Trading Fee", command=self.set_trading_fee)
+        settings_menu.add_command(label="Set Refresh Parallelism", command=self.set_refresh_parallelism)
         settings_menu.add_command(label="Toggle Dark Mode", command=self.toggle_dark_mode)
+        settings_menu.add_command(label="Show API Metrics", command=self.open_metrics_window)
+        settings_menu.add_command(label="Start/Stop Profiler", command=self.toggle_profiler)
         menu_bar.add_cascade(label="Settings", menu=settings_menu)
 
+        # Live trading menu
+        self.live_armed = tk.BooleanVar(value=False)
+        live_menu = tk.Menu(menu_bar, tearoff=0)
+        live_menu.add_checkbutton(label="Arm Live Trading", variable=self.live_armed, command=self.toggle_live_trading)
+        live_menu.add_command(label="Set Live Order Volume", command=self.set_live_volume)
+        menu_bar.add_cascade(label="Live", menu=live_menu)
+
         # Favorites menu
         favorites_menu = tk.Menu(menu_bar, tearoff=0)
         favorites_menu.add_command(label="Import Favorites", command=self.import_favorites)
         favorites_menu.add_command(label="Export Favorites", command=self.export_favorites)
+        favorites_menu.add_command(label="Rebalance to Equal Weights", command=self.rebalance_favorites)
         menu_bar.add_cascade(label="Favorites", menu=favorites_menu)
 
     def update_api_credentials(self):
         """
         Aktualisiert die API-Schlüssel.
         """
+        if self.paper_mode:
+            logger.info("Paper trading mode: API credentials are not used.")
+            return
         api_key = simpledialog.askstring("Update API Key", "Enter new API Key:")
         api_secret = simpledialog.askstring("Update API Secret", "Enter new API Secret:")
         if api_key and api_secret:
-            self.api_client = KrakenAPIClient(api_key, api_secret)
-            logging.info("API credentials updated.")
+            self.api_client = KrakenAPIClient(api_key, api_secret, ledger=self.api_client.ledger, scheduler=self.api_client.scheduler,
+                                              asset_pairs=self.api_client.asset_pairs)
+            self.api_client.order_books = self.order_book_stream
+            self.live_engine.api_client = self.api_client
+            logger.info("API credentials updated.")
 
     def set_update_interval(self):
         """
@@ -205,7 +297,7 @@ class KrakenBotGUI:
         interval = simpledialog.askinteger("Set Update Interval", "Enter update interval (in seconds):", minvalue=10)
         if interval:
             self.update_interval = interval * 1000
-            logging.info(f"Update interval set to {interval} seconds.")
+            logger.info("Update interval set to %s seconds.", interval)
 
     def set_trading_fee(self):
         """
@@ -214,7 +306,46 @@ class KrakenBotGUI:
         fee = simpledialog.askfloat("Set Trading Fee", "Enter trading fee (e.g., 0.0026 for 0.26%):", minvalue=0)
         if fee is not None:
             self.trading_fee = fee
-            logging.info(f"Trading fee set to {fee * 100}%.")
+            if self.paper_mode:
+                self.api_client.set_trading_fee(fee)
+            logger.info("Trading fee set to %s%%.", fee * 100)
+
+    def set_refresh_parallelism(self):
+        """
+        Setzt die Anzahl paralleler API-Aufrufe pro Aktualisierung.
+        """
+        workers = simpledialog.askinteger("Set Refresh Parallelism", "Enter number of parallel API calls:", minvalue=1,
+                                          maxvalue=MAX_REFRESH_WORKERS)
+        if workers:
+            self.refresh_parallelism = workers
+            self.refresh_worker.set_max_workers(workers)
+
+    def toggle_live_trading(self):
+        """
+        Schaltet das Senden von Live-Orders durch die Signal-Engine ein oder aus.
+        """
+        if self.live_armed.get() and not messagebox.askyesno("Arm Live Trading", "Send real orders for live strategy signals?"):
+            self.live_armed.set(False)
+            return
+        self.live_engine.set_armed(self.live_armed.get())
+
+    def set_live_volume(self):
+        """
+        Setzt das Ordervolumen der Live-Orders für ein Paar.
+        """
+        pair = simpledialog.askstring("Set Live Order Volume", "Enter trading pair (e.g., XBTEUR):")
+        if not pair:
+            return
+        volume = simpledialog.askfloat("Set Live Order Volume", f"Enter order volume for {pair} (0 to disable):", minvalue=0)
+        if volume is not None:
+            self.live_engine.set_volume(pair, volume)
+
+    def on_stream_price(self, pair, price, timestamp=None):
+        """
+        Nimmt einen Preis aus dem Ticker-Stream (bzw. der Paper-Wiedergabe mit Marktzeit) entgegen (im Stream-Thread).
+        """
+        self.price_updates.put((pair, price))
+        self.live_engine.on_price(pair, price, timestamp)
 
     def toggle_dark_mode(self):
         """
@@ -225,24 +356,83 @@ class KrakenBotGUI:
         fg_color = "white" if self.dark_mode else "black"
         self.root.configure(bg=bg_color)
         self.console_output.configure(bg=bg_color, fg=fg_color)
-        logging.info(f"Dark mode {'enabled' if self.dark_mode else 'disabled'}.")
+        logger.info("Dark mode %s.", 'enabled' if self.dark_mode else 'disabled')
 
     def update_balance(self):
         """
-        Aktualisiert den Kontostand und zeigt ihn in der Tabelle an.
+        Startet die Aktualisierung des Kontostands im Hintergrund. Läuft noch eine Aktualisierung, wird keine weitere gestartet.
         """
-        favorites = self.favorites.get_favorites()
-        balance = self.api_client.check_balance(favorites)
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for base_currency, available in balance.items():
-            pair = f"{base_currency}EUR"
-            if pair in favorites and available > 0:
-                market_price = self.api_client.get_market_price(pair)
-                buy_price = self.api_client.get_buy_price(pair)
-                current_value = round(market_price * available, 2) if market_price else "N/A"
-                deviation = ((market_price - buy_price) / buy_price) * 100 if market_price and buy_price else "N/A"
-                self.tree.insert("", "end", values=(pair, available, market_price, buy_price, current_value, deviation))
+        self.refresh_worker.request_refresh()
+
+    @timed('apply_balance')
+    def apply_balance(self, rows):
+        """
+        Zeigt die im Hintergrund geladenen Portfolio-Daten in der Tabelle an (läuft im Tk-Thread).
+
+        Zeilen werden nur hinzugefügt oder entfernt, wenn sich die Bestände ändern; bestehende Zeilen
+        werden zellenweise aktualisiert, damit Auswahl und Scrollposition erhalten bleiben.
+
+        :param rows: Die Zeilen der Portfolio-Tabelle.
+        """
+        new_rows = {row[0]: row for row in rows}
+        for pair in list(self.tree_items):
+            if pair not in new_rows:
+                self.tree.delete(self.tree_items.pop(pair))
+                self.rows.pop(pair, None)
+                self.pending_rows.pop(pair, None)
+        for pair, row in new_rows.items():
+            if pair in self.tree_items:
+                self.pending_rows.pop(pair, None)
+                self.update_tree_row(pair, row)
+            else:
+                self.tree_items[pair] = self.tree.insert("", "end", values=row)
+                self.rows[pair] = row
+
+    def update_tree_row(self, pair, row):
+        """
+        Schreibt nur die Zellen einer Tabellenzeile neu, deren Werte sich geändert haben.
+
+        :param pair: Das HandelsPaar der Zeile.
+        :param row: Die neuen Werte der Zeile.
+        """
+        item = self.tree_items[pair]
+        old_row = self.rows.get(pair, ())
+        for index, column in enumerate(self.tree["columns"]):
+            if index >= len(old_row) or old_row[index] != row[index]:
+                self.tree.set(item, column, row[index])
+        self.rows[pair] = row
+
+    def apply_price_updates(self):
+        """
+        Übernimmt die Preisänderungen des Ticker-Streams (läuft im Tk-Thread).
+
+        Mehrere Änderungen eines Paares werden zusammengefasst und höchstens alle tree_render_interval
+        Millisekunden in die Tabelle geschrieben.
+        """
+        try:
+            while True:
+                pair, price = self.price_updates.get_nowait()
+                row = self.pending_rows.get(pair, self.rows.get(pair))
+                if row is not None:
+                    pair, available, _, buy_price, _, _ = row
+                    self.pending_rows[pair] = build_row(pair, available, price, buy_price)
+        except queue.Empty:
+            pass
+        if self.pending_rows and self.render_job is None:
+            delay = max(0, int((self.last_render - time.monotonic()) * 1000) + self.tree_render_interval)
+            self.render_job = self.root.after(delay, self.flush_tree_updates)
+        self.root.after(250, self.apply_price_updates)
+
+    def flush_tree_updates(self):
+        """
+        Schreibt die gesammelten Preisänderungen in die Tabelle.
+        """
+        self.render_job = None
+        self.last_render = time.monotonic()
+        pending_rows, self.pending_rows = self.pending_rows, {}
+        for pair, row in pending_rows.items():
+            if pair in self.tree_items:
+                self.update_tree_row(pair, row)
 
     def auto_update(self):
         """
@@ -251,6 +441,14 @@ class KrakenBotGUI:
         self.update_balance()
         self.root.after(self.update_interval, self.auto_update)
 
+    def update_budget_label(self):
+        """
+        Zeigt das verbleibende Budget des Kraken-Aufrufzählers an.
+        """
+        available, capacity = self.api_client.scheduler.get_budget()
+        self.budget_label.config(text=f"API Budget: {available:.1f}/{capacity}")
+        self.root.after(1000, self.update_budget_label)
+
     def export_portfolio(self):
         """
         Exportiert das Portfolio in eine CSV-Datei.
@@ -263,7 +461,40 @@ class KrakenBotGUI:
                 for row_id in self.tree.get_children():
                     row = self.tree.item(row_id)['values']
                     writer.writerow(row)
-            logging.info("Portfolio exported to CSV.")
+            logger.info("Portfolio exported to CSV.")
+
+    def toggle_profiler(self):
+        """
+        Startet den Stichproben-Profiler für alle Threads (stoppt nach PROFILER.duration Sekunden) bzw. beendet ihn.
+        """
+        if PROFILER.running:
+            logger.info("Stopping profiler...")
+        PROFILER.toggle()
+
+    def open_metrics_window(self):
+        """
+        Öffnet eine Statusanzeige mit Latenzen, Fehlern und Rate-Limit-Ablehnungen je API-Endpunkt.
+        """
+        metrics_window = tk.Toplevel(self.root)
+        metrics_window.title("API Metrics")
+
+        columns = ("endpoint", "requests", "errors", "rate_limited", "avg", "p50", "p95")
+        tree = ttk.Treeview(metrics_window, columns=columns, show='headings', height=12)
+        for column, heading in zip(columns, ("Endpoint", "Requests", "Errors", "Rate Limited", "Avg (ms)", "p50 (ms)", "p95 (ms)")):
+            tree.heading(column, text=heading)
+            tree.column(column, width=110 if column == "endpoint" else 80, anchor=tk.W if column == "endpoint" else tk.E)
+        tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=10)
+
+        def refresh():
+            if not metrics_window.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for row in self.api_client.metrics.snapshot():
+                milliseconds = [f"{row[key] * 1000:.0f}" if row[key] is not None else "" for key in ("avg", "p50", "p95")]
+                tree.insert("", tk.END, values=(row['endpoint'], row['requests'], row['errors'], row['rate_limited'], *milliseconds))
+            metrics_window.after(2000, refresh)
+
+        refresh()
 
     def open_favorites_window(self):
         """
@@ -297,10 +528,16 @@ class KrakenBotGUI:
         """
         new_favorite = simpledialog.askstring("Add Favorite", "Enter the new favorite pair:")
         if new_favorite:
+            try:
+                new_favorite = self.favorites.normalize_pair(new_favorite)
+            except ValueError:
+                messagebox.showerror("Error", f"{new_favorite} is not a Kraken trading pair.")
+                return
             self.favorites_listbox.insert(tk.END, new_favorite)
             favorites = list(self.favorites_listbox.get(0, tk.END))
             self.favorites.favorites = favorites  # Aktualisiere die Favoritenliste
             self.favorites.save_favorites()  # Speichere die aktualisierte Liste
+            self.set_stream_pairs(favorites)
 
     def remove_favorite(self):
         """
@@ -312,6 +549,15 @@ class KrakenBotGUI:
         favorites = list(self.favorites_listbox.get(0, tk.END))
         self.favorites.favorites = favorites  # Aktualisiere die Favoritenliste
         self.favorites.save_favorites()  # Speichere die aktualisierte Liste
+        self.set_stream_pairs(favorites)
+
+    def set_stream_pairs(self, favorites):
+        """
+        Übernimmt geänderte Favoriten in den Ticker- und den Orderbuch-Stream.
+        """
+        ws_names = self.api_client.asset_pairs.ws_names(favorites)
+        self.ticker_stream.set_pairs(favorites, ws_names)
+        self.order_book_stream.set_pairs(favorites, ws_names)
 
     def open_trade_window(self):
         """
@@ -335,25 +581,141 @@ class KrakenBotGUI:
         side_entry = ttk.Entry(frame, width=20)
         side_entry.grid(row=2, column=1, sticky=tk.W)
 
+        estimate_label = ttk.Label(frame, text="")
+        estimate_label.grid(row=4, column=0, columnspan=2, sticky=tk.W)
+
+        estimate_button = ttk.Button(frame, text="Estimate", command=lambda: self.estimate_trade(pair_entry.get(), volume_entry.get(), side_entry.get(), estimate_label))
+        estimate_button.grid(row=3, column=0, pady=10)
+        self.create_tooltip(estimate_button, "Schätzt Durchschnittspreis und Slippage aus dem Orderbuch.")
+
         execute_button = ttk.Button(frame, text="Execute", command=lambda: self.execute_trade(pair_entry.get(), volume_entry.get(), side_entry.get()))
-        execute_button.grid(row=3, column=0, columnspan=2, pady=10)
+        execute_button.grid(row=3, column=1, pady=10)
+
+    def estimate_trade(self, pair, volume, side, label):
+        """
+        Zeigt den erwarteten Durchschnittspreis und die Slippage eines Trades im Trade-Fenster an.
+
+        Fehlt das lokale Orderbuch, lädt estimate_fill einen REST-Snapshot; das geschieht im Hintergrund.
+        """
+        try:
+            volume_float = float(volume)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid volume. Please enter a number.")
+            return
+        if side.lower() not in ['buy', 'sell']:
+            messagebox.showerror("Error", "Side must be 'buy' or 'sell'.")
+            return
+        label.config(text="Estimating...")
+        self.run_in_background(lambda: self.api_client.estimate_fill(pair, volume_float, side.lower()),
+                               lambda estimate, error: self.show_estimate(label, estimate), name="estimate")
+
+    def show_estimate(self, label, estimate):
+        """
+        Zeigt das Ergebnis von estimate_fill im Trade-Fenster an (läuft im Tk-Thread).
+        """
+        if not label.winfo_exists():
+            return
+        if estimate is None or estimate['average_price'] is None:
+            label.config(text="No order book data available.")
+            return
+        text = f"Avg. price: {estimate['average_price']:.8g}  Slippage: {estimate['slippage'] * 100:.3f}%"
+        if not estimate['complete']:
+            text += f"  (book depth covers only {estimate['filled_volume']:.8g})"
+        label.config(text=text)
 
     def execute_trade(self, pair, volume, side):
         """
-        Führt einen Trade aus.
+        Führt einen Trade aus; die Order wird im Hintergrund gesendet, damit das Fenster bedienbar bleibt.
         """
         try:
             volume_float = float(volume)
-            if side.lower() not in ['buy', 'sell']:
-                messagebox.showerror("Error", "Side must be 'buy' or 'sell'.")
-                return
-            result = self.api_client.execute_trade(pair, volume_float, side.lower())
-            if result:
-                messagebox.showinfo("Success", f"Trade executed: {result}")
-            else:
-                messagebox.showerror("Error", "Failed to execute trade.")
         except ValueError:
             messagebox.showerror("Error", "Volume must be a number.")
+            return
+        if side.lower() not in ['buy', 'sell']:
+            messagebox.showerror("Error", "Side must be 'buy' or 'sell'.")
+            return
+        self.run_in_background(lambda: self.api_client.execute_trade(pair, volume_float, side.lower()),
+                               lambda result, error: self.show_trade_result(pair, result, error), name="execute-trade")
+
+    def show_trade_result(self, pair, result, error):
+        """
+        Zeigt das Ergebnis eines im Hintergrund gesendeten Trades an (im Tk-Thread).
+        """
+        if isinstance(error, UnknownPairError):
+            messagebox.showerror("Error", f"{pair} is not a Kraken trading pair.")
+        elif error is not None:
+            messagebox.showerror("Error", f"Failed to execute trade: {error}")
+        elif result:
+            messagebox.showinfo("Success", f"Trade executed: {result}")
+        else:
+            messagebox.showerror("Error", "Failed to execute trade.")
+
+    def run_in_background(self, work, on_done, name="gui-task"):
+        """
+        Führt Netzwerkaufrufe außerhalb des Tk-Threads aus und übergibt das Ergebnis per root.after an on_done.
+
+        :param work: Funktion ohne Argumente, die im Hintergrund läuft.
+        :param on_done: Wird im Tk-Thread mit (Ergebnis, Fehler) aufgerufen; einer der beiden ist None.
+        :param name: Der Name des Hintergrund-Threads.
+        """
+        def run():
+            try:
+                result, error = work(), None
+            except Exception as e:
+                logger.error("Error in background task %s: %s", name, e)
+                result, error = None, e
+            self.root.after(0, on_done, result, error)
+        threading.Thread(target=run, name=name, daemon=True).start()
+
+    def rebalance_favorites(self):
+        """
+        Verteilt das Portfolio gleichmäßig auf alle Favoriten (nach Bestätigung der geplanten Orders).
+
+        Kontostand, Preise und Orders werden im Hintergrund abgefragt bzw. gesendet, damit das Fenster bedienbar bleibt.
+        """
+        favorites = list(self.favorites.get_favorites())
+        if not favorites:
+            messagebox.showerror("Error", "No favorites to rebalance.")
+            return
+
+        def plan():
+            # Für die Orderplanung keine zwischengespeicherten Antworten (Schutzschalter) verwenden
+            balance = self.api_client.check_balance(favorites, fresh=True)
+            holdings = {f"{base_currency}EUR": available for base_currency, available in balance.items()}
+            prices = self.api_client.get_market_prices(favorites, fresh=True)
+            cash = self.api_client.get_cash_balance("EUR", fresh=True)
+            return plan_rebalance(holdings, prices, {pair: 1.0 / len(favorites) for pair in favorites}, cash, fee=self.trading_fee)
+        self.run_in_background(plan, self.confirm_rebalance, name="rebalance-plan")
+
+    def confirm_rebalance(self, orders, error):
+        """
+        Zeigt die geplanten Orders an und sendet sie nach Bestätigung im Hintergrund.
+        """
+        if error is not None:
+            messagebox.showerror("Rebalance", f"Failed to plan rebalance: {error}")
+            return
+        if not orders:
+            messagebox.showinfo("Rebalance", "Portfolio is already balanced.")
+            return
+        summary = "\n".join(f"{order['side']} {order['volume']} {order['pair']} (~{order['value']:.2f} EUR)" for order in orders)
+        if not messagebox.askyesno("Rebalance", f"Send these orders?\n\n{summary}"):
+            return
+        self.run_in_background(lambda: execute_rebalance(self.api_client, orders), self.show_rebalance_results, name="rebalance-orders")
+
+    def show_rebalance_results(self, results, error):
+        """
+        Meldet das Ergebnis des Rebalancings und aktualisiert die Tabelle.
+        """
+        if error is not None:
+            messagebox.showerror("Rebalance", f"Rebalance failed: {error}")
+        else:
+            failed = [leg for leg in results if not leg['ok']]
+            if failed:
+                messagebox.showerror("Rebalance", "\n".join(f"{leg['side']} {leg['pair']}: {leg['error']}" for leg in failed))
+            else:
+                messagebox.showinfo("Rebalance", f"{len(results)} orders placed.")
+        self.update_balance()
 
     def import_favorites(self):
         """
@@ -366,10 +728,13 @@ class KrakenBotGUI:
                     favorites = json.load(f)
                     self.favorites.favorites = favorites  # Aktualisiere die Favoritenliste
                     self.favorites.save_favorites()  # Speichere die aktualisierte Liste
-                    logging.info(f"Favorites imported from {file_path}")
+                    self.set_stream_pairs(favorites)
+                    for pair in self.favorites.invalid_favorites():
+                        logger.warning("Favorite %s is not a Kraken trading pair.", pair)
+                    logger.info("Favorites imported from %s", file_path)
                     messagebox.showinfo("Success", "Favorites imported successfully.")
             except Exception as e:
-                logging.error(f"Error importing favorites: {e}")
+                logger.error("Error importing favorites: %s", e)
                 messagebox.showerror("Error", f"Failed to import favorites: {e}")
 
     def export_favorites(self):
@@ -382,8 +747,8 @@ class KrakenBotGUI:
                 favorites = self.favorites.get_favorites()
                 with open(file_path, 'w') as f:
                     json.dump(favorites, f, indent=4)
-                logging.info(f"Favorites exported to {file_path}")
+                logger.info("Favorites exported to %s", file_path)
                 messagebox.showinfo("Success", "Favorites exported successfully.")
             except Exception as e:
-                logging.error(f"Error exporting favorites: {e}")
+                logger.error("Error exporting favorites: %s", e)
                 messagebox.showerror("Error", f"Failed to export favorites: {e}")
\ No newline at end of file
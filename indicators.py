@@ -0,0 +1,134 @@
+﻿import math
+from typing import Optional
+
+class RingBuffer:
+    def __init__(self, size: int):
+        """
+        Initialisiert einen Ringpuffer fester Größe ohne Allokation pro Wert.
+
+        :param size: Die Anzahl gespeicherter Werte.
+        """
+        self.values = [0.0] * size  # Liste statt NumPy: schneller für Einzelwerte, kein NumPy-Import beim Start
+        self.size = size
+        self.count = 0
+        self.index = 0
+
+    def push(self, value: float) -> Optional[float]:
+        """
+        Fügt einen Wert hinzu.
+
+        :return: Der verdrängte Wert oder None, solange der Puffer noch nicht voll ist.
+        """
+        evicted = self.values[self.index] if self.full else None
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        return evicted
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+class SMA:
+    def __init__(self, period: int):
+        """
+        Einfacher gleitender Durchschnitt mit laufender Summe (O(1) pro Wert).
+
+        :param period: Die Periode des Durchschnitts.
+        """
+        self.period = period
+        self.buffer = RingBuffer(period)
+        self.total = 0.0
+        self.value = None
+
+    def update(self, price: float) -> Optional[float]:
+        """
+        Nimmt einen neuen Wert auf.
+
+        :return: Der aktuelle Durchschnitt oder None, solange noch weniger als period Werte vorliegen.
+        """
+        evicted = self.buffer.push(price)
+        self.total += price - (evicted if evicted is not None else 0.0)
+        if self.buffer.index == 0:
+            # Einmal pro Umlauf neu aufsummieren, damit sich Rundungsfehler nicht aufaddieren
+            self.total = math.fsum(self.buffer.values[:self.buffer.count])
+        self.value = self.total / self.period if self.buffer.full else None
+        return self.value
+
+class EMA:
+    def __init__(self, period: int):
+        """
+        Exponentieller gleitender Durchschnitt; wie bei backtrader mit dem SMA der ersten period Werte initialisiert.
+
+        :param period: Die Periode des Durchschnitts.
+        """
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.seed = SMA(period)
+        self.value = None
+
+    def update(self, price: float) -> Optional[float]:
+        if self.value is None:
+            self.value = self.seed.update(price)
+        else:
+            self.value += self.alpha * (price - self.value)
+        return self.value
+
+class WilderAverage:
+    def __init__(self, period: int):
+        """
+        Geglätteter Durchschnitt nach Wilder (alpha = 1 / period), mit dem SMA der ersten period Werte initialisiert.
+        """
+        self.period = period
+        self.seed = SMA(period)
+        self.value = None
+
+    def update(self, value: float) -> Optional[float]:
+        if self.value is None:
+            self.value = self.seed.update(value)
+        else:
+            self.value += (value - self.value) / self.period
+        return self.value
+
+class RSI:
+    def __init__(self, period: int = 14):
+        """
+        Relative Strength Index nach Wilder.
+
+        :param period: Die Periode der Glättung.
+        """
+        self.period = period
+        self.gains = WilderAverage(period)
+        self.losses = WilderAverage(period)
+        self.previous = None
+        self.value = None
+
+    def update(self, price: float) -> Optional[float]:
+        if self.previous is not None:
+            change = price - self.previous
+            gain = self.gains.update(max(change, 0.0))
+            loss = self.losses.update(max(-change, 0.0))
+            if gain is not None:
+                self.value = 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+        self.previous = price
+        return self.value
+
+class ATR:
+    def __init__(self, period: int = 14):
+        """
+        Average True Range nach Wilder; wird mit abgeschlossenen Bars (high, low, close) aktualisiert.
+
+        :param period: Die Periode der Glättung.
+        """
+        self.period = period
+        self.average = WilderAverage(period)
+        self.previous_close = None
+        self.value = None
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        true_range = high - low
+        if self.previous_close is not None:
+            true_range = max(true_range, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+        self.value = self.average.update(true_range)
+        return self.value
@@ -0,0 +1,119 @@
+﻿import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from live_engine import LiveSignalEngine
+from market_stream import TickerStream
+from profiler import PROFILER
+from refresh_worker import MAX_REFRESH_WORKERS, clamp_workers, fetch_portfolio_rows
+
+logger = logging.getLogger(__name__)
+
+class HeadlessBot:
+    def __init__(self, api_client, favorites: List[str], update_interval: float = 60.0, max_workers: int = MAX_REFRESH_WORKERS,
+                 volumes: Optional[Dict[str, float]] = None):
+        """
+        Betreibt Aktualisierung, Logging und Live-Strategie ohne Tk, Tray-Icon oder Display (Server-Betrieb).
+
+        Lädt weder tkinter noch pystray oder PIL; die Portfolio-Zeilen werden wie im RefreshWorker der GUI
+        berechnet und nur protokolliert.
+
+        :param api_client: Der KrakenAPIClient (oder eine PaperExchange).
+        :param favorites: Die Liste der Favoriten-Paare.
+        :param update_interval: Das Aktualisierungsintervall in Sekunden.
+        :param max_workers: Die Anzahl paralleler API-Aufrufe pro Aktualisierung (höchstens MAX_REFRESH_WORKERS).
+        :param volumes: Paar -> Ordervolumen für die Live-Strategie.
+        """
+        self.api_client = api_client
+        self.favorites = list(favorites)
+        self.update_interval = update_interval
+        self.paper_mode = hasattr(api_client, 'start_replay')
+        clock = {'clock': api_client.clock.time} if self.paper_mode else {}
+        self.live_engine = LiveSignalEngine(api_client, volumes=volumes, **clock)
+        ws_names = api_client.asset_pairs.ws_names(self.favorites)
+        self.ticker_stream = TickerStream(self.favorites, on_price=self.on_price, ws_names=dict(ws_names))
+        self.executor = ThreadPoolExecutor(max_workers=clamp_workers(max_workers), thread_name_prefix="refresh")
+        self.stop_event = threading.Event()
+        self.last_rows = []
+
+    def on_price(self, pair: str, price: float, timestamp: Optional[float] = None):
+        """
+        Nimmt einen Preis aus dem Ticker-Stream (bzw. der Paper-Wiedergabe) entgegen.
+        """
+        self.live_engine.on_price(pair, price, timestamp)
+
+    def refresh(self) -> List:
+        """
+        Führt eine Aktualisierung aus und protokolliert den Portfoliowert.
+
+        :return: Die Zeilen (pair, available, market_price, buy_price, current_value, deviation).
+        """
+        try:
+            rows = fetch_portfolio_rows(self.api_client, self.favorites, self.executor, self.ticker_stream)
+        except Exception as e:
+            logger.error("Error refreshing portfolio: %s", e)
+            return self.last_rows
+        total = sum(row[4] for row in rows if isinstance(row[4], (int, float)))
+        logger.info("Portfolio refreshed: %s positions, value %.2f EUR.", len(rows), total)
+        self.last_rows = rows
+        return rows
+
+    def run(self):
+        """
+        Startet die Preisquellen und aktualisiert im Intervall, bis stop() aufgerufen wird.
+        """
+        if self.paper_mode:
+            self.api_client.add_listener(self.on_price)
+            self.api_client.start_replay()
+        else:
+            self.ticker_stream.start()
+        while not self.stop_event.is_set():
+            self.refresh()
+            self.stop_event.wait(self.update_interval)
+        self._shutdown()
+
+    def stop(self, *args):
+        """
+        Beendet die Schleife (auch als Signal-Handler verwendbar).
+        """
+        self.stop_event.set()
+
+    def _shutdown(self):
+        if self.paper_mode:
+            self.api_client.stop_replay()
+        self.ticker_stream.stop()
+        self.live_engine.stop()
+        self.executor.shutdown(wait=False)
+        logger.info("Headless bot stopped.")
+
+def run_headless(api_client, favorites: List[str], update_interval: float = 60.0, arm: bool = False,
+                 volumes: Optional[Dict[str, float]] = None, on_started=None) -> HeadlessBot:
+    """
+    Startet den Headless-Betrieb im aufrufenden Thread; SIGINT/SIGTERM beenden ihn sauber, SIGUSR1 startet bzw.
+    beendet den Stichproben-Profiler.
+
+    :param api_client: Der KrakenAPIClient (oder eine PaperExchange).
+    :param favorites: Die Liste der Favoriten-Paare.
+    :param update_interval: Das Aktualisierungsintervall in Sekunden.
+    :param arm: True, um Orders der Live-Strategie zu senden (nur für Paare mit Ordervolumen).
+    :param volumes: Paar -> Ordervolumen für die Live-Strategie.
+    :param on_started: Optional ein Callback, der nach dem Aufbau (vor der ersten Aktualisierung) aufgerufen wird.
+    :return: Der beendete HeadlessBot.
+    """
+    bot = HeadlessBot(api_client, favorites, update_interval=update_interval, volumes=volumes)
+    if arm:
+        bot.live_engine.set_armed(True)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, bot.stop)
+        signal.signal(signal.SIGTERM, bot.stop)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda *args: PROFILER.toggle())  # kill -USR1 <pid> startet/stoppt den Profiler
+    if on_started is not None:
+        on_started()
+    bot.run()
+    return bot
+
+if __name__ == '__main__':
+    from main import main
+    main()
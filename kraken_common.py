@@ -0,0 +1,104 @@
+﻿import logging
+from typing import Callable, Dict, Iterable
+from asset_pairs import AssetPairs, UnknownPairError
+
+logger = logging.getLogger(__name__)
+
+def _pair_altname(pair: str) -> str:
+    """
+    Wandelt einen kanonischen Kraken-Paarnamen in den Kurznamen um (z. B. 'XXBTZEUR' -> 'XBTEUR').
+
+    Nur ein Rückfall, wenn die AssetPairs-Metadaten nicht verfügbar sind (siehe pair_altname).
+
+    :param pair: Der Paarname, wie ihn Kraken zurückliefert.
+    :return: Der Paarname ohne die X/Z-Präfixe der Legacy-Assets.
+    """
+    if len(pair) == 8 and pair[0] in "XZ" and pair[4] in "XZ":
+        return pair[1:4] + pair[5:]
+    return pair
+
+def pair_altname(asset_pairs: AssetPairs, pair: str) -> str:
+    """
+    Gibt den Kurznamen eines Paares aus den AssetPairs-Metadaten zurück (z. B. 'XXBTZEUR' -> 'XBTEUR');
+    nur ohne Metadaten oder für dort unbekannte Paare wird die X/Z-Heuristik verwendet.
+    """
+    return asset_pairs.altname(pair) or _pair_altname(pair)
+
+def parse_balance(result: Dict[str, str], favorites: Iterable[str], asset_pairs: AssetPairs,
+                  use_metadata: bool) -> Dict[str, float]:
+    """
+    Filtert das Ergebnis einer Balance-Anfrage auf die Assets der Favoriten-Paare.
+
+    :param result: Das 'result'-Dictionary der Kraken-Antwort (Asset -> Betrag).
+    :param favorites: Die Favoriten-Paare (z. B. ['ADAEUR', 'XBTEUR']).
+    :param asset_pairs: Der Cache der Paar-/Asset-Metadaten.
+    :param use_metadata: True, wenn die Metadaten geladen sind; sonst wird '<Asset>EUR' angenommen.
+    :return: Die Beträge je Asset (Kurzname, z. B. 'XBT'); Kleinstbeträge fehlen.
+    """
+    valid_balance = {}
+    if use_metadata:
+        favorites = {asset_pairs.altname(pair) or pair for pair in favorites}
+    for asset, amount in result.items():
+        if use_metadata:
+            # Legacy-Codes wie 'XXBT' über die Metadaten auf das EUR-Paar ('XBTEUR') abbilden
+            pair = asset_pairs.pair_for_asset(asset, "EUR")
+            if pair is None:
+                logger.debug("No EUR pair for asset %s, skipping it.", asset)
+                continue
+            asset = asset_pairs.asset_altname(asset)
+        else:
+            pair = f"{asset}EUR"
+        if pair in favorites:
+            try:
+                amount_float = float(amount)
+                if amount_float >= 0.0001:
+                    valid_balance[asset] = amount_float
+            except ValueError:
+                logger.warning("Invalid value for %s: %s", asset, amount)
+    return valid_balance
+
+def ticker_prices(requested: Dict[str, str], results: Dict[str, Dict], altname: Callable[[str], str]) -> Dict[str, float]:
+    """
+    Bildet das Ergebnis einer Ticker-Sammelabfrage auf die angefragten Paare ab.
+
+    Kraken liefert die Ergebnisse unter den kanonischen Paarnamen (z. B. 'XXBTZEUR' für 'XBTEUR').
+
+    :param requested: Die angefragten Paare (übergebener Name -> Name in der Anfrage).
+    :param results: Das 'result'-Dictionary der Kraken-Antwort.
+    :param altname: Liefert den Kurznamen zu einem Paarnamen (siehe pair_altname).
+    :return: Die Marktpreise je übergebenem Paar. Paare ohne Preis fehlen im Ergebnis.
+    """
+    prices = {}
+    unmatched = [pair for pair in requested if requested[pair] not in results]
+    by_altname = {altname(key): key for key in results if key not in requested.values()}
+    for pair, query_name in requested.items():
+        key = query_name if query_name in results else by_altname.get(altname(query_name))
+        if key is None and len(unmatched) == 1 and len(by_altname) == 1:
+            key = next(iter(by_altname.values()))
+        if key is None:
+            logger.warning("No ticker data returned for %s.", pair)
+            continue
+        prices[pair] = float(results[key]['c'][0])
+    return prices
+
+def order_fields(asset_pairs: AssetPairs, order: Dict) -> Dict:
+    """
+    Erzeugt die AddOrder-Felder einer Order; Volumen und Preis werden mit den zulässigen Nachkommastellen
+    des Paares formatiert, unbekannte Paare werden ohne Anfrage abgelehnt.
+
+    :param asset_pairs: Der Cache der Paar-/Asset-Metadaten.
+    :param order: Die Order mit 'pair', 'volume', 'side' und optional 'ordertype' und 'price'.
+    :raises UnknownPairError: Wenn das Paar laut den Metadaten nicht existiert.
+    """
+    pair = order['pair']
+    known = asset_pairs.ensure_loaded()
+    if known and not asset_pairs.is_valid_pair(pair):
+        raise UnknownPairError(f"Unknown trading pair: {pair}")
+    fields = {
+        'type': order['side'],
+        'ordertype': order.get('ordertype', 'market'),
+        'volume': asset_pairs.format_volume(pair, order['volume']) if known else str(order['volume']),
+    }
+    if 'price' in order:
+        fields['price'] = asset_pairs.format_price(pair, order['price']) if known else str(order['price'])
+    return fields
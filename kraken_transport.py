@@ -0,0 +1,35 @@
+﻿import threading
+import time
+import krakenex
+
+class ThreadSafeKrakenAPI(krakenex.API):
+    """
+    krakenex.API für parallele Aufrufe aus mehreren Threads: streng monoton steigende Nonces und keine
+    über self.response geteilte Antwort zwischen gleichzeitig laufenden Anfragen. Private Aufrufe werden
+    nacheinander gesendet, damit ihre Nonces Kraken in aufsteigender Reihenfolge erreichen (sonst
+    EAPI:Invalid nonce); öffentliche Aufrufe laufen weiterhin parallel.
+    """
+    def __init__(self, key: str = '', secret: str = ''):
+        super().__init__(key=key, secret=secret)
+        self._nonce_lock = threading.Lock()
+        self._last_nonce = 0
+        self._private_lock = threading.Lock()
+
+    def _nonce(self) -> int:
+        with self._nonce_lock:
+            self._last_nonce = max(self._last_nonce + 1, int(time.time() * 1000))
+            return self._last_nonce
+
+    def query_private(self, method, data=None, timeout=None):
+        with self._private_lock:
+            return super().query_private(method, data, timeout=timeout)
+
+    def _query(self, urlpath, data, headers=None, timeout=None):
+        url = self.uri + urlpath
+        if '/public/' in urlpath:
+            response = self.session.get(url, params=data or {}, headers=headers or {}, timeout=timeout)
+        else:
+            response = self.session.post(url, data=data or {}, headers=headers or {}, timeout=timeout)
+        if response.status_code not in (200, 201, 202):
+            response.raise_for_status()
+        return response.json(**self._json_options)
@@ -0,0 +1,149 @@
+﻿import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+from strategy import SmaThresholdStrategy, BUY, SELL
+
+logger = logging.getLogger(__name__)
+
+class LiveSignalEngine:
+    def __init__(self, api_client, strategy_factory: Callable[[], object] = SmaThresholdStrategy,
+                 interval: int = 60, volumes: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialisiert die Live-Signal-Engine.
+
+        Ticks aus dem Ticker-Stream werden zu Bars des angegebenen Intervalls zusammengefasst; jeder
+        abgeschlossene Bar wird an die Strategie des Paares übergeben. Orders werden nur über
+        KrakenAPIClient.execute_trade gesendet, wenn die Engine scharf geschaltet ist und für das Paar
+        ein Ordervolumen hinterlegt ist; sonst wird das Signal nur protokolliert. Je Paar wird die Seite der
+        letzten gesendeten Order gemerkt: solange ein Kaufsignal anhält, wird nur einmal gekauft, und verkauft
+        wird nur, was die Engine selbst gekauft hat. Nach einer abgelehnten Order wird dasselbe Signal erst
+        nach dem nächsten Signalwechsel erneut gesendet.
+
+        :param api_client: Der KrakenAPIClient, über den Orders ausgeführt werden.
+        :param strategy_factory: Erzeugt eine Strategie-Instanz pro Paar (Standard: SmaThresholdStrategy).
+        :param interval: Die Länge eines Bars in Sekunden.
+        :param volumes: Paar -> Ordervolumen für die Live-Orders.
+        :param clock: Die Zeitquelle für Ticks ohne Zeitstempel.
+        """
+        self.api_client = api_client
+        self.strategy_factory = strategy_factory
+        self.interval = interval
+        self.volumes = dict(volumes or {})
+        self.clock = clock
+        self.armed = False
+        self.strategies = {}
+        self.bars = {}  # pair -> [bucket, open, high, low, close]
+        self.signals = deque(maxlen=100)  # (time, pair, signal, order_sent)
+        self.positions = {}  # pair -> BUY/SELL der letzten gesendeten Order
+        self.rejected = {}  # pair -> Signal der zuletzt abgelehnten Order, bis zum nächsten Signalwechsel
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-orders")
+
+    def set_armed(self, armed: bool):
+        """
+        Schaltet das Senden von Orders ein oder aus.
+        """
+        self.armed = armed
+        logger.warning("Live trading %s.", 'ARMED' if armed else 'disarmed')
+
+    def set_volume(self, pair: str, volume: float):
+        """
+        Setzt das Ordervolumen eines Paares; 0 entfernt es.
+        """
+        with self.lock:
+            if volume > 0:
+                self.volumes[pair] = volume
+            else:
+                self.volumes.pop(pair, None)
+        logger.info("Live order volume for %s set to %s.", pair, volume)
+
+    def warmup(self, pair: str, closes: Iterable[float]):
+        """
+        Füllt die Indikatoren eines Paares mit historischen Schlusskursen, ohne Orders auszulösen.
+        """
+        with self.lock:
+            strategy = self._strategy(pair)
+            for close in closes:
+                strategy.on_bar(close, close, close, close)
+
+    def on_price(self, pair: str, price: float, timestamp: Optional[float] = None):
+        """
+        Verarbeitet einen Tick; kann aus dem Stream-Thread aufgerufen werden.
+
+        :param pair: Das HandelsPaar.
+        :param price: Der aktuelle Preis.
+        :param timestamp: Die Zeit des Ticks in Sekunden (Standard: clock()).
+        """
+        bucket = int((timestamp if timestamp is not None else self.clock()) // self.interval)
+        with self.lock:
+            bar = self.bars.get(pair)
+            if bar is None or bucket > bar[0]:
+                signal = self._strategy(pair).on_bar(*bar[1:]) if bar is not None else None
+                self.bars[pair] = [bucket, price, price, price, price]
+                if bar is not None and signal != self.rejected.get(pair):
+                    self.rejected.pop(pair, None)
+            else:
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                signal = None
+            volume = self.volumes.get(pair)
+        if signal in (BUY, SELL):
+            self._emit(pair, signal, volume)
+
+    def _strategy(self, pair: str):
+        if pair not in self.strategies:
+            self.strategies[pair] = self.strategy_factory()
+        return self.strategies[pair]
+
+    def _emit(self, pair: str, signal: int, volume: Optional[float]):
+        """
+        Sendet die Order zu einem Signal, sofern die Engine scharf geschaltet ist.
+        """
+        side = 'buy' if signal == BUY else 'sell'
+        with self.lock:
+            previous = self.positions.get(pair)
+            level = logging.INFO
+            if not self.armed:
+                reason = "not armed"
+            elif volume is None:
+                reason = "no order volume set"
+            elif self.rejected.get(pair) == signal:
+                reason = "last order rejected, waiting for the next crossover"
+            elif signal == BUY and previous == BUY:
+                reason = "already long"
+            elif signal == SELL and previous != BUY:
+                reason, level = "no position bought by the engine", logging.DEBUG
+            else:
+                reason = None
+                self.positions[pair] = signal
+        self.signals.append((self.clock(), pair, signal, reason is None))
+        if reason is not None:
+            logger.log(level, "Live signal %s %s (%s, no order sent).", side, pair, reason)
+            return
+        logger.warning("Live signal %s %s: sending order for %s.", side, pair, volume)
+        self.executor.submit(self._place_order, pair, volume, side, signal, previous)
+
+    def _place_order(self, pair: str, volume: float, side: str, signal: int, previous: Optional[int]):
+        try:
+            self.api_client.execute_trade(pair, volume, side)
+        except Exception as e:
+            logger.error("Live order %s %s %s failed: %s", side, volume, pair, e)
+            with self.lock:
+                # nicht ausgeführt: Position wie vor der Order, dasselbe Signal erst nach dem nächsten Wechsel erneut
+                if previous is None:
+                    self.positions.pop(pair, None)
+                else:
+                    self.positions[pair] = previous
+                self.rejected[pair] = signal
+
+    def stop(self):
+        """
+        Schaltet die Engine ab und beendet den Order-Thread.
+        """
+        self.armed = False
+        self.executor.shutdown(wait=False)
@@ -1,11 +1,17 @@
-﻿import tkinter as tk
-from gui import KrakenBotGUI
+﻿import time
+STARTED = time.perf_counter()  # Bezugspunkt für die Startzeit-Messung
 from config import setup_api_credentials
+from utils import setup_logging, log_startup_report
 import logging
 import sys
-import pystray
-from PIL import Image
 import threading
+import argparse
+from models.favorites import Favorites
+from metrics import start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+# tkinter, pystray, PIL und gui werden erst im GUI-Modus importiert, damit der Headless-Modus ohne Display läuft
 
 # --- Tray-Icon-Funktionen ---
 def minimize_to_tray(window):
@@ -25,6 +31,9 @@ def create_tray_icon(window):
     """
     Erstellt ein Tray-Icon mit einem Menü.
     """
+    import pystray
+    from PIL import Image
+
     # Bild für das Tray-Icon (verwendet das konvertierte PNG)
     try:
         image = Image.open("icon.png")  # Pfad zum Icon-Bild
@@ -42,47 +51,99 @@ def create_tray_icon(window):
     # Tray-Icon starten
     icon.run()
 
+def create_paper_exchange(speed: float, days: int):
+    """
+    Erstellt eine simulierte Börse mit synthetischen Kursen für die Favoriten (Paper-Trading).
+
+    :param speed: Der Zeitraffer-Faktor der Marktzeit.
+    :param days: Die Dauer der synthetischen Kurse in Tagen.
+    """
+    from paper_exchange import MarketReplay, PaperExchange
+    pairs = Favorites(favorites_file="favorites.json").get_favorites() or ["XBTEUR"]
+    replay = MarketReplay.synthetic(pairs, time.time(), duration=days * 86400)
+    return PaperExchange(replay, speed=speed)
+
+def run_gui(api_key: str, api_secret: str, api_client=None):
+    """
+    Startet die Tk-Oberfläche mit Tray-Icon.
+    """
+    import tkinter as tk
+    from gui import KrakenBotGUI
+
+    # Initialisiere das Hauptfenster der Anwendung
+    root = tk.Tk()
+
+    # Minimieren-Button (typischer Punkt-Button wie bei Winamp)
+    minimize_button = tk.Button(root, text="·", command=lambda: minimize_to_tray(root), width=2)
+    minimize_button.place(relx=1.0, x=-10, y=10, anchor="ne")  # Position oben rechts
+
+    # Erstelle eine Instanz der KrakenBotGUI und übergebe die API-Schlüssel
+    app = KrakenBotGUI(root, api_key, api_secret, api_client=api_client)
+
+    # Tray-Icon erstellen
+    # (erst wenn das Fenster angezeigt wird, damit pystray/PIL den Start nicht verzögern)
+    tray_thread = threading.Thread(target=create_tray_icon, args=(root,), daemon=True)
+    root.after_idle(tray_thread.start)
+
+    # Starte die Hauptereignisschleife
+    root.after_idle(log_startup_report, "gui", STARTED)
+    logger.info("GUI initialized. Starting main loop...")
+    root.mainloop()
+
+def run_headless(args, api_key: str, api_secret: str, api_client=None):
+    """
+    Startet den Headless-Betrieb (Aktualisierung, Logging und Live-Strategie ohne Tk und Tray-Icon).
+    """
+    from kraken_bot import run_headless as run_bot
+    if api_client is None:
+        from api_client import KrakenAPIClient
+        api_client = KrakenAPIClient(api_key, api_secret)
+    favorites = Favorites(favorites_file="favorites.json", asset_pairs=api_client.asset_pairs)
+    volumes = {}
+    for item in args.volume:
+        pair, _, volume = item.partition("=")
+        volumes[favorites.normalize_pair(pair)] = float(volume)
+    run_bot(api_client, favorites.get_favorites(), update_interval=args.interval, arm=args.arm, volumes=volumes,
+            on_started=lambda: log_startup_report("headless", STARTED))
+
 # --- Hauptfunktion ---
 def main():
     """
     Hauptfunktion, die die Anwendung startet.
     """
+    parser = argparse.ArgumentParser(description="Kraken Bot")
+    parser.add_argument("--paper", action="store_true", help="Paper-Trading gegen eine simulierte Börse statt Kraken")
+    parser.add_argument("--replay-speed", type=float, default=60.0, help="Zeitraffer-Faktor der Marktzeit im Paper-Modus")
+    parser.add_argument("--replay-days", type=int, default=30, help="Dauer der synthetischen Kurse im Paper-Modus in Tagen")
+    parser.add_argument("--metrics-port", type=int, default=9464, help="Port des lokalen Prometheus-Endpunkts (0: aus)")
+    parser.add_argument("--headless", action="store_true", help="Ohne GUI und Tray-Icon laufen (Server-Betrieb)")
+    parser.add_argument("--interval", type=float, default=60.0, help="Aktualisierungsintervall im Headless-Modus in Sekunden")
+    parser.add_argument("--arm", action="store_true", help="Orders der Live-Strategie im Headless-Modus senden")
+    parser.add_argument("--volume", action="append", default=[], metavar="PAIR=VOLUME", help="Ordervolumen der Live-Strategie je Paar")
+    args = parser.parse_args()
     try:
-        # Logging konfigurieren
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format="%(asctime)s - %(levelname)s - %(message)s",
-            handlers=[
-                logging.FileHandler("kraken_bot.log"),  # Log-Nachrichten in eine Datei schreiben
-                logging.StreamHandler()  # Log-Nachrichten in die Konsole schreiben
-            ]
-        )
-        logging.info("Starting Kraken Bot...")
-
-        # Lade oder fordere die API-Schlüssel an
-        api_key, api_secret = setup_api_credentials()
-        logging.debug(f"API Key: {api_key}, API Secret: {api_secret}")
-
-        # Initialisiere das Hauptfenster der Anwendung
-        root = tk.Tk()
-
-        # Minimieren-Button (typischer Punkt-Button wie bei Winamp)
-        minimize_button = tk.Button(root, text="·", command=lambda: minimize_to_tray(root), width=2)
-        minimize_button.place(relx=1.0, x=-10, y=10, anchor="ne")  # Position oben rechts
-
-        # Erstelle eine Instanz der KrakenBotGUI und übergebe die API-Schlüssel
-        app = KrakenBotGUI(root, api_key, api_secret)
-
-        # Tray-Icon erstellen
-        tray_thread = threading.Thread(target=create_tray_icon, args=(root,), daemon=True)
-        tray_thread.start()
-
-        # Starte die Hauptereignisschleife
-        logging.info("GUI initialized. Starting main loop...")
-        root.mainloop()
+        # Logging konfigurieren (Datei und Konsole über einen Listener-Thread, Datei wird rotiert)
+        setup_logging(level=logging.DEBUG)
+        logger.info("Starting Kraken Bot...")
+        start_metrics_server(args.metrics_port)
+
+        # Lade oder fordere die API-Schlüssel an (im Paper-Modus nicht benötigt)
+        api_client = None
+        if args.paper:
+            api_key, api_secret = "", ""
+            api_client = create_paper_exchange(args.replay_speed, args.replay_days)
+            logger.info("Paper trading mode, market time runs %sx faster.", args.replay_speed)
+        else:
+            api_key, api_secret = setup_api_credentials()
+            logger.debug("API Key: %s, API Secret: %s", api_key, api_secret)
+
+        if args.headless:
+            run_headless(args, api_key, api_secret, api_client)
+        else:
+            run_gui(api_key, api_secret, api_client)
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}")
+        logger.error("An error occurred: %s", e)
         print(f"An error occurred: {e}")
 
 if __name__ == '__main__':
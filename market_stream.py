@@ -0,0 +1,205 @@
+﻿import asyncio
+import json
+import logging
+import random
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+import websockets
+
+logger = logging.getLogger(__name__)
+
+KRAKEN_WS_URL = "wss://ws.kraken.com"
+
+# Quote-Währungen, an denen Paarnamen wie 'ADAEUR' in Basis und Quote getrennt werden (längste zuerst)
+QUOTE_CURRENCIES = ['USDT', 'USDC', 'EUR', 'USD', 'CHF', 'GBP', 'CAD', 'AUD', 'JPY', 'XBT', 'ETH', 'DOT']
+
+def to_ws_name(pair: str) -> str:
+    """
+    Wandelt einen Paarnamen in die WebSocket-Schreibweise um (z. B. 'ADAEUR' -> 'ADA/EUR').
+
+    :param pair: Das HandelsPaar (z. B. 'ADAEUR').
+    :return: Der WebSocket-Name des Paares.
+    """
+    if "/" in pair:
+        return pair
+    for quote in QUOTE_CURRENCIES:
+        if pair.endswith(quote) and len(pair) > len(quote):
+            return f"{pair[:-len(quote)]}/{quote}"
+    return pair
+
+class KrakenWebSocketFeed:
+    def __init__(self, subscription: Dict, pairs: Iterable[str], url: str = KRAKEN_WS_URL,
+                 ws_names: Optional[Dict[str, str]] = None, min_backoff: float = 1.0, max_backoff: float = 60.0):
+        """
+        Initialisiert einen WebSocket-Feed, der in einem eigenen Thread läuft und sich bei Verbindungsabbrüchen
+        mit exponentiellem Backoff neu verbindet und neu abonniert.
+
+        :param subscription: Das 'subscription'-Objekt der Kraken-Anmeldung (z. B. {'name': 'ticker'}).
+        :param pairs: Die zu abonnierenden Paare (z. B. ['ADAEUR', 'SOLEUR']).
+        :param url: Die WebSocket-URL (für Tests z. B. ein lokaler Server).
+        :param ws_names: Optionale Zuordnung Paar -> WebSocket-Name; sonst wird to_ws_name verwendet.
+        :param min_backoff: Die erste Wartezeit in Sekunden vor einem erneuten Verbindungsversuch.
+        :param max_backoff: Die maximale Wartezeit in Sekunden zwischen Verbindungsversuchen.
+        """
+        self.subscription = subscription
+        self.url = url
+        self.ws_names = ws_names or {}
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connected = threading.Event()
+        self.connection_count = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.websocket = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = False
+        self.pairs: Dict[str, str] = {}
+        self.set_pairs(pairs)
+
+    def set_pairs(self, pairs: Iterable[str], ws_names: Optional[Dict[str, str]] = None):
+        """
+        Legt die abonnierten Paare fest. Bei bestehender Verbindung wird neu verbunden und neu abonniert.
+
+        :param pairs: Die zu abonnierenden Paare.
+        :param ws_names: Optionale weitere Zuordnungen Paar -> WebSocket-Name (z. B. aus AssetPairs.ws_names).
+        """
+        if ws_names:
+            self.ws_names.update(ws_names)
+        new_pairs = {self.ws_names.get(pair, to_ws_name(pair)): pair for pair in pairs}
+        changed = new_pairs != self.pairs
+        self.pairs = new_pairs
+        if changed and self.loop is not None and self.websocket is not None:
+            asyncio.run_coroutine_threadsafe(self.websocket.close(), self.loop)
+
+    def start(self):
+        """
+        Startet den Feed in einem Hintergrund-Thread.
+        """
+        self._stopped = False
+        self.thread = threading.Thread(target=self._thread_main, name=f"ws-{self.subscription['name']}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Beendet den Feed und wartet auf das Ende des Hintergrund-Threads.
+        """
+        self._stopped = True
+        if self.loop is not None and self._task is not None:
+            self.loop.call_soon_threadsafe(self._task.cancel)
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _thread_main(self):
+        self.loop = asyncio.new_event_loop()
+        self._task = self.loop.create_task(self._run())
+        try:
+            self.loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    async def _run(self):
+        """
+        Verbindet, abonniert und verarbeitet Nachrichten; nach Fehlern wird mit Backoff neu verbunden.
+        """
+        backoff = self.min_backoff
+        while not self._stopped:
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as websocket:
+                    self.websocket = websocket
+                    self.connection_count += 1
+                    await self.on_connect()
+                    if self.pairs:
+                        await websocket.send(json.dumps({
+                            'event': 'subscribe',
+                            'pair': sorted(self.pairs),
+                            'subscription': self.subscription
+                        }))
+                    self.connected.set()
+                    logger.info("WebSocket %s feed subscribed to %s pairs.", self.subscription['name'], len(self.pairs))
+                    async for raw_message in websocket:
+                        backoff = self.min_backoff
+                        self.handle_message(json.loads(raw_message))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("WebSocket %s feed error: %s", self.subscription['name'], e)
+            finally:
+                self.websocket = None
+                self.connected.clear()
+            if self._stopped:
+                break
+            delay = backoff * random.uniform(0.5, 1.0)
+            logger.info("Reconnecting WebSocket %s feed in %.1f s...", self.subscription['name'], delay)
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def on_connect(self):
+        """
+        Wird nach jedem (Wieder-)Verbinden vor dem Abonnieren aufgerufen.
+        """
+
+    def handle_message(self, message):
+        """
+        Verarbeitet eine Nachricht des Feeds. Wird von Unterklassen überschrieben.
+
+        :param message: Die dekodierte JSON-Nachricht.
+        """
+        if isinstance(message, dict) and message.get('event') == 'subscriptionStatus' and message.get('status') == 'error':
+            logger.error("WebSocket subscription error: %s", message.get('errorMessage'))
+
+class TickerStream(KrakenWebSocketFeed):
+    def __init__(self, pairs: Iterable[str], on_price: Optional[Callable[[str, float], None]] = None, **kwargs):
+        """
+        Initialisiert den Ticker-Stream, der die letzten Preise aller Paare im Speicher hält.
+
+        :param pairs: Die zu abonnierenden Paare (z. B. die Favoriten).
+        :param on_price: Callback (pair, price), der bei jeder Preisänderung im Stream-Thread aufgerufen wird.
+        """
+        super().__init__({'name': 'ticker'}, pairs, **kwargs)
+        self.on_price = on_price
+        self.prices: Dict[str, float] = {}
+        self.prices_lock = threading.Lock()
+
+    def set_snapshot(self, prices: Dict[str, float]):
+        """
+        Übernimmt einen REST-Snapshot, z. B. als Startwerte oder nach einem Verbindungsabbruch.
+
+        :param prices: Die Marktpreise je Paar.
+        """
+        with self.prices_lock:
+            self.prices.update(prices)
+
+    def get_price(self, pair: str) -> Optional[float]:
+        """
+        Gibt den letzten bekannten Preis eines Paares zurück.
+        """
+        with self.prices_lock:
+            return self.prices.get(pair)
+
+    def get_prices(self, pairs: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Gibt die letzten bekannten Preise zurück.
+
+        :param pairs: Optional die gewünschten Paare; ohne Angabe alle.
+        :return: Ein Dictionary mit den Preisen der Paare, für die ein Preis bekannt ist.
+        """
+        with self.prices_lock:
+            if pairs is None:
+                return dict(self.prices)
+            return {pair: self.prices[pair] for pair in pairs if pair in self.prices}
+
+    def handle_message(self, message):
+        if not isinstance(message, list) or len(message) < 4 or message[-2] != 'ticker':
+            super().handle_message(message)
+            return
+        pair = self.pairs.get(message[-1])
+        if pair is None:
+            return
+        price = float(message[1]['c'][0])
+        with self.prices_lock:
+            changed = self.prices.get(pair) != price
+            self.prices[pair] = price
+        if changed and self.on_price is not None:
+            self.on_price(pair, price)
@@ -0,0 +1,259 @@
+﻿import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Obergrenzen der Latenz-Buckets in Sekunden (Kraken-Anfragen liegen typischerweise zwischen 50 ms und einigen Sekunden)
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+RATE_LIMIT_ERROR = 'EAPI:Rate limit exceeded'
+
+def error_code(error: str) -> str:
+    """
+    Kürzt eine Kraken-Fehlermeldung auf ihren Code (z. B. 'EGeneral:Invalid arguments:volume' -> 'EGeneral:Invalid arguments').
+    """
+    return ":".join(error.split(":")[:2])
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Kumulatives Histogramm im Prometheus-Format.
+
+        :param buckets: Die aufsteigenden Obergrenzen der Buckets (ohne +Inf).
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Schätzt ein Quantil aus den Buckets (lineare Interpolation wie histogram_quantile in Prometheus).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+class MetricsRegistry:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        """
+        Sammelt Latenzen, Fehler und Rate-Limit-Ablehnungen je API-Endpunkt sowie die Dauer der Aktualisierungszyklen.
+
+        Das Erfassen kostet nur eine Bucket-Suche unter einer Sperre; formatiert wird erst beim Abruf (render/snapshot).
+
+        :param clock: Die Zeitquelle für Dauer-Messungen.
+        """
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.latency: Dict[str, Histogram] = {}
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.rate_limited: Dict[Tuple[str, str], int] = {}
+        self.cycles: Dict[str, Histogram] = {}
+
+    def observe_call(self, endpoint: str, seconds: float, errors: Optional[List[str]] = None):
+        """
+        Erfasst einen API-Aufruf mit seiner Dauer und den Fehlern der Antwort bzw. der Ausnahme.
+        """
+        with self.lock:
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = Histogram()
+            histogram.observe(seconds)
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            for error in errors or ():
+                code = error_code(error)
+                self.errors[(endpoint, code)] = self.errors.get((endpoint, code), 0) + 1
+                if code == RATE_LIMIT_ERROR:
+                    self.rate_limited[(endpoint, 'kraken')] = self.rate_limited.get((endpoint, 'kraken'), 0) + 1
+
+    def count_rate_limited(self, endpoint: str, source: str = 'local'):
+        """
+        Zählt eine Anfrage, die wegen des Aufrufbudgets abgelehnt wurde ('local': vom Scheduler verworfen).
+        """
+        with self.lock:
+            self.rate_limited[(endpoint, source)] = self.rate_limited.get((endpoint, source), 0) + 1
+
+    def observe_cycle(self, name: str, seconds: float):
+        with self.lock:
+            histogram = self.cycles.get(name)
+            if histogram is None:
+                histogram = self.cycles[name] = Histogram()
+            histogram.observe(seconds)
+
+    def timed_call(self, endpoint: str, request: Callable[[], Dict]) -> Dict:
+        """
+        Führt eine Anfrage aus und erfasst Dauer und Fehler (Kraken-Fehlercodes oder den Namen der Ausnahme).
+        """
+        start = self.clock()
+        try:
+            response = request()
+        except Exception as e:
+            self.observe_call(endpoint, self.clock() - start, [type(e).__name__])
+            raise
+        self.observe_call(endpoint, self.clock() - start, (response or {}).get('error'))
+        return response
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Misst die Dauer eines Blocks als Zyklus (z. B. 'update_balance').
+        """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.observe_cycle(name, self.clock() - start)
+
+    def snapshot(self) -> List[Dict]:
+        """
+        Gibt eine Übersicht je Endpunkt zurück (für die Statusanzeige der GUI).
+
+        :return: Eine Liste mit endpoint, requests, errors, rate_limited, avg, p50 und p95 (Sekunden).
+        """
+        with self.lock:
+            rows = []
+            for endpoint, histogram in sorted(self.latency.items()):
+                rows.append({
+                    'endpoint': endpoint,
+                    'requests': self.requests.get(endpoint, 0),
+                    'errors': sum(count for (name, _), count in self.errors.items() if name == endpoint),
+                    'rate_limited': sum(count for (name, _), count in self.rate_limited.items() if name == endpoint),
+                    'avg': histogram.sum / histogram.count,
+                    'p50': histogram.quantile(0.5),
+                    'p95': histogram.quantile(0.95),
+                })
+            for name, histogram in sorted(self.cycles.items()):
+                rows.append({'endpoint': f"cycle:{name}", 'requests': histogram.count, 'errors': 0, 'rate_limited': 0,
+                             'avg': histogram.sum / histogram.count, 'p50': histogram.quantile(0.5), 'p95': histogram.quantile(0.95)})
+            return rows
+
+    def render(self) -> str:
+        """
+        Gibt alle Metriken im Prometheus-Textformat (Version 0.0.4) zurück.
+        """
+        lines = []
+        with self.lock:
+            self._render_histograms(lines, "kraken_api_request_duration_seconds", "Duration of Kraken API requests.", 'endpoint', self.latency)
+            lines.append("# HELP kraken_api_requests_total Kraken API requests.")
+            lines.append("# TYPE kraken_api_requests_total counter")
+            for endpoint, count in sorted(self.requests.items()):
+                lines.append(f"kraken_api_requests_total{_labels(endpoint=endpoint)} {count}")
+            lines.append("# HELP kraken_api_errors_total Kraken API errors by error code.")
+            lines.append("# TYPE kraken_api_errors_total counter")
+            for (endpoint, code), count in sorted(self.errors.items()):
+                lines.append(f"kraken_api_errors_total{_labels(endpoint=endpoint, code=code)} {count}")
+            lines.append("# HELP kraken_api_rate_limited_total Requests rejected by the local scheduler or by Kraken's rate limit.")
+            lines.append("# TYPE kraken_api_rate_limited_total counter")
+            for (endpoint, source), count in sorted(self.rate_limited.items()):
+                lines.append(f"kraken_api_rate_limited_total{_labels(endpoint=endpoint, source=source)} {count}")
+            self._render_histograms(lines, "kraken_bot_cycle_duration_seconds", "Duration of bot cycles such as update_balance.", 'cycle', self.cycles)
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines: List[str], metric: str, description: str, label: str, histograms: Dict[str, Histogram]):
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels(**{label: name, 'le': bound})} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels(**{label: name, 'le': '+Inf'})} {histogram.count}")
+            lines.append(f"{metric}_sum{_labels(**{label: name})} {histogram.sum}")
+            lines.append(f"{metric}_count{_labels(**{label: name})} {histogram.count}")
+
+# Gemeinsame Registry des Prozesses (KrakenAPIClient, RefreshWorker, GUI und Exposition)
+REGISTRY = MetricsRegistry()
+
+def timed(name: str, registry: MetricsRegistry = REGISTRY):
+    """
+    Dekorator, der jede Ausführung der Funktion als Zyklus name erfasst.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with registry.timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9464):
+        """
+        Stellt die Metriken unter http://host:port/metrics im Prometheus-Format bereit (nur lokal, ohne Authentifizierung).
+
+        :param registry: Die auszuliefernde Registry.
+        :param host: Die Adresse, an die gebunden wird (Standard: nur localhost).
+        :param port: Der Port (0: ein freier Port wird gewählt).
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # erst bei Bedarf (Startzeit)
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Abrufe nicht ins Bot-Log schreiben
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self) -> 'MetricsServer':
+        self.thread.start()
+        logger.info("Metrics available at http://127.0.0.1:%s/metrics", self.port)
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def start_metrics_server(port: int, registry: MetricsRegistry = REGISTRY) -> Optional[MetricsServer]:
+    """
+    Startet den Metrik-Endpunkt; ist der Port belegt, läuft der Bot ohne Endpunkt weiter.
+
+    :param port: Der Port (0 oder negativ: kein Endpunkt).
+    """
+    if port <= 0:
+        return None
+    try:
+        return MetricsServer(registry, port=port).start()
+    except OSError as e:
+        logger.warning("Could not start metrics endpoint on port %s: %s", port, e)
+        return None
@@ -1,6 +1,8 @@
 ﻿# Importiere die Klassen aus den Modulen im models-Verzeichnis
 from .portfolio import Portfolio
 from .favorites import Favorites
+from .trade_ledger import TradeLedger
+from .portfolio_journal import PortfolioJournal
 
 # Optional: Definiere eine __all__-Liste, um zu steuern, was importiert wird, wenn `from models import *` verwendet wird
-__all__ = ['Portfolio', 'Favorites']
\ No newline at end of file
+__all__ = ['Portfolio', 'Favorites', 'TradeLedger', 'PortfolioJournal']
\ No newline at end of file
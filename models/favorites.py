@@ -3,21 +3,25 @@ import os
 from typing import List
 import logging
 
+logger = logging.getLogger(__name__)
+
 class Favorites:
-    def __init__(self, favorites_file: str = "favorites.json"):
+    def __init__(self, favorites_file: str = "favorites.json", asset_pairs=None):
         """
         Initialisiert die Favoriten mit der angegebenen Favoriten-Datei.
 
         :param favorites_file: Der Pfad zur Datei, in der die Favoriten gespeichert werden.
+        :param asset_pairs: Optional der AssetPairs-Cache, mit dem neue Favoriten geprüft werden.
         """
         self.favorites_file = favorites_file
+        self.asset_pairs = asset_pairs
         if os.path.exists(favorites_file):
             with open(favorites_file, 'r') as f:
                 self.favorites = json.load(f)
-            logging.info(f"Favorites loaded from {favorites_file}.")
+            logger.info("Favorites loaded from %s.", favorites_file)
         else:
             self.favorites = []
-            logging.warning(f"Favorites file not found. Initializing empty favorites list.")
+            logger.warning("Favorites file not found. Initializing empty favorites list.")
 
     def save_favorites(self):
         """
@@ -26,9 +30,9 @@ class Favorites:
         try:
             with open(self.favorites_file, 'w') as f:
                 json.dump(self.favorites, f, indent=4)
-            logging.info(f"Favorites saved to {self.favorites_file}.")
+            logger.info("Favorites saved to %s.", self.favorites_file)
         except Exception as e:
-            logging.error(f"Error saving favorites: {e}")
+            logger.error("Error saving favorites: %s", e)
             raise
 
     def add_favorite(self, pair: str):
@@ -36,13 +40,40 @@ class Favorites:
         Fügt ein Favoriten-Paar hinzu, falls es noch nicht vorhanden ist.
 
         :param pair: Das Favoriten-Paar (z. B. 'CQTEUR').
+        :raises ValueError: Wenn das Paar laut AssetPairs-Cache nicht existiert.
         """
+        pair = self.normalize_pair(pair)
         if pair not in self.favorites:
             self.favorites.append(pair)
-            logging.info(f"Added {pair} to favorites.")
+            logger.info("Added %s to favorites.", pair)
             self.save_favorites()
         else:
-            logging.warning(f"{pair} is already in favorites.")
+            logger.warning("%s is already in favorites.", pair)
+
+    def normalize_pair(self, pair: str) -> str:
+        """
+        Prüft ein Paar gegen den AssetPairs-Cache und gibt seinen Kurznamen zurück (z. B. 'XBT/EUR' -> 'XBTEUR').
+        Ohne Cache oder ohne geladene Metadaten wird das Paar unverändert zurückgegeben.
+
+        :param pair: Das HandelsPaar.
+        :return: Der Kurzname des Paares.
+        :raises ValueError: Wenn das Paar nicht existiert.
+        """
+        if self.asset_pairs is None or not self.asset_pairs.ensure_loaded():
+            return pair
+        altname = self.asset_pairs.altname(pair)
+        if altname is None:
+            logger.error("Unknown trading pair: %s", pair)
+            raise ValueError(f"Unknown trading pair: {pair}")
+        return altname
+
+    def invalid_favorites(self) -> List[str]:
+        """
+        Gibt die Favoriten zurück, die laut AssetPairs-Cache kein gültiges Paar sind.
+        """
+        if self.asset_pairs is None or not self.asset_pairs.ensure_loaded():
+            return []
+        return [pair for pair in self.favorites if not self.asset_pairs.is_valid_pair(pair)]
 
     def remove_favorite(self, pair: str):
         """
@@ -52,10 +83,10 @@ class Favorites:
         """
         if pair in self.favorites:
             self.favorites.remove(pair)
-            logging.info(f"Removed {pair} from favorites.")
+            logger.info("Removed %s from favorites.", pair)
             self.save_favorites()
         else:
-            logging.warning(f"{pair} not found in favorites.")
+            logger.warning("%s not found in favorites.", pair)
 
     def get_favorites(self) -> List[str]:
         """
@@ -70,5 +101,5 @@ class Favorites:
         Löscht alle Favoriten-Paare.
         """
         self.favorites = []
-        logging.info("Favorites cleared.")
+        logger.info("Favorites cleared.")
         self.save_favorites()
\ No newline at end of file
@@ -1,29 +1,51 @@
-﻿import json
-import os
-from typing import Dict, Any
+﻿from typing import Dict, Any, Optional
+from .portfolio_journal import PortfolioJournal
 
 class Portfolio:
     def __init__(self, portfolio_file: str = "portfolio.json"):
         """
         Initialisiert das Portfolio mit der angegebenen Portfolio-Datei.
 
+        Änderungen werden fortlaufend in ein Journal neben der Datei geschrieben (siehe PortfolioJournal);
+        die Datei selbst ist der zuletzt geschriebene Snapshot. Sobald das Journal lang genug geworden ist,
+        wird nach der Änderung ein neuer Snapshot geschrieben.
+
         :param portfolio_file: Der Pfad zur Datei, in der das Portfolio gespeichert wird.
         """
         self.portfolio_file = portfolio_file
-        if os.path.exists(portfolio_file):
-            with open(portfolio_file, 'r') as f:
-                self.portfolio = json.load(f)
-        else:
-            self.portfolio = {}
+        self.journal = PortfolioJournal(portfolio_file)
+        self.portfolio = self.journal.load()
 
     def save_portfolio(self):
         """
-        Speichert das Portfolio in der angegebenen Datei.
+        Speichert das Portfolio: synchronisiert das Journal und schreibt einen neuen Snapshot, sobald das
+        Journal lang genug geworden ist.
         """
-        with open(self.portfolio_file, 'w') as f:
-            json.dump(self.portfolio, f, indent=4)
+        self.journal.sync()
+        if self.journal.needs_compaction():
+            self.journal.compact(self.portfolio)
         print(f"Portfolio saved to {self.portfolio_file}")
 
+    def _record(self, asset: Optional[str], amount: Optional[float], clear: bool = False):
+        """
+        Schreibt eine Änderung in das Journal und verdichtet es, sobald es compact_every Einträge erreicht.
+        """
+        self.journal.record(asset, amount, clear)
+        if self.journal.needs_compaction():
+            self.journal.compact(self.portfolio)
+
+    def compact(self):
+        """
+        Schreibt sofort einen vollständigen Snapshot und leert das Journal.
+        """
+        self.journal.compact(self.portfolio)
+
+    def close(self):
+        """
+        Synchronisiert und schließt das Journal.
+        """
+        self.journal.close()
+
     def add_asset(self, asset: str, amount: float):
         """
         Fügt ein Asset zum Portfolio hinzu oder aktualisiert den Betrag, falls das Asset bereits vorhanden ist.
@@ -35,6 +57,7 @@ class Portfolio:
             self.portfolio[asset] += amount
         else:
             self.portfolio[asset] = amount
+        self._record(asset, self.portfolio[asset])
         print(f"Added {amount} of {asset} to the portfolio.")
 
     def remove_asset(self, asset: str, amount: float):
@@ -49,6 +72,7 @@ class Portfolio:
                 self.portfolio[asset] -= amount
                 if self.portfolio[asset] == 0:
                     del self.portfolio[asset]
+                self._record(asset, self.portfolio.get(asset))
                 print(f"Removed {amount} of {asset} from the portfolio.")
             else:
                 print(f"Not enough {asset} in the portfolio.")
@@ -77,4 +101,5 @@ class Portfolio:
         Löscht das gesamte Portfolio.
         """
         self.portfolio = {}
+        self._record(None, None, clear=True)
         print("Portfolio cleared.")
\ No newline at end of file
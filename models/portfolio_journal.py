@@ -0,0 +1,167 @@
+﻿import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class PortfolioJournal:
+    def __init__(self, snapshot_file: str, journal_file: Optional[str] = None, group_size: int = 16,
+                 group_interval: float = 0.5, compact_every: int = 1000):
+        """
+        Initialisiert die Journal-Persistenz eines Portfolios.
+
+        Jede Änderung wird als eine JSON-Zeile an das Journal angehängt. Die Einträge enthalten den neuen
+        absoluten Betrag eines Assets (nicht die Differenz), damit ein erneutes Einspielen bereits im Snapshot
+        enthaltener Einträge das Ergebnis nicht verändert. fsync erfolgt gruppiert, spätestens nach
+        group_size Einträgen oder group_interval Sekunden nach dem ersten noch nicht synchronisierten Eintrag
+        (ein Timer-Thread übernimmt das, wenn kein weiterer Eintrag folgt) sowie bei sync(). Nach compact_every Einträgen
+        wird ein Snapshot geschrieben (temporäre Datei, dann os.replace) und das Journal geleert.
+
+        :param snapshot_file: Die Snapshot-Datei (das bisherige portfolio.json, ein einfaches Dictionary).
+        :param journal_file: Die Journal-Datei (Standard: snapshot_file + '.journal').
+        :param group_size: Die maximale Anzahl Einträge zwischen zwei fsync-Aufrufen.
+        :param group_interval: Die maximale Zeit in Sekunden zwischen zwei fsync-Aufrufen.
+        :param compact_every: Die Anzahl Journal-Einträge, nach der ein neuer Snapshot geschrieben wird.
+        """
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file or snapshot_file + ".journal"
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.compact_every = compact_every
+        self.entries = 0
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.lock = threading.RLock()
+        self._journal = None
+        self._sync_timer: Optional[threading.Timer] = None
+
+    def load(self) -> Dict[str, float]:
+        """
+        Stellt das Portfolio aus dem Snapshot und dem Journal wieder her. Eine unvollständige letzte Zeile
+        (Abbruch während des Schreibens) wird verworfen.
+
+        :return: Das Portfolio als Dictionary Asset -> Betrag.
+        :raises ValueError: Wenn eine Zeile vor der letzten beschädigt ist.
+        """
+        portfolio = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r') as f:
+                portfolio = json.load(f)
+        self.entries = 0
+        valid_bytes = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'rb') as f:
+                lines = f.readlines()
+            for number, line in enumerate(lines, start=1):
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    self._apply(portfolio, json.loads(line))
+                except (ValueError, KeyError) as e:
+                    if number < len(lines):
+                        logger.error("Corrupt record in line %s of %s: %s", number, self.journal_file, e)
+                        raise ValueError(f"Corrupt record in line {number} of {self.journal_file}") from e
+                    logger.warning("Ignoring torn record at the end of %s.", self.journal_file)
+                    break
+                valid_bytes += len(line)
+                self.entries += 1
+            # Den abgeschnittenen Rest entfernen, damit neue Einträge an einer Zeilengrenze beginnen
+            if valid_bytes != os.path.getsize(self.journal_file):
+                with open(self.journal_file, 'r+b') as f:
+                    f.truncate(valid_bytes)
+        return portfolio
+
+    @staticmethod
+    def _apply(portfolio: Dict[str, float], record: Dict):
+        if record.get('clear'):
+            portfolio.clear()
+        elif record['amount'] is None:
+            portfolio.pop(record['asset'], None)
+        else:
+            portfolio[record['asset']] = record['amount']
+
+    def record(self, asset: Optional[str], amount: Optional[float], clear: bool = False):
+        """
+        Hängt eine Änderung an das Journal an (O(1), unabhängig von der Größe des Portfolios).
+
+        :param asset: Das geänderte Asset.
+        :param amount: Der neue Betrag oder None, wenn das Asset entfernt wurde.
+        :param clear: True, wenn das gesamte Portfolio geleert wurde.
+        """
+        with self.lock:
+            if self._journal is None:
+                self._journal = open(self.journal_file, 'ab')
+            record = {'clear': True} if clear else {'asset': asset, 'amount': amount}
+            self._journal.write(json.dumps(record).encode() + b"\n")
+            self._journal.flush()
+            self.entries += 1
+            self.unsynced += 1
+            if self.unsynced >= self.group_size or time.monotonic() - self.last_sync >= self.group_interval:
+                self.sync()
+            elif self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.group_interval, self.sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def sync(self):
+        """
+        Schreibt alle angehängten Einträge per fsync auf den Datenträger.
+        """
+        with self.lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._journal is not None and self.unsynced:
+                os.fsync(self._journal.fileno())
+            self.unsynced = 0
+            self.last_sync = time.monotonic()
+
+    def needs_compaction(self) -> bool:
+        return self.entries >= self.compact_every
+
+    def compact(self, portfolio: Dict[str, float]):
+        """
+        Schreibt einen Snapshot atomar (temporäre Datei, fsync, os.replace) und leert danach das Journal.
+
+        Bricht der Prozess zwischen Snapshot und Leeren des Journals ab, spielt load() das Journal erneut
+        ein; wegen der absoluten Beträge ergibt das denselben Zustand.
+
+        :param portfolio: Der aktuelle Zustand des Portfolios.
+        """
+        with self.lock:
+            self.sync()
+            temp_file = self.snapshot_file + ".tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(portfolio, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.snapshot_file)
+            self._fsync_directory()
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_file, 'wb')
+            os.fsync(self._journal.fileno())
+            self.entries = 0
+        logger.info("Portfolio snapshot written to %s.", self.snapshot_file)
+
+    def _fsync_directory(self):
+        if not hasattr(os, 'O_DIRECTORY'):
+            return  # Windows: Verzeichnisse können nicht per fsync synchronisiert werden
+        fd = os.open(os.path.dirname(os.path.abspath(self.snapshot_file)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """
+        Synchronisiert und schließt das Journal.
+        """
+        with self.lock:
+            self.sync()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
@@ -0,0 +1,155 @@
+﻿import sqlite3
+import threading
+import logging
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class TradeLedger:
+    def __init__(self, ledger_file: str = "trades.db"):
+        """
+        Initialisiert das lokale Handelsjournal in einer SQLite-Datenbank.
+
+        :param ledger_file: Der Pfad zur Datenbankdatei (':memory:' für ein flüchtiges Journal).
+        """
+        self.ledger_file = ledger_file
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(ledger_file, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS trades ("
+                "txid TEXT PRIMARY KEY, ordertxid TEXT, pair TEXT NOT NULL, altname TEXT NOT NULL, "
+                "time REAL NOT NULL, type TEXT NOT NULL, ordertype TEXT, price REAL NOT NULL, "
+                "cost REAL, fee REAL, vol REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_trades_pair_time ON trades (pair, time)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_trades_altname_time ON trades (altname, time)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, value REAL NOT NULL)")
+        logger.info("Trade ledger opened at %s.", ledger_file)
+
+    def add_trades(self, trades: Dict[str, Dict], altnames: Optional[Dict[str, str]] = None) -> int:
+        """
+        Übernimmt Trades aus einer TradesHistory-Antwort. Bereits bekannte Trades werden ignoriert.
+
+        :param trades: Das 'trades'-Dictionary der Kraken-Antwort (Trade-ID -> Trade-Daten).
+        :param altnames: Optionale Zuordnung kanonischer Paarnamen zu Kurznamen (z. B. 'XXBTZEUR' -> 'XBTEUR').
+        :return: Die Anzahl neu gespeicherter Trades.
+        """
+        altnames = altnames or {}
+        rows = [
+            (
+                txid, trade.get('ordertxid'), trade['pair'], altnames.get(trade['pair'], trade['pair']),
+                float(trade['time']), trade['type'], trade.get('ordertype'), float(trade['price']),
+                float(trade.get('cost', 0)), float(trade.get('fee', 0)), float(trade.get('vol', 0))
+            )
+            for txid, trade in trades.items()
+        ]
+        with self.lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany("INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return self.connection.total_changes - before
+
+    def get_last_trade_time(self) -> Optional[float]:
+        """
+        Gibt den Zeitstempel des jüngsten gespeicherten Trades zurück.
+
+        :return: Der Unix-Zeitstempel oder None, falls das Journal leer ist.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT MAX(time) FROM trades").fetchone()
+        return row[0]
+
+    def get_sync_watermark(self) -> Optional[float]:
+        """
+        Gibt den Zeitstempel zurück, bis zu dem die Handelshistorie vollständig abgeglichen wurde.
+
+        :return: Der Unix-Zeitstempel oder None, falls noch kein Abgleich vollständig durchgelaufen ist.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM sync_state WHERE name = 'trades'").fetchone()
+        return row[0] if row else None
+
+    def set_sync_watermark(self, timestamp: float):
+        """
+        Speichert den Zeitstempel eines vollständig abgeschlossenen Abgleichs.
+
+        :param timestamp: Der Unix-Zeitstempel des jüngsten abgeglichenen Trades.
+        """
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO sync_state VALUES ('trades', ?)", (timestamp,))
+
+    def get_last_buy_price(self, pair: str) -> Optional[float]:
+        """
+        Gibt den Preis des jüngsten Kaufs für ein Paar zurück.
+
+        :param pair: Das HandelsPaar, kanonisch oder als Kurzname (z. B. 'XXBTZEUR' oder 'XBTEUR').
+        :return: Der Kaufpreis oder None, falls kein Kauf gespeichert ist.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT price FROM trades WHERE pair = ? AND type = 'buy' ORDER BY time DESC LIMIT 1", (pair,)
+            ).fetchone()
+            if row is None:
+                row = self.connection.execute(
+                    "SELECT price FROM trades WHERE altname = ? AND type = 'buy' ORDER BY time DESC LIMIT 1", (pair,)
+                ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        """
+        Schließt die Datenbankverbindung.
+        """
+        with self.lock:
+            self.connection.close()
+
+class TradeHistorySync:
+    def __init__(self, ledger: TradeLedger, altname: Callable[[str], str]):
+        """
+        Ein Abgleichdurchlauf der Handelshistorie, Seite für Seite (für den synchronen und den asynchronen Client).
+
+        Kraken liefert TradesHistory vom jüngsten Trade an rückwärts. Ein abgebrochener Durchlauf hätte also die
+        jüngsten Trades gespeichert, die älteren aber nicht; deshalb setzt der nächste Durchlauf nicht beim
+        jüngsten gespeicherten Trade fort, sondern bei der Marke des letzten vollständigen Durchlaufs.
+
+        :param ledger: Das lokale Handelsjournal.
+        :param altname: Liefert den Kurznamen zu einem kanonischen Paarnamen (z. B. 'XXBTZEUR' -> 'XBTEUR').
+        """
+        self.ledger = ledger
+        self.altname = altname
+        self.params = {}
+        self.newest = ledger.get_sync_watermark()
+        if self.newest is not None:
+            # 'start' ist exklusiv; eine Sekunde Überlappung fängt Trades mit gleichem Zeitstempel ab
+            self.params['start'] = int(self.newest) - 1
+        self.offset = 0
+        self.added = 0
+        self.done = False
+
+    def next_request(self) -> Optional[Dict]:
+        """
+        Gibt die Parameter der nächsten TradesHistory-Anfrage zurück.
+
+        :return: Die Anfrageparameter oder None, wenn der Durchlauf beendet ist.
+        """
+        return None if self.done else dict(self.params, ofs=self.offset)
+
+    def handle(self, response: Dict):
+        """
+        Übernimmt eine TradesHistory-Antwort in das Journal. Die Marke wird erst nach der letzten Seite verschoben.
+
+        :param response: Die Antwort der Kraken API.
+        """
+        if response.get('error'):
+            logger.error("Error fetching trades history: %s", response['error'])
+            self.done = True
+            return
+        result = response.get('result', {})
+        trades = result.get('trades', {})
+        if trades:
+            self.added += self.ledger.add_trades(trades, {trade['pair']: self.altname(trade['pair']) for trade in trades.values()})
+            self.newest = max([float(trade['time']) for trade in trades.values()] + ([self.newest] if self.newest is not None else []))
+            self.offset += len(trades)
+        if not trades or self.offset >= int(result.get('count', 0)):
+            self.done = True
+            if self.newest is not None:
+                self.ledger.set_sync_watermark(self.newest)
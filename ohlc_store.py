@@ -0,0 +1,146 @@
+﻿import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import backtrader as bt
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Spalten der Kraken-OHLC-Antwort in ihrer Reihenfolge
+OHLC_COLUMNS = ('time', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count')
+OHLC_DTYPES = {'time': np.int64, 'count': np.int64}
+
+class OHLCStore:
+    def __init__(self, api=None, directory: str = "ohlc"):
+        """
+        Initialisiert den lokalen OHLC-Speicher. Jede Spalte eines Paares/Intervalls liegt als eigene
+        .npy-Datei vor und wird per Memory-Mapping ohne Kopie geladen.
+
+        :param api: Ein krakenex.API-kompatibles Objekt für die öffentliche OHLC-Abfrage (Standard: krakenex.API()).
+        :param directory: Das Verzeichnis, in dem die Daten abgelegt werden.
+        """
+        if api is None:
+            import krakenex
+            api = krakenex.API()
+        self.api = api
+        self.directory = directory
+
+    def _series_dir(self, pair: str, interval: int) -> str:
+        return os.path.join(self.directory, f"{pair.replace('/', '')}_{interval}")
+
+    def _read_meta(self, pair: str, interval: int) -> Dict:
+        meta_file = os.path.join(self._series_dir(pair, interval), "meta.json")
+        if not os.path.exists(meta_file):
+            return {}
+        with open(meta_file, 'r') as f:
+            return json.load(f)
+
+    def _write_atomic(self, path: str, write):
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+
+    def update(self, pair: str, interval: int = 1440) -> int:
+        """
+        Lädt neue Kerzen über die Kraken-OHLC-Abfrage nach. Über den 'since'/'last'-Cursor werden nur
+        Kerzen ab der letzten abgeschlossenen Kerze abgefragt; die zuvor noch offene Kerze wird ersetzt.
+
+        :param pair: Das HandelsPaar (z. B. 'XBTEUR').
+        :param interval: Das Kerzenintervall in Minuten (1, 5, 15, 30, 60, 240, 1440, 10080, 21600).
+        :return: Die Anzahl neu hinzugekommener Kerzen.
+        """
+        meta = self._read_meta(pair, interval)
+        params = {'pair': pair.replace("/", ""), 'interval': interval}
+        if 'last' in meta:
+            params['since'] = meta['last']
+        response = self.api.query_public('OHLC', params)
+        if response.get('error'):
+            logger.error("Error fetching OHLC data for %s: %s", pair, response['error'])
+            return 0
+        result = response['result']
+        last = result.pop('last')
+        rows = next(iter(result.values()), [])
+        if not rows:
+            return 0
+        new_columns = {
+            column: np.array([row[index] for row in rows], dtype=OHLC_DTYPES.get(column, np.float64))
+            for index, column in enumerate(OHLC_COLUMNS)
+        }
+        existing = self.load(pair, interval) if meta else None
+        series_dir = self._series_dir(pair, interval)
+        os.makedirs(series_dir, exist_ok=True)
+        added = len(rows)
+        merged = {}
+        for column in OHLC_COLUMNS:
+            if existing is not None:
+                keep = existing['time'] < new_columns['time'][0]
+                merged[column] = np.concatenate([existing[column][keep], new_columns[column]])
+            else:
+                merged[column] = new_columns[column]
+        if existing is not None:
+            added = len(merged['time']) - len(existing['time'])
+            del existing  # Memory-Maps vor dem Ersetzen der Dateien freigeben
+        for column, values in merged.items():
+            self._write_atomic(os.path.join(series_dir, f"{column}.npy"), lambda f, values=values: np.save(f, values))
+        meta_bytes = json.dumps({'pair': pair, 'interval': interval, 'last': last, 'rows': len(merged['time'])}).encode()
+        self._write_atomic(os.path.join(series_dir, "meta.json"), lambda f: f.write(meta_bytes))
+        logger.info("Stored %s new %s-minute candles for %s.", added, interval, pair)
+        return added
+
+    def load(self, pair: str, interval: int = 1440, mmap: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Lädt die gespeicherten Kerzen als NumPy-Arrays.
+
+        :param pair: Das HandelsPaar (z. B. 'XBTEUR').
+        :param interval: Das Kerzenintervall in Minuten.
+        :param mmap: True, um die Dateien ohne Kopie per Memory-Mapping (nur lesend) zu laden.
+        :return: Ein Dictionary Spalte -> Array oder None, falls keine Daten vorhanden sind.
+        """
+        series_dir = self._series_dir(pair, interval)
+        if not os.path.exists(os.path.join(series_dir, "time.npy")):
+            return None
+        return {
+            column: np.load(os.path.join(series_dir, f"{column}.npy"), mmap_mode='r' if mmap else None)
+            for column in OHLC_COLUMNS
+        }
+
+    def backtrader_feed(self, pair: str, interval: int = 1440) -> 'OHLCStoreFeed':
+        """
+        Erstellt einen backtrader-Datenfeed, der direkt aus den gespeicherten Arrays liest.
+
+        :param pair: Das HandelsPaar (z. B. 'XBTEUR').
+        :param interval: Das Kerzenintervall in Minuten.
+        :return: Der Datenfeed für cerebro.adddata().
+        """
+        columns = self.load(pair, interval)
+        if columns is None:
+            raise ValueError(f"No OHLC data stored for {pair} ({interval} min).")
+        return OHLCStoreFeed(columns=columns, name=pair)
+
+class OHLCStoreFeed(bt.feed.DataBase):
+    """
+    backtrader-Datenfeed über die (memory-gemappten) Arrays des OHLCStore.
+    """
+    params = (('columns', None),)
+
+    def start(self):
+        super().start()
+        self._index = 0
+
+    def _load(self):
+        columns = self.p.columns
+        if self._index >= len(columns['time']):
+            return False
+        index = self._index
+        self.lines.datetime[0] = bt.date2num(datetime.fromtimestamp(int(columns['time'][index]), tz=timezone.utc).replace(tzinfo=None))
+        self.lines.open[0] = columns['open'][index]
+        self.lines.high[0] = columns['high'][index]
+        self.lines.low[0] = columns['low'][index]
+        self.lines.close[0] = columns['close'][index]
+        self.lines.volume[0] = columns['volume'][index]
+        self.lines.openinterest[0] = 0.0
+        self._index += 1
+        return True
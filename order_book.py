@@ -0,0 +1,200 @@
+﻿import asyncio
+import json
+import logging
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sortedcontainers import SortedDict
+from market_stream import KrakenWebSocketFeed
+
+logger = logging.getLogger(__name__)
+
+# Ein Preisniveau, wie es Kraken liefert: [Preis, Volumen, Zeitstempel, ...] als Strings
+Level = List[str]
+
+def _checksum_digits(value: str) -> str:
+    return value.replace('.', '').lstrip('0')
+
+class OrderBook:
+    def __init__(self, depth: int = 25):
+        """
+        Initialisiert ein lokales L2-Orderbuch eines Paares.
+
+        Die Preisniveaus liegen je Seite in einem SortedDict (Einfügen/Löschen in O(log n)); Preis und
+        Volumen werden zusätzlich als Originalstrings gehalten, weil Kraken die Prüfsumme darüber bildet.
+
+        :param depth: Die abonnierte Tiefe; Niveaus außerhalb davon werden verworfen.
+        """
+        self.depth = depth
+        self.asks = SortedDict()  # Preis -> (Preis-String, Volumen-String)
+        self.bids = SortedDict()
+        self.valid = False
+        self.lock = threading.Lock()
+
+    def apply_snapshot(self, asks: Iterable[Level], bids: Iterable[Level]):
+        """
+        Ersetzt das Buch durch einen Snapshot (WebSocket 'as'/'bs' oder REST-Depth).
+        """
+        with self.lock:
+            self.asks.clear()
+            self.bids.clear()
+            self._apply(self.asks, asks)
+            self._apply(self.bids, bids)
+            self._truncate()
+            self.valid = True
+
+    def apply_update(self, asks: Iterable[Level] = (), bids: Iterable[Level] = ()):
+        """
+        Wendet eine inkrementelle Änderung an; Volumen 0 entfernt das Preisniveau.
+        """
+        with self.lock:
+            self._apply(self.asks, asks)
+            self._apply(self.bids, bids)
+            self._truncate()
+
+    @staticmethod
+    def _apply(side: SortedDict, levels: Iterable[Level]):
+        for level in levels:
+            price, volume = level[0], level[1]
+            if float(volume) == 0:
+                side.pop(float(price), None)
+            else:
+                side[float(price)] = (price, volume)
+
+    def _truncate(self):
+        while len(self.asks) > self.depth:
+            self.asks.popitem(-1)
+        while len(self.bids) > self.depth:
+            self.bids.popitem(0)
+
+    def checksum(self) -> int:
+        """
+        Berechnet die Kraken-Prüfsumme (CRC32) über die besten 10 Asks (aufsteigend) und 10 Bids (absteigend).
+        """
+        with self.lock:
+            top_asks = [self.asks.peekitem(index)[1] for index in range(min(10, len(self.asks)))]
+            top_bids = [self.bids.peekitem(-1 - index)[1] for index in range(min(10, len(self.bids)))]
+        payload = "".join(_checksum_digits(price) + _checksum_digits(volume) for price, volume in top_asks + top_bids)
+        return zlib.crc32(payload.encode())
+
+    def best(self) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Gibt den besten Bid- und Ask-Preis zurück.
+        """
+        with self.lock:
+            best_bid = self.bids.peekitem(-1)[0] if self.bids else None
+            best_ask = self.asks.peekitem(0)[0] if self.asks else None
+        return best_bid, best_ask
+
+    def estimate_fill(self, side: str, volume: float) -> Dict:
+        """
+        Schätzt die Ausführung einer Market-Order über die Preisniveaus im Buch.
+
+        :param side: 'buy' (läuft die Asks aufsteigend ab) oder 'sell' (läuft die Bids absteigend ab).
+        :param volume: Das Ordervolumen.
+        :return: Ein Dictionary mit 'average_price', 'best_price', 'worst_price', 'slippage' (relativ zum
+                 besten Preis, positiv = ungünstiger), 'filled_volume' und 'complete' (False, wenn das Buch
+                 nicht tief genug ist).
+        """
+        with self.lock:
+            levels = self.asks.items() if side == 'buy' else reversed(self.bids.items())
+            remaining = volume
+            cost = 0.0
+            best_price = worst_price = None
+            for price, (_, level_volume) in levels:
+                if remaining <= 0:
+                    break
+                take = min(remaining, float(level_volume))
+                cost += take * price
+                remaining -= take
+                best_price = price if best_price is None else best_price
+                worst_price = price
+        filled = volume - remaining
+        if filled <= 0:
+            return {'average_price': None, 'best_price': None, 'worst_price': None, 'slippage': None,
+                    'filled_volume': 0.0, 'complete': False}
+        average_price = cost / filled
+        slippage = (average_price - best_price) / best_price
+        return {
+            'average_price': average_price,
+            'best_price': best_price,
+            'worst_price': worst_price,
+            'slippage': slippage if side == 'buy' else -slippage,
+            'filled_volume': filled,
+            'complete': remaining <= 1e-12,
+        }
+
+class OrderBookStream(KrakenWebSocketFeed):
+    def __init__(self, pairs: Iterable[str], depth: int = 25, **kwargs):
+        """
+        Initialisiert den Orderbuch-Stream ('book'-Kanal), der je Paar ein OrderBook aktuell hält.
+
+        Nach jeder Änderung wird die Prüfsumme der Nachricht geprüft. Stimmt sie nicht, wird das Buch als
+        ungültig markiert und der book-Kanal des Paares ab- und wieder angemeldet; der neue WebSocket-Snapshot
+        ist mit den folgenden Änderungen synchron. Bis dahin eintreffende Änderungen werden verworfen.
+
+        :param pairs: Die zu abonnierenden Paare.
+        :param depth: Die Tiefe des Abonnements (10, 25, 100, 500 oder 1000).
+        """
+        super().__init__({'name': 'book', 'depth': depth}, pairs, **kwargs)
+        self.depth = depth
+        self.books: Dict[str, OrderBook] = {}
+        self.resyncing: Set[str] = set()  # WebSocket-Namen, für die ein neuer Snapshot angefordert ist
+        self.resync_count = 0
+
+    def get_book(self, pair: str) -> Optional[OrderBook]:
+        """
+        Gibt das Orderbuch eines Paares zurück, sofern es gültig ist.
+        """
+        book = self.books.get(pair)
+        return book if book is not None and book.valid else None
+
+    async def on_connect(self):
+        self.resyncing.clear()
+        for book in self.books.values():
+            book.valid = False
+
+    def handle_message(self, message):
+        if not isinstance(message, list) or len(message) < 4 or not str(message[-2]).startswith('book'):
+            super().handle_message(message)
+            return
+        ws_name = message[-1]
+        pair = self.pairs.get(ws_name)
+        if pair is None:
+            return
+        book = self.books.setdefault(pair, OrderBook(self.depth))
+        payloads = message[1:-2]
+        if 'as' in payloads[0] or 'bs' in payloads[0]:
+            book.apply_snapshot(payloads[0].get('as', []), payloads[0].get('bs', []))
+            self.resyncing.discard(ws_name)
+            return
+        if ws_name in self.resyncing:
+            return
+        asks = [level for payload in payloads for level in payload.get('a', [])]
+        bids = [level for payload in payloads for level in payload.get('b', [])]
+        book.apply_update(asks, bids)
+        expected = next((payload['c'] for payload in payloads if 'c' in payload), None)
+        if expected is not None and book.valid and book.checksum() != int(expected):
+            logger.warning("Order book checksum mismatch for %s, resubscribing.", pair)
+            self.resync(pair)
+
+    def resync(self, pair: str):
+        """
+        Markiert das Buch eines Paares als ungültig und fordert per Ab- und Neuanmeldung einen WebSocket-Snapshot an.
+        """
+        book = self.books.setdefault(pair, OrderBook(self.depth))
+        book.valid = False
+        ws_name = next((name for name, known in self.pairs.items() if known == pair), None)
+        if ws_name is None or ws_name in self.resyncing:
+            return
+        self.resyncing.add(ws_name)
+        self.resync_count += 1
+        if self.loop is not None and self.websocket is not None:
+            asyncio.run_coroutine_threadsafe(self._resubscribe(self.websocket, ws_name), self.loop)
+
+    async def _resubscribe(self, websocket, ws_name: str):
+        try:
+            for event in ('unsubscribe', 'subscribe'):
+                await websocket.send(json.dumps({'event': event, 'pair': [ws_name], 'subscription': self.subscription}))
+        except Exception as e:
+            logger.error("Error resubscribing order book for %s: %s", ws_name, e)
@@ -0,0 +1,413 @@
+﻿import bisect
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from api_client import KrakenAPIClient
+from asset_pairs import AssetPairs
+from market_stream import to_ws_name
+from models.trade_ledger import TradeLedger
+from order_book import OrderBook
+from rate_limiter import RateLimitScheduler
+
+logger = logging.getLogger(__name__)
+
+# Ein Marktereignis der Wiedergabe: (Zeit, Paar, Preis, Volumen)
+MarketEvent = Tuple[float, str, float, float]
+
+# Fiat-Währungen und ihre Kraken-Asset-Codes; alle anderen Assets (auch z. B. 'ZRX') tragen keinen Präfix
+FIAT_ASSETS = {'EUR': 'ZEUR', 'USD': 'ZUSD', 'GBP': 'ZGBP', 'CAD': 'ZCAD', 'JPY': 'ZJPY', 'CHF': 'ZCHF', 'AUD': 'ZAUD'}
+FIAT_ALTNAMES = {code: currency for currency, code in FIAT_ASSETS.items()}
+
+class ReplayClock:
+    def __init__(self, start: float, speed: Optional[float] = None):
+        """
+        Uhr der simulierten Börse.
+
+        :param start: Die Marktzeit (Unix-Zeit) beim Start.
+        :param speed: Der Zeitraffer-Faktor gegenüber der Echtzeit (z. B. 3600: eine Marktstunde pro Sekunde);
+                      None, wenn die Uhr nur über advance()/set() weiterläuft.
+        """
+        self.start = start
+        self.speed = speed
+        self.offset = 0.0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def time(self) -> float:
+        with self.lock:
+            elapsed = (time.monotonic() - self.started) * self.speed if self.speed else 0.0
+            return self.start + self.offset + elapsed
+
+    def set(self, market_time: float):
+        """
+        Setzt die Uhr auf eine Marktzeit (nur vorwärts).
+        """
+        with self.lock:
+            elapsed = (time.monotonic() - self.started) * self.speed if self.speed else 0.0
+            self.offset = max(self.offset, market_time - self.start - elapsed)
+
+    def advance(self, seconds: float):
+        with self.lock:
+            self.offset += seconds
+
+class MarketReplay:
+    def __init__(self, events: Iterable[MarketEvent]):
+        """
+        Aufgezeichnete oder synthetische Handelsdaten, die von der simulierten Börse wiedergegeben werden.
+
+        :param events: Die Trades als (Zeit, Paar, Preis, Volumen).
+        """
+        self.events: List[MarketEvent] = sorted(events, key=lambda event: event[0])
+        self.times = [event[0] for event in self.events]
+        self.pairs = sorted({event[1] for event in self.events})
+
+    @classmethod
+    def synthetic(cls, pairs: Iterable[str], start: float, duration: float, step: float = 60.0,
+                  volatility: float = 0.002, start_price: float = 100.0, seed: int = 0) -> 'MarketReplay':
+        """
+        Erzeugt reproduzierbare Trades als Random Walk für jedes Paar.
+
+        :param pairs: Die Paare.
+        :param start: Die Marktzeit des ersten Trades.
+        :param duration: Die Dauer in Sekunden.
+        :param step: Der Abstand zwischen zwei Trades eines Paares in Sekunden.
+        :param volatility: Die Standardabweichung der relativen Preisänderung je Schritt.
+        :param start_price: Der Startpreis aller Paare.
+        :param seed: Der Startwert des Zufallsgenerators.
+        """
+        rng = np.random.default_rng(seed)
+        times = start + np.arange(0, duration, step)
+        events = []
+        for pair in pairs:
+            prices = start_price * np.exp(np.cumsum(rng.normal(0, volatility, len(times))))
+            volumes = rng.exponential(1.0, len(times))
+            events.extend(zip(times.tolist(), itertools.repeat(pair), prices.tolist(), volumes.tolist()))
+        return cls(events)
+
+    @classmethod
+    def from_ohlc(cls, store, pairs: Iterable[str], interval: int = 1440) -> 'MarketReplay':
+        """
+        Erzeugt Trades aus den Kerzen des OHLCStore (Eröffnungs- und Schlusskurs je Kerze).
+        """
+        events = []
+        for pair in pairs:
+            columns = store.load(pair, interval)
+            if columns is None:
+                logger.warning("No OHLC data for %s, leaving it out of the replay.", pair)
+                continue
+            for candle_time, open_, close, volume in zip(columns['time'], columns['open'], columns['close'], columns['volume']):
+                events.append((float(candle_time), pair, float(open_), float(volume) / 2))
+                events.append((float(candle_time) + interval * 60 - 1, pair, float(close), float(volume) / 2))
+        return cls(events)
+
+class PaperKrakenBackend:
+    def __init__(self, replay: MarketReplay, clock: ReplayClock, fee: float = 0.0026,
+                 balances: Optional[Dict[str, float]] = None, spread: float = 0.001, book_levels: int = 25,
+                 level_step: float = 0.0005, level_value: float = 2000.0,
+                 books: Optional[Dict[str, List[Tuple[float, List, List]]]] = None):
+        """
+        Simulierte Kraken-Börse mit der Schnittstelle von krakenex.API (query_public/query_private).
+
+        Marktpreise folgen der Wiedergabe bis zur aktuellen Zeit der Uhr. Market-Orders laufen ein Orderbuch ab:
+        entweder das zuletzt aufgezeichnete (books) oder ein synthetisches Buch um den letzten Preis.
+        Limit-Orders werden ausgeführt, sobald ein wiedergegebener Trade den Limitpreis erreicht.
+
+        :param replay: Die wiedergegebenen Handelsdaten.
+        :param clock: Die Uhr der Simulation.
+        :param fee: Die Handelsgebühr (z. B. 0.0026 für 0,26 %).
+        :param balances: Die Startguthaben je Asset (Standard: 10000 EUR als 'ZEUR').
+        :param spread: Der relative Abstand zwischen bestem Bid und Ask im synthetischen Buch.
+        :param book_levels: Die Anzahl Preisniveaus je Seite im synthetischen Buch.
+        :param level_step: Der relative Preisabstand der Niveaus im synthetischen Buch.
+        :param level_value: Der Wert (in der Quote-Währung) je Niveau im synthetischen Buch.
+        :param books: Optional aufgezeichnete Bücher: Paar -> [(Zeit, asks, bids), ...], aufsteigend nach Zeit.
+        """
+        self.replay = replay
+        self.clock = clock
+        self.fee = fee
+        self.balances = dict(balances) if balances is not None else {'ZEUR': 10000.0}
+        self.spread = spread
+        self.book_levels = book_levels
+        self.level_step = level_step
+        self.level_value = level_value
+        self.books = books or {}
+        self.position = 0
+        self.last_prices: Dict[str, float] = {}
+        self.open_orders: Dict[str, Dict] = {}
+        self.trades: Dict[str, Dict] = {}
+        self.listeners: List[Callable[[str, float, float], None]] = []
+        self.ids = itertools.count(1)
+        self.lock = threading.RLock()
+
+    # --- Marktdaten ---
+
+    def advance(self, until: Optional[float] = None) -> int:
+        """
+        Gibt alle Marktereignisse bis zur angegebenen Zeit (Standard: aktuelle Zeit der Uhr) wieder, führt
+        erreichte Limit-Orders aus und benachrichtigt die Listener.
+
+        :return: Die Anzahl wiedergegebener Ereignisse.
+        """
+        until = self.clock.time() if until is None else until
+        with self.lock:
+            end = bisect.bisect_right(self.replay.times, until, lo=self.position)
+            events = self.replay.events[self.position:end]
+            self.position = end
+            for event_time, pair, price, _ in events:
+                self.last_prices[pair] = price
+                self._match_limit_orders(pair, price, event_time)
+        for event_time, pair, price, _ in events:
+            for listener in self.listeners:
+                listener(pair, price, event_time)
+        return len(events)
+
+    def _book(self, pair: str) -> OrderBook:
+        """
+        Gibt das Orderbuch zur aktuellen Zeit zurück (aufgezeichnet oder synthetisch um den letzten Preis).
+        """
+        book = OrderBook(depth=self.book_levels * 4)
+        recorded = self.books.get(pair)
+        if recorded:
+            index = bisect.bisect_right([snapshot[0] for snapshot in recorded], self.clock.time()) - 1
+            if index >= 0:
+                book.apply_snapshot(recorded[index][1], recorded[index][2])
+                return book
+        price = self.last_prices.get(pair)
+        if price is None:
+            return book
+        asks, bids = [], []
+        for level in range(self.book_levels):
+            ask = price * (1 + self.spread / 2) * (1 + self.level_step * level)
+            bid = price * (1 - self.spread / 2) * (1 - self.level_step * level)
+            asks.append([f"{ask:.8f}", f"{self.level_value / ask:.8f}", "0"])
+            bids.append([f"{bid:.8f}", f"{self.level_value / bid:.8f}", "0"])
+        book.apply_snapshot(asks, bids)
+        return book
+
+    # --- Orderausführung ---
+
+    @staticmethod
+    def _split_pair(pair: str) -> Tuple[str, str]:
+        base, _, quote = to_ws_name(pair).partition("/")
+        return FIAT_ASSETS.get(base, base), FIAT_ASSETS.get(quote, quote)
+
+    def _fill(self, txid: str, pair: str, side: str, ordertype: str, volume: float, price: float, fill_time: float) -> Optional[str]:
+        """
+        Bucht einen Fill auf die Guthaben und in die Handelshistorie.
+
+        :return: Eine Kraken-Fehlermeldung, falls das Guthaben nicht reicht, sonst None.
+        """
+        base, quote = self._split_pair(pair)
+        cost = volume * price
+        fee = cost * self.fee
+        if side == 'buy' and self.balances.get(quote, 0.0) < cost + fee:
+            return "EOrder:Insufficient funds"
+        if side == 'sell' and self.balances.get(base, 0.0) < volume:
+            return "EOrder:Insufficient funds"
+        sign = 1 if side == 'buy' else -1
+        self.balances[base] = self.balances.get(base, 0.0) + sign * volume
+        self.balances[quote] = self.balances.get(quote, 0.0) - sign * cost - fee
+        self.trades[f"T{next(self.ids):08d}"] = {
+            'ordertxid': txid, 'pair': pair, 'time': fill_time, 'type': side, 'ordertype': ordertype,
+            'price': f"{price:.8f}", 'cost': f"{cost:.8f}", 'fee': f"{fee:.8f}", 'vol': f"{volume:.8f}",
+        }
+        logger.info("Paper fill: %s %s %s at %.8g (fee %.4f).", side, volume, pair, price, fee)
+        return None
+
+    def _add_order(self, order: Dict) -> Dict:
+        pair = order['pair']
+        side = order['type']
+        ordertype = order.get('ordertype', 'market')
+        volume = float(order['volume'])
+        if pair not in self.replay.pairs:
+            return {'error': ["EQuery:Unknown asset pair"]}
+        if pair not in self.last_prices:
+            return {'error': ["EService:Market in cancel_only mode"]}
+        txid = f"O{next(self.ids):08d}"
+        description = {'order': f"{side} {volume} {pair} @ {ordertype}"}
+        if ordertype == 'market':
+            estimate = self._book(pair).estimate_fill(side, volume)
+            if estimate['average_price'] is None:
+                return {'error': ["EOrder:Insufficient liquidity"]}
+            # Über die Buchtiefe hinaus wird zum schlechtesten Niveau gefüllt
+            remaining = volume - estimate['filled_volume']
+            price = (estimate['average_price'] * estimate['filled_volume'] + remaining * estimate['worst_price']) / volume
+            error = self._fill(txid, pair, side, ordertype, volume, price, self.clock.time())
+            if error:
+                return {'error': [error]}
+        elif ordertype == 'limit':
+            limit = float(order['price'])
+            best_bid, best_ask = self._book(pair).best()
+            marketable = best_ask is not None and limit >= best_ask if side == 'buy' else best_bid is not None and limit <= best_bid
+            if marketable:
+                error = self._fill(txid, pair, side, ordertype, volume, best_ask if side == 'buy' else best_bid, self.clock.time())
+                if error:
+                    return {'error': [error]}
+            else:
+                self.open_orders[txid] = {'pair': pair, 'type': side, 'ordertype': ordertype, 'price': limit, 'vol': volume,
+                                          'opentm': self.clock.time()}
+        else:
+            return {'error': ["EGeneral:Invalid arguments:ordertype"]}
+        return {'error': [], 'result': {'descr': description, 'txid': [txid]}}
+
+    def _match_limit_orders(self, pair: str, price: float, event_time: float):
+        for txid, order in list(self.open_orders.items()):
+            if order['pair'] != pair:
+                continue
+            if (order['type'] == 'buy' and price <= order['price']) or (order['type'] == 'sell' and price >= order['price']):
+                del self.open_orders[txid]
+                error = self._fill(txid, pair, order['type'], 'limit', order['vol'], order['price'], event_time)
+                if error:
+                    logger.warning("Paper limit order %s canceled: %s", txid, error)
+
+    # --- krakenex-Schnittstelle ---
+
+    def query_public(self, method: str, data: Optional[Dict] = None, timeout=None) -> Dict:
+        self.advance()
+        data = data or {}
+        with self.lock:
+            if method == 'Ticker':
+                result = {}
+                for pair in data.get('pair', '').split(","):
+                    if pair not in self.replay.pairs:
+                        return {'error': ["EQuery:Unknown asset pair"]}
+                    if pair in self.last_prices:
+                        best_bid, best_ask = self._book(pair).best()
+                        result[pair] = {'a': [str(best_ask), '1', '1.000'], 'b': [str(best_bid), '1', '1.000'],
+                                        'c': [str(self.last_prices[pair]), '0']}
+                return {'error': [], 'result': result}
+            if method == 'Depth':
+                pair = data['pair']
+                book = self._book(pair)
+                count = int(data.get('count', 100))
+                asks = [[text, volume, 0] for text, volume in list(book.asks.values())[:count]]
+                bids = [[text, volume, 0] for text, volume in list(reversed(book.bids.values()))[:count]]
+                return {'error': [], 'result': {pair: {'asks': asks, 'bids': bids}}}
+            if method == 'AssetPairs':
+                result = {}
+                for pair in self.replay.pairs:
+                    base, quote = self._split_pair(pair)
+                    result[pair] = {'altname': pair, 'wsname': to_ws_name(pair), 'base': base, 'quote': quote,
+                                    'pair_decimals': 8, 'lot_decimals': 8}
+                return {'error': [], 'result': result}
+            if method == 'Assets':
+                assets = {asset for pair in self.replay.pairs for asset in self._split_pair(pair)}
+                return {'error': [], 'result': {asset: {'altname': FIAT_ALTNAMES.get(asset, asset), 'decimals': 8}
+                                                for asset in assets}}
+        return {'error': ["EGeneral:Unknown method"]}
+
+    def query_private(self, method: str, data: Optional[Dict] = None, timeout=None) -> Dict:
+        self.advance()
+        data = data or {}
+        with self.lock:
+            if method == 'Balance':
+                return {'error': [], 'result': {asset: f"{amount:.8f}" for asset, amount in self.balances.items()}}
+            if method == 'AddOrder':
+                return self._add_order(data)
+            if method == 'AddOrderBatch':
+                orders = []
+                for position in itertools.count():
+                    prefix = f"orders[{position}]"
+                    if f"{prefix}[type]" not in data:
+                        break
+                    order = {field: data[f"{prefix}[{field}]"] for field in ('type', 'ordertype', 'volume', 'price') if f"{prefix}[{field}]" in data}
+                    response = self._add_order(dict(order, pair=data['pair']))
+                    orders.append({'error': ", ".join(response['error'])} if response['error'] else
+                                  {'txid': response['result']['txid'][0], 'descr': response['result']['descr']})
+                return {'error': [], 'result': {'orders': orders}}
+            if method == 'OpenOrders':
+                return {'error': [], 'result': {'open': {txid: {'descr': {'pair': order['pair'], 'type': order['type'],
+                                                                         'ordertype': order['ordertype'], 'price': str(order['price'])},
+                                                                'vol': str(order['vol']), 'status': 'open', 'opentm': order['opentm']}
+                                                         for txid, order in self.open_orders.items()}}}
+            if method == 'CancelOrder':
+                removed = self.open_orders.pop(data.get('txid'), None)
+                if removed is None:
+                    return {'error': ["EOrder:Unknown order"]}
+                return {'error': [], 'result': {'count': 1}}
+            if method == 'TradesHistory':
+                start = data.get('start')
+                matching = sorted(((txid, trade) for txid, trade in self.trades.items() if start is None or trade['time'] > float(start)),
+                                  key=lambda item: item[1]['time'], reverse=True)
+                offset = int(data.get('ofs', 0))
+                return {'error': [], 'result': {'trades': dict(matching[offset:offset + 50]), 'count': len(matching)}}
+        return {'error': ["EGeneral:Unknown method"]}
+
+class PaperExchange(KrakenAPIClient):
+    def __init__(self, replay: MarketReplay, fee: float = 0.0026, balances: Optional[Dict[str, float]] = None,
+                 speed: Optional[float] = None, start: Optional[float] = None, **backend_options):
+        """
+        Simulierte Börse mit der Schnittstelle des KrakenAPIClient (Paper-Trading, Last- und Regressionstests).
+
+        Alle Methoden des Clients (check_balance, get_market_prices, execute_trade, execute_trades,
+        estimate_fill, sync_trades, get_buy_price, ...) laufen unverändert gegen den PaperKrakenBackend.
+
+        :param replay: Die wiedergegebenen Handelsdaten.
+        :param fee: Die Handelsgebühr (z. B. 0.0026 für 0,26 %).
+        :param balances: Die Startguthaben je Asset (Standard: 10000 EUR).
+        :param speed: Der Zeitraffer-Faktor der Uhr (None: die Uhr läuft nur über run_replay()/advance()).
+        :param start: Die Marktzeit beim Start (Standard: Zeit des ersten Ereignisses).
+        :param backend_options: Weitere Parameter für PaperKrakenBackend (spread, book_levels, books, ...).
+        """
+        start = start if start is not None else (replay.times[0] if replay.times else time.time())
+        self.clock = ReplayClock(start, speed)
+        self.backend = PaperKrakenBackend(replay, self.clock, fee=fee, balances=balances, **backend_options)
+        scheduler = RateLimitScheduler()
+        for bucket in scheduler.buckets.values():
+            bucket.capacity = bucket.tokens = float('inf')  # Die Simulation kennt kein Aufrufbudget
+        super().__init__("paper", "", ledger=TradeLedger(":memory:"), scheduler=scheduler,
+                         asset_pairs=AssetPairs(self._query_public, cache_file=None))
+        self.api = self.backend
+        self._replay_thread: Optional[threading.Thread] = None
+        self._replay_stop = threading.Event()
+
+    def set_trading_fee(self, fee: float):
+        """
+        Übernimmt die in der GUI eingestellte Handelsgebühr.
+        """
+        self.backend.fee = fee
+
+    def add_listener(self, listener: Callable[[str, float, float], None]):
+        """
+        Registriert einen Callback (pair, price, time), der für jeden wiedergegebenen Trade aufgerufen wird,
+        z. B. LiveSignalEngine.on_price.
+        """
+        self.backend.listeners.append(listener)
+
+    def run_replay(self, until: Optional[float] = None, step: float = 60.0) -> int:
+        """
+        Spielt die Marktdaten so schnell wie möglich ab, in Schritten von step Sekunden Marktzeit.
+
+        :param until: Die Marktzeit, bis zu der abgespielt wird (Standard: bis zum letzten Ereignis).
+        :param step: Die Schrittweite der Uhr in Sekunden Marktzeit.
+        :return: Die Anzahl wiedergegebener Ereignisse.
+        """
+        until = until if until is not None else (self.backend.replay.times[-1] if self.backend.replay.times else self.clock.time())
+        replayed = 0
+        while self.clock.time() < until:
+            self.clock.set(min(self.clock.time() + step, until))
+            replayed += self.backend.advance()
+        return replayed
+
+    def start_replay(self, interval: float = 0.1):
+        """
+        Startet einen Hintergrund-Thread, der die Wiedergabe der (beschleunigten) Uhr folgen lässt, damit
+        Listener auch ohne API-Aufrufe Preise erhalten.
+
+        :param interval: Das Intervall in Sekunden Echtzeit zwischen zwei Schritten.
+        """
+        self._replay_stop.clear()
+        def run():
+            while not self._replay_stop.wait(interval):
+                self.backend.advance()
+        self._replay_thread = threading.Thread(target=run, name="paper-replay", daemon=True)
+        self._replay_thread.start()
+
+    def stop_replay(self):
+        self._replay_stop.set()
+        if self._replay_thread is not None:
+            self._replay_thread.join()
+            self._replay_thread = None
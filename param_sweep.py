@@ -0,0 +1,110 @@
+﻿import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from vector_backtest import run_vectorized_backtest
+
+logger = logging.getLogger(__name__)
+
+# Standard-Raster, wenn run_sweep ohne Raster aufgerufen wird
+DEFAULT_GRID = {
+    'period': [5, 10, 15, 20, 30, 50],
+    'threshold': [0.0, 0.005, 0.01],
+    'fee': [0.0016, 0.0026],
+}
+
+# Im Worker-Prozess: Ansichten auf die Kursdaten im Shared Memory
+_shared = {}
+
+def _attach_shared_prices(name: str, bars: int):
+    """
+    Initialisiert einen Worker-Prozess mit Ansichten auf die Kursdaten im Shared Memory (ohne Kopie).
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    prices = np.ndarray((2, bars), dtype=np.float64, buffer=memory.buf)
+    _shared.update(memory=memory, open=prices[0], close=prices[1])
+
+def compute_metrics(equity: np.ndarray, cash: float, trades: int, periods_per_year: float) -> Dict[str, float]:
+    """
+    Berechnet die Kennzahlen einer Equity-Kurve.
+
+    Der vektorisierte Backtest begrenzt die Barmittel nicht; fällt der Portfoliowert dabei auf 0 oder darunter,
+    wäre das Konto ruiniert. Solche Läufe erhalten eine Sharpe Ratio von -inf und werden als 'ruined' markiert.
+
+    :param equity: Der Portfoliowert je Bar.
+    :param cash: Das Startkapital.
+    :param trades: Die Anzahl ausgeführter Orders.
+    :param periods_per_year: Die Anzahl Bars pro Jahr (für die Annualisierung der Sharpe Ratio).
+    :return: Ein Dictionary mit total_return, max_drawdown, sharpe, trades und ruined.
+    """
+    peaks = np.maximum.accumulate(equity)
+    drawdown = np.where(peaks > 0, 1 - equity / peaks, 0.0)
+    ruined = bool((equity <= 0).any())
+    if ruined:
+        sharpe = -np.inf
+    else:
+        returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.zeros(0)
+        std = returns.std() if len(returns) else 0.0
+        sharpe = returns.mean() / std * np.sqrt(periods_per_year) if std > 0 else 0.0
+    return {
+        'total_return': equity[-1] / cash - 1,
+        'max_drawdown': float(drawdown.max()),
+        'sharpe': float(sharpe),
+        'trades': trades,
+        'ruined': ruined,
+    }
+
+def _run_combination(params: Dict, stake: float, cash: float, periods_per_year: float) -> Dict:
+    """
+    Führt einen Backtest im Worker-Prozess auf den Kursdaten im Shared Memory aus.
+    """
+    result = run_vectorized_backtest(_shared['open'], _shared['close'], period=params['period'], fee=params['fee'],
+                                     stake=stake, cash=cash, threshold=params['threshold'])
+    metrics = compute_metrics(result['equity'], cash, len(result['fill_bars']), periods_per_year)
+    return dict(params, **metrics)
+
+def run_sweep(open_: Sequence[float], close: Sequence[float], grid: Optional[Dict[str, List]] = None,
+              processes: Optional[int] = None, stake: float = 1.0, cash: float = 10000.0,
+              periods_per_year: float = 365, rank_by: str = 'sharpe') -> pd.DataFrame:
+    """
+    Testet alle Parameterkombinationen eines Rasters parallel in einem Prozess-Pool.
+
+    Die Kursdaten liegen einmal im Shared Memory; die Worker lesen sie ohne Kopie.
+
+    :param open_: Die Eröffnungskurse.
+    :param close: Die Schlusskurse.
+    :param grid: Das Raster mit den Schlüsseln 'period', 'threshold' und 'fee' (Standard: DEFAULT_GRID).
+    :param processes: Die Anzahl Worker-Prozesse (Standard: Anzahl CPU-Kerne).
+    :param stake: Die Stückzahl pro Order.
+    :param cash: Das Startkapital.
+    :param periods_per_year: Die Anzahl Bars pro Jahr (365 für Tageskerzen).
+    :param rank_by: Die Kennzahl, nach der absteigend sortiert wird.
+    :return: Ein DataFrame mit einer Zeile je Kombination, sortiert nach rank_by; ruinierte Kombinationen stehen am Ende.
+    """
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    keys = ['period', 'threshold', 'fee']
+    combinations = [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+    prices = np.vstack([np.asarray(open_, dtype=np.float64), np.asarray(close, dtype=np.float64)])
+    bars = prices.shape[1]
+    processes = processes or os.cpu_count() or 1
+
+    memory = shared_memory.SharedMemory(create=True, size=prices.nbytes)
+    try:
+        np.ndarray(prices.shape, dtype=np.float64, buffer=memory.buf)[:] = prices
+        with ProcessPoolExecutor(max_workers=processes, initializer=_attach_shared_prices,
+                                 initargs=(memory.name, bars)) as executor:
+            chunksize = max(1, len(combinations) // (processes * 4))
+            results = list(executor.map(_run_combination, combinations, itertools.repeat(stake),
+                                        itertools.repeat(cash), itertools.repeat(periods_per_year), chunksize=chunksize))
+    finally:
+        memory.close()
+        memory.unlink()
+    logger.info("Parameter sweep finished: %s combinations on %s processes.", len(results), processes)
+    table = pd.DataFrame(results).sort_values(['ruined', rank_by], ascending=[True, False]).reset_index(drop=True)
+    table.index += 1
+    table.index.name = 'rank'
+    return table
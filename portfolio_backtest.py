@@ -0,0 +1,154 @@
+﻿import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from vector_backtest import sma_signals
+
+logger = logging.getLogger(__name__)
+
+def align_series(series: Dict[str, Dict[str, np.ndarray]]):
+    """
+    Richtet die Kerzen mehrerer Paare auf gemeinsame Zeitstempel aus (Vereinigung aller Zeitstempel).
+
+    Fehlende Kerzen werden mit dem letzten Schlusskurs aufgefüllt; vor der ersten Kerze eines Paares
+    ist das Paar nicht handelbar.
+
+    :param series: Paar -> Spalten ('time', 'open', 'close') wie von OHLCStore.load().
+    :return: Ein Tupel (times, opens, closes, tradable) mit Matrizen der Form (Paare, Zeitstempel).
+    """
+    pairs = list(series)
+    times = np.unique(np.concatenate([np.asarray(series[pair]['time']) for pair in pairs]))
+    opens = np.full((len(pairs), len(times)), np.nan)
+    closes = np.full((len(pairs), len(times)), np.nan)
+    tradable = np.zeros((len(pairs), len(times)), dtype=bool)
+    for row, pair in enumerate(pairs):
+        positions = np.searchsorted(times, series[pair]['time'])
+        opens[row, positions] = series[pair]['open']
+        closes[row, positions] = series[pair]['close']
+        tradable[row, positions] = True
+    # Lücken mit dem letzten Schlusskurs füllen (Forward-Fill je Zeile)
+    last_seen = np.where(tradable, np.arange(len(times)), 0)
+    np.maximum.accumulate(last_seen, axis=1, out=last_seen)
+    closes = np.take_along_axis(closes, last_seen, axis=1)
+    opens = np.where(tradable, opens, closes)
+    return times, opens, closes, tradable
+
+def backtest_portfolio(series: Dict[str, Dict[str, np.ndarray]], period: int = 15, threshold: float = 0.0,
+                       fee: float = 0.0026, cash: float = 10000.0, allocation: Optional[float] = None,
+                       workers: Optional[int] = None) -> Dict:
+    """
+    Führt MyStrategy gleichzeitig über mehrere Paare mit einem gemeinsamen Kapitalpool aus.
+
+    Die Signale der Paare hängen nicht voneinander ab und werden parallel berechnet; die Ausführung
+    läuft danach Bar für Bar über alle Paare gleichzeitig, weil sich die Paare das Kapital teilen.
+    Die Strategie handelt im Portfolio-Modus nur long: Ein Kaufsignal eröffnet eine Position mit
+    allocation × Portfoliowert, ein Verkaufssignal schließt sie. Orders werden zum Eröffnungskurs des
+    folgenden Bars ausgeführt; reicht das Kapital nicht, werden alle Käufe des Bars anteilig gekürzt.
+
+    :param series: Paar -> Spalten ('time', 'open', 'close') wie von OHLCStore.load().
+    :param period: Die Periode des SMA.
+    :param threshold: Der relative Abstand zwischen SMA und Schlusskurs für ein Signal.
+    :param fee: Die Handelsgebühr (z. B. 0.0026 für 0,26 %).
+    :param cash: Das Startkapital.
+    :param allocation: Der Anteil des Portfoliowerts pro Position (Standard: 1 / Anzahl Paare).
+    :param workers: Die Anzahl Threads für die Signalberechnung.
+    :return: Ein Dictionary mit 'times', 'equity', 'cash', 'attribution' (DataFrame je Paar) und 'runtime' (Sekunden).
+    """
+    start = time.perf_counter()
+    pairs = list(series)
+    allocation = allocation if allocation is not None else 1.0 / len(pairs)
+    times, opens, closes, tradable = align_series(series)
+    # Signale je Paar auf den eigenen (lückenlosen) Kerzen berechnen und auf die gemeinsame Zeitachse legen
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        signal_rows = list(executor.map(lambda pair: sma_signals(series[pair]['close'], period, threshold), pairs))
+    signals = np.zeros(tradable.shape, dtype=np.int8)
+    for row, pair in enumerate(pairs):
+        signals[row, np.searchsorted(times, series[pair]['time'])] = signal_rows[row]
+
+    bars = len(times)
+    position = np.zeros(len(pairs))
+    cost_basis = np.zeros(len(pairs))
+    realized = np.zeros(len(pairs))
+    fees = np.zeros(len(pairs))
+    trades = np.zeros(len(pairs), dtype=np.int64)
+    equity = np.empty(bars)
+    cash_curve = np.empty(bars)
+    equity[0] = cash_curve[0] = cash
+    for t in range(1, bars):
+        price = opens[:, t]
+        previous = signals[:, t - 1]
+        can_trade = tradable[:, t]
+        sells = can_trade & (position > 0) & (previous == -1)
+        if sells.any():
+            proceeds = position[sells] * price[sells]
+            sell_fees = proceeds * fee
+            cash += (proceeds - sell_fees).sum()
+            realized[sells] += proceeds - sell_fees - cost_basis[sells]
+            fees[sells] += sell_fees
+            trades[sells] += 1
+            position[sells] = 0
+            cost_basis[sells] = 0
+        buys = can_trade & (position == 0) & (previous == 1)
+        if buys.any():
+            target = np.full(buys.sum(), allocation * equity[t - 1])
+            needed = target.sum() * (1 + fee)
+            if needed > cash:
+                target *= max(cash, 0.0) / needed
+            buy_fees = target * fee
+            position[buys] = target / price[buys]
+            cost_basis[buys] = target + buy_fees
+            fees[buys] += buy_fees
+            trades[buys] += 1
+            cash -= (target + buy_fees).sum()
+        cash_curve[t] = cash
+        equity[t] = cash + np.nansum(position * closes[:, t])
+
+    unrealized = np.nan_to_num(position * closes[:, -1]) - cost_basis
+    attribution = pd.DataFrame({
+        'pair': pairs,
+        'trades': trades,
+        'fees': fees,
+        'realized_pnl': realized,
+        'unrealized_pnl': unrealized,
+        'total_pnl': realized + unrealized,
+    }).set_index('pair').sort_values('total_pnl', ascending=False)
+    runtime = time.perf_counter() - start
+    logger.info("Portfolio backtest over %s pairs and %s bars finished in %.3f s.", len(pairs), bars, runtime)
+    return {'times': times, 'equity': equity, 'cash': cash_curve, 'attribution': attribution, 'runtime': runtime}
+
+def run_portfolio_backtest(pairs: Optional[List[str]] = None, store=None, interval: int = 1440, update: bool = True,
+                           **kwargs) -> Dict:
+    """
+    Führt den Portfolio-Backtest über alle Favoriten mit den Daten aus dem lokalen OHLC-Speicher aus.
+
+    :param pairs: Die Paare (Standard: die Favoriten aus favorites.json).
+    :param store: Der OHLC-Speicher (Standard: OHLCStore()).
+    :param interval: Das Kerzenintervall in Minuten.
+    :param update: True, um die Kerzen vorher inkrementell nachzuladen.
+    :param kwargs: Weitere Parameter für backtest_portfolio (period, threshold, fee, cash, allocation, workers).
+    :return: Das Ergebnis von backtest_portfolio.
+    """
+    if pairs is None:
+        from models.favorites import Favorites
+        pairs = Favorites().get_favorites()
+    if store is None:
+        from ohlc_store import OHLCStore
+        store = OHLCStore()
+    series = {}
+    for pair in pairs:
+        if update:
+            store.update(pair, interval)
+        columns = store.load(pair, interval)
+        if columns is None:
+            logger.warning("No OHLC data for %s, skipping it in the portfolio backtest.", pair)
+            continue
+        series[pair] = columns
+    return backtest_portfolio(series, **kwargs)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    result = run_portfolio_backtest()
+    print(f"Final equity: {result['equity'][-1]:.2f} EUR  (runtime {result['runtime']:.3f} s)")
+    print(result['attribution'].to_string())
@@ -0,0 +1,158 @@
+﻿import logging
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Funktionsschlüssel wie im pstats-Format: (Datei, erste Zeile, Funktionsname)
+FunctionKey = Tuple[str, int, str]
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.01, duration: float = 30.0, output_dir: str = "profiles"):
+        """
+        Stichproben-Profiler für den laufenden Bot: liest in festen Abständen die Stacks aller Threads
+        (sys._current_frames) und schreibt sie als Collapsed Stacks (für flamegraph.pl/speedscope) und als
+        pstats-Datei (für snakeviz, gprof2dot oder pstats).
+
+        Im Gegensatz zu cProfile werden die profilierten Threads nicht verlangsamt; die Kosten trägt allein
+        der Sampling-Thread (etwa ein Stack-Durchlauf je Thread und Intervall).
+
+        :param interval: Der Abstand zwischen zwei Stichproben in Sekunden.
+        :param duration: Die Dauer einer Aufzeichnung in Sekunden, danach wird automatisch gestoppt (None: unbegrenzt).
+        :param output_dir: Das Verzeichnis für die Ausgabedateien.
+        """
+        self.interval = interval
+        self.duration = duration
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.last_files: Optional[Tuple[str, str]] = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration: Optional[float] = None) -> bool:
+        """
+        Startet eine Aufzeichnung.
+
+        :param duration: Abweichende Dauer in Sekunden (Standard: self.duration).
+        :return: False, wenn bereits eine Aufzeichnung läuft.
+        """
+        with self.lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.stop_event.clear()
+            duration = self.duration if duration is None else duration
+            self.thread = threading.Thread(target=self._run, args=(duration,), name="profiler", daemon=True)
+            self.thread.start()
+        logger.info("Sampling profiler started (%.0f Hz, %s s).", 1 / self.interval, duration or 'unlimited')
+        return True
+
+    def stop(self) -> Optional[Tuple[str, str]]:
+        """
+        Beendet die Aufzeichnung und wartet, bis die Dateien geschrieben sind.
+
+        :return: Die Pfade (collapsed, pstats) oder None, wenn keine Aufzeichnung lief.
+        """
+        thread = self.thread
+        if thread is None:
+            return None
+        self.stop_event.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        return self.last_files
+
+    def toggle(self):
+        """
+        Startet bzw. beendet die Aufzeichnung (z. B. per Menü oder SIGUSR1).
+        """
+        if self.running:
+            threading.Thread(target=self.stop, name="profiler-stop", daemon=True).start()
+        else:
+            self.start()
+
+    def _run(self, duration: Optional[float]):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        while not self.stop_event.wait(self.interval):
+            self._sample(own_id)
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.last_files = self.write()
+        self.thread = None
+
+    def _sample(self, own_id: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            stack.append(("~", 0, names.get(thread_id, f"thread-{thread_id}")))
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def write(self) -> Tuple[str, str]:
+        """
+        Schreibt die gesammelten Stichproben als Collapsed Stacks und als pstats-Datei.
+
+        :return: Die Pfade (collapsed, pstats).
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S"))
+        collapsed_file, pstats_file = base + ".collapsed", base + ".pstats"
+        with open(collapsed_file, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(";".join(self._label(key) for key in stack) + f" {count}\n")
+        with open(pstats_file, 'wb') as f:
+            marshal.dump(self.to_pstats(), f)
+        logger.info("Profiler wrote %s samples to %s and %s.", self.samples, collapsed_file, pstats_file)
+        return collapsed_file, pstats_file
+
+    @staticmethod
+    def _label(key: FunctionKey) -> str:
+        filename, line, name = key
+        return name if filename == "~" else f"{name} ({os.path.basename(filename)}:{line})"
+
+    def to_pstats(self) -> Dict[FunctionKey, Tuple]:
+        """
+        Wandelt die Stichproben in das Format von pstats.Stats um: eine Stichprobe zählt als ein Aufruf,
+        die Eigenzeit geht an die oberste Funktion, die Gesamtzeit an jede Funktion im Stack (einmal je Stichprobe).
+        """
+        stats: Dict[FunctionKey, List] = {}
+        for stack, count in self.stacks.items():
+            seconds = count * self.interval
+            seen = set()
+            for depth, key in enumerate(stack):
+                entry = stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+                if depth == len(stack) - 1:
+                    entry[2] += seconds
+                if key in seen:
+                    continue  # Rekursion: Gesamtzeit nur einmal je Stichprobe
+                seen.add(key)
+                entry[0] += count
+                entry[1] += count
+                entry[3] += seconds
+                if depth:
+                    caller = stack[depth - 1]
+                    nc, cc, tt, ct = entry[4].get(caller, (0, 0, 0.0, 0.0))
+                    entry[4][caller] = (nc + count, cc + count, tt + (seconds if depth == len(stack) - 1 else 0.0), ct + seconds)
+        return {key: (cc, nc, tt, ct, callers) for key, (cc, nc, tt, ct, callers) in stats.items()}
+
+# Gemeinsamer Profiler des Prozesses (Settings-Menü der GUI, SIGUSR1 im Headless-Modus)
+PROFILER = SamplingProfiler()
@@ -0,0 +1,202 @@
+﻿import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prioritäten (kleinerer Wert = wichtiger)
+PRIORITY_ORDER = 0
+PRIORITY_REFRESH = 10
+PRIORITY_BACKGROUND = 20
+
+# Kosten privater Endpunkte auf dem REST-Zähler von Kraken. Nicht aufgeführte Endpunkte kosten 1.
+# AddOrder/CancelOrder laufen über den separaten Handelszähler und belasten diesen Zähler nicht.
+ENDPOINT_COSTS = {
+    'TradesHistory': 2,
+    'Ledgers': 2,
+    'QueryLedgers': 2,
+    'ClosedOrders': 2,
+    'AddOrder': 0,
+    'AddOrderBatch': 0,
+    'EditOrder': 0,
+    'CancelOrder': 0,
+    'CancelOrderBatch': 0,
+    'CancelAll': 0,
+}
+
+# Zählergrenzen und Abbaurate pro Sekunde je Verifizierungsstufe
+ACCOUNT_TIERS = {
+    'starter': (15, 0.33),
+    'intermediate': (20, 0.5),
+    'pro': (20, 1.0),
+}
+
+class RateLimitBudgetExceeded(Exception):
+    """
+    Wird ausgelöst, wenn eine niedrig priorisierte Anfrage wegen knappen Budgets verworfen wird.
+    """
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_rate: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialisiert einen Token-Bucket, der den Kraken-Aufrufzähler nachbildet.
+
+        :param capacity: Die maximale Anzahl Tokens (entspricht dem Zählerlimit).
+        :param refill_rate: Die Anzahl Tokens, die pro Sekunde zurückkommen (entspricht der Abbaurate).
+        :param clock: Die Zeitquelle (für Tests austauschbar).
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.waiters = []
+
+    def refill(self) -> float:
+        """
+        Schreibt die seit der letzten Abfrage zurückgewonnenen Tokens gut.
+
+        :return: Die aktuell verfügbaren Tokens.
+        """
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+        return self.tokens
+
+    def time_until(self, tokens: float) -> float:
+        """
+        Gibt zurück, wie viele Sekunden es dauert, bis die angegebene Anzahl Tokens verfügbar ist.
+        """
+        return max(0.0, (tokens - self.tokens) / self.refill_rate)
+
+class RateLimitScheduler:
+    def __init__(self, tier: str = 'starter', reserve: float = 2.0, max_wait: float = 10.0,
+                 public_capacity: float = 15, public_rate: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialisiert den Scheduler, der API-Aufrufe anhand des Kraken-Aufrufzählers priorisiert und drosselt.
+
+        :param tier: Die Verifizierungsstufe des Kontos ('starter', 'intermediate' oder 'pro').
+        :param reserve: Tokens, die Aufträgen vorbehalten bleiben; Aktualisierungen dürfen sie nicht verbrauchen.
+        :param max_wait: Die maximale Wartezeit in Sekunden, bevor eine Aktualisierungsanfrage verworfen wird.
+        :param public_capacity: Die Kapazität des Buckets für öffentliche Endpunkte (pro IP).
+        :param public_rate: Die Anzahl öffentlicher Anfragen pro Sekunde.
+        :param clock: Die Zeitquelle (für Tests austauschbar).
+        """
+        capacity, decay_rate = ACCOUNT_TIERS[tier]
+        self.buckets = {
+            'private': TokenBucket(capacity, decay_rate, clock),
+            'public': TokenBucket(public_capacity, public_rate, clock),
+        }
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.pending: Dict[Tuple, Future] = {}
+        self.dropped = 0
+
+    def get_budget(self, bucket: str = 'private') -> Tuple[float, float]:
+        """
+        Gibt das aktuell verfügbare Budget zurück, z. B. für die Anzeige in der GUI.
+
+        :param bucket: 'private' für den Kontozähler oder 'public' für öffentliche Endpunkte.
+        :return: Ein Tupel (verfügbare Tokens, Kapazität).
+        """
+        with self.condition:
+            token_bucket = self.buckets[bucket]
+            return token_bucket.refill(), token_bucket.capacity
+
+    def acquire(self, endpoint: str, priority: int = PRIORITY_REFRESH, public: bool = False):
+        """
+        Blockiert, bis das Budget für den Endpunkt reicht und keine wichtigere Anfrage mehr wartet.
+
+        :param endpoint: Der API-Endpunkt (z. B. 'Balance').
+        :param priority: Die Priorität der Anfrage (PRIORITY_ORDER, PRIORITY_REFRESH, PRIORITY_BACKGROUND).
+        :param public: True für öffentliche Endpunkte.
+        :raises RateLimitBudgetExceeded: Wenn eine nachrangige Anfrage bei knappem Budget verworfen wird.
+        """
+        cost = 1 if public else ENDPOINT_COSTS.get(endpoint, 1)
+        if cost == 0:
+            return
+        token_bucket = self.buckets['public' if public else 'private']
+        # Aufträge dürfen die Reserve nutzen, alle anderen Anfragen müssen sie übrig lassen
+        needed = cost + (self.reserve if priority > PRIORITY_ORDER and not public else 0)
+        ticket = (priority, next(self.sequence))
+        with self.condition:
+            heapq.heappush(token_bucket.waiters, ticket)
+            deadline = self.clock() + self.max_wait
+            try:
+                while True:
+                    token_bucket.refill()
+                    is_next = token_bucket.waiters[0] == ticket
+                    if is_next and token_bucket.tokens >= needed:
+                        token_bucket.tokens -= cost
+                        return
+                    wait_time = token_bucket.time_until(needed) if is_next else 0.05
+                    if priority >= PRIORITY_BACKGROUND or (priority > PRIORITY_ORDER and self.clock() + wait_time > deadline):
+                        self.dropped += 1
+                        raise RateLimitBudgetExceeded(f"Dropped {endpoint} call, rate limit budget too low.")
+                    self.condition.wait(timeout=max(wait_time, 0.01))
+            finally:
+                token_bucket.waiters.remove(ticket)
+                heapq.heapify(token_bucket.waiters)
+                self.condition.notify_all()
+
+    def penalize(self, public: bool = False):
+        """
+        Setzt das Budget auf null, nachdem Kraken 'EAPI:Rate limit exceeded' gemeldet hat.
+
+        :param public: True, wenn die Meldung von einem öffentlichen Endpunkt kam.
+        """
+        with self.condition:
+            token_bucket = self.buckets['public' if public else 'private']
+            token_bucket.refill()
+            token_bucket.tokens = 0.0
+        logger.warning("Rate limit exceeded, waiting for the API counter to decay.")
+
+    def call(self, endpoint: str, fn: Callable[[], Dict], params: Optional[Dict] = None,
+             priority: int = PRIORITY_REFRESH, public: bool = False) -> Dict:
+        """
+        Führt einen API-Aufruf unter Berücksichtigung des Budgets aus.
+
+        Gleiche nachrangige Aufrufe (gleicher Endpunkt und gleiche Parameter), die gleichzeitig laufen,
+        werden zusammengefasst und teilen sich das Ergebnis.
+
+        :param endpoint: Der API-Endpunkt (z. B. 'Balance').
+        :param fn: Die Funktion, die die eigentliche Anfrage ausführt.
+        :param params: Die Anfrageparameter (nur für das Zusammenfassen verwendet).
+        :param priority: Die Priorität der Anfrage.
+        :param public: True für öffentliche Endpunkte.
+        :return: Die Antwort der API.
+        """
+        key = None
+        if priority > PRIORITY_ORDER:
+            key = (endpoint, tuple(sorted((params or {}).items())))
+            with self.condition:
+                shared = self.pending.get(key)
+                if shared is None:
+                    self.pending[key] = Future()
+            if shared is not None:
+                logger.debug("Coalescing %s call with one already in flight.", endpoint)
+                return shared.result()
+        future = self.pending[key] if key else None
+        try:
+            self.acquire(endpoint, priority, public)
+            response = fn()
+            if 'EAPI:Rate limit exceeded' in (response or {}).get('error', []):
+                self.penalize(public)
+            if future:
+                future.set_result(response)
+            return response
+        except BaseException as e:
+            if future:
+                future.set_exception(e)
+            raise
+        finally:
+            if key:
+                with self.condition:
+                    self.pending.pop(key, None)
@@ -0,0 +1,66 @@
+﻿import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+def plan_rebalance(holdings: Dict[str, float], prices: Dict[str, float], target_weights: Dict[str, float],
+                   cash: float, fee: float = 0.0026, min_order_value: float = 5.0) -> List[Dict]:
+    """
+    Berechnet die Orders, mit denen das Portfolio die Zielgewichte erreicht.
+
+    Es wird nur gehandelt, wo die Abweichung vom Zielwert mindestens min_order_value beträgt; Verkäufe
+    stehen vor den Käufen, damit deren Erlös für die Käufe zur Verfügung steht. Reicht das Kapital
+    (nach Gebühren) nicht für alle Käufe, werden sie anteilig gekürzt.
+
+    :param holdings: Paar -> gehaltenes Volumen der Basiswährung (z. B. {'ADAEUR': 1200.0}).
+    :param prices: Paar -> aktueller Marktpreis.
+    :param target_weights: Paar -> Zielanteil am Gesamtwert; der Rest bleibt als Barmittel.
+    :param cash: Das verfügbare Barguthaben in der Quote-Währung.
+    :param fee: Die Handelsgebühr (z. B. 0.0026 für 0,26 %).
+    :param min_order_value: Der Mindestwert einer Order in der Quote-Währung.
+    :return: Die Orders als Dictionaries mit 'pair', 'side', 'volume' und 'value' (Verkäufe zuerst).
+    """
+    if sum(target_weights.values()) > 1 + 1e-9:
+        raise ValueError("Target weights must not sum to more than 1.")
+    pairs = set(holdings) | set(target_weights)
+    missing = [pair for pair in pairs if not prices.get(pair)]
+    for pair in missing:
+        logger.warning("No market price for %s, leaving it out of the rebalance.", pair)
+    pairs = sorted(pair for pair in pairs if pair not in missing)
+    total_value = cash + sum(holdings.get(pair, 0.0) * prices[pair] for pair in pairs)
+    sells, buys = [], []
+    for pair in pairs:
+        difference = target_weights.get(pair, 0.0) * total_value - holdings.get(pair, 0.0) * prices[pair]
+        if abs(difference) < min_order_value:
+            continue
+        order = {'pair': pair, 'side': 'buy' if difference > 0 else 'sell', 'value': abs(difference)}
+        (buys if difference > 0 else sells).append(order)
+    available = cash + sum(order['value'] for order in sells) * (1 - fee)
+    needed = sum(order['value'] for order in buys) * (1 + fee)
+    scale = min(1.0, available / needed) if needed > 0 else 1.0
+    for order in buys:
+        order['value'] *= scale
+    orders = [order for order in sells + buys if order['value'] >= min_order_value]
+    for order in orders:
+        order['volume'] = round(order['value'] / prices[order['pair']], 8)
+    return orders
+
+def execute_rebalance(api_client, orders: List[Dict]) -> List[Dict]:
+    """
+    Führt einen Rebalance-Plan in zwei Schritten aus: erst alle Verkäufe, dann alle Käufe, jeweils über
+    KrakenAPIClient.execute_trades (ein AddOrder- bzw. AddOrderBatch-Aufruf je Paar, die Paare parallel).
+    Schlägt ein Verkauf fehl, werden die Käufe nicht mehr gesendet, weil ihnen dann das Kapital fehlen kann.
+
+    :param api_client: Der KrakenAPIClient.
+    :param orders: Die Orders aus plan_rebalance.
+    :return: Ein Ergebnis je Order (wie bei execute_trades) in der Reihenfolge des Plans.
+    """
+    sells = [order for order in orders if order['side'] == 'sell']
+    buys = [order for order in orders if order['side'] == 'buy']
+    results = api_client.execute_trades(sells) if sells else []
+    if any(not leg['ok'] for leg in results):
+        logger.error("Rebalance: at least one sell failed, buy orders are not sent.")
+        return results + [dict(order, ok=False, txid=None, error="skipped: sell leg failed") for order in buys]
+    if buys:
+        results += api_client.execute_trades(buys)
+    return results
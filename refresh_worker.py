@@ -0,0 +1,173 @@
+﻿import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Obergrenze für die Threads eines Aktualisierungs-Pools. fetch_portfolio_rows fragt zuerst den Kontostand ab
+# (Balance) und startet danach genau zwei Aufrufe parallel: eine gebündelte Ticker-Anfrage für alle Paare und den
+# Abgleich der Handelshistorie (TradesHistory). Ein dritter Thread hätte nie etwas zu tun; größere Werte werden
+# daher mit einer Warnung auf diese Grenze gesetzt (siehe clamp_workers).
+MAX_REFRESH_WORKERS = 2
+
+def clamp_workers(max_workers: int) -> int:
+    """
+    Begrenzt die Anzahl der Threads eines Aktualisierungs-Pools auf MAX_REFRESH_WORKERS.
+
+    :param max_workers: Die gewünschte Anzahl paralleler API-Aufrufe.
+    :return: Die tatsächlich verwendete Anzahl.
+    """
+    if max_workers > MAX_REFRESH_WORKERS:
+        logger.warning("Refresh parallelism %s exceeds the %s parallel calls of a refresh, using %s.",
+                       max_workers, MAX_REFRESH_WORKERS, MAX_REFRESH_WORKERS)
+        return MAX_REFRESH_WORKERS
+    return max_workers
+
+def build_row(pair: str, available: float, market_price: Optional[float], buy_price: Optional[float]) -> Tuple:
+    """
+    Berechnet eine Zeile der Portfolio-Tabelle.
+
+    :return: Ein Tupel (pair, available, market_price, buy_price, current_value, deviation).
+    """
+    current_value = round(market_price * available, 2) if market_price else "N/A"
+    deviation = ((market_price - buy_price) / buy_price) * 100 if market_price and buy_price else "N/A"
+    return (pair, available, market_price, buy_price, current_value, deviation)
+
+@timed('update_balance')
+def fetch_portfolio_rows(api_client, favorites: List[str], executor: ThreadPoolExecutor, ticker_stream=None) -> List[Tuple]:
+    """
+    Lädt Kontostand, Marktpreise und Handelshistorie und berechnet daraus die Zeilen der Portfolio-Tabelle.
+
+    Nach dem Kontostand werden die Ticker-Anfrage und der Abgleich des Handelsjournals parallel ausgeführt
+    (daher genügen MAX_REFRESH_WORKERS Threads im Pool).
+    Ist ein verbundener Ticker-Stream angegeben, werden nur Preise, die der Stream noch nicht kennt, per REST geladen.
+
+    :param api_client: Der KrakenAPIClient, über den die Anfragen laufen.
+    :param favorites: Die Liste der Favoriten-Paare.
+    :param executor: Der Thread-Pool für die parallelen API-Aufrufe.
+    :param ticker_stream: Optional ein TickerStream mit den aktuellen Preisen.
+    :return: Eine Liste von Tupeln (pair, available, market_price, buy_price, current_value, deviation).
+    """
+    balance = api_client.check_balance(favorites)
+    held_pairs = [f"{base_currency}EUR" for base_currency, available in balance.items() if available > 0]
+    held_pairs = [pair for pair in held_pairs if pair in favorites]
+    streaming = ticker_stream is not None and ticker_stream.connected.is_set()
+    market_prices = ticker_stream.get_prices(held_pairs) if streaming else {}
+    missing_pairs = [pair for pair in held_pairs if pair not in market_prices]
+    prices_future = executor.submit(api_client.get_market_prices, missing_pairs) if missing_pairs else None
+    trades_future = executor.submit(api_client.sync_trades)
+    if prices_future is not None:
+        snapshot = prices_future.result()
+        if ticker_stream is not None:
+            ticker_stream.set_snapshot(snapshot)
+        market_prices.update(snapshot)
+    trades_future.result()
+    rows = []
+    for base_currency, available in balance.items():
+        pair = f"{base_currency}EUR"
+        if pair in favorites and available > 0:
+            market_price = market_prices.get(pair)
+            buy_price = api_client.get_buy_price(pair, fallback_price=market_price)
+            rows.append(build_row(pair, available, market_price, buy_price))
+    return rows
+
+class RefreshWorker:
+    def __init__(self, root, fetch: Callable[[ThreadPoolExecutor], object], on_result: Callable[[object], None],
+                 max_workers: int = MAX_REFRESH_WORKERS, poll_interval: int = 100):
+        """
+        Initialisiert den Hintergrund-Worker für die Aktualisierung.
+
+        Die Netzwerkaufrufe laufen außerhalb des Tk-Hauptthreads; die Ergebnisse werden über eine Queue
+        zurückgegeben, die per root.after im Tk-Thread geleert wird.
+
+        :param root: Das Tk-Hauptfenster, dessen Ereignisschleife die Ergebnisse verarbeitet.
+        :param fetch: Funktion, die mit dem Thread-Pool aufgerufen wird und das Ergebnis liefert.
+        :param on_result: Callback, der im Tk-Thread mit dem Ergebnis aufgerufen wird.
+        :param max_workers: Die Anzahl paralleler API-Aufrufe (für fetch_portfolio_rows höchstens MAX_REFRESH_WORKERS).
+        :param poll_interval: Das Intervall in Millisekunden, in dem die Ergebnis-Queue geleert wird.
+        """
+        self.root = root
+        self.fetch = fetch
+        self.on_result = on_result
+        self.poll_interval = poll_interval
+        self.results = queue.Queue()
+        self.in_flight = threading.Lock()
+        max_workers = clamp_workers(max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self.max_workers = max_workers
+        self._drain_job = self.root.after(self.poll_interval, self._drain)
+
+    def set_max_workers(self, max_workers: int):
+        """
+        Ändert die Anzahl paralleler API-Aufrufe. Ein laufender Abruf wird noch mit dem alten Pool beendet;
+        der alte Pool wird dann erst am Ende dieses Abrufs (in _run) heruntergefahren.
+
+        :param max_workers: Die neue Anzahl paralleler API-Aufrufe (höchstens MAX_REFRESH_WORKERS).
+        """
+        max_workers = clamp_workers(max_workers)
+        old_executor = self.executor
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self.max_workers = max_workers
+        if not self.is_busy():
+            old_executor.shutdown(wait=False)
+        logger.info("Refresh parallelism set to %s.", max_workers)
+
+    def request_refresh(self) -> bool:
+        """
+        Startet einen Abruf im Hintergrund, sofern nicht bereits einer läuft.
+
+        :return: True, wenn ein Abruf gestartet wurde, False, wenn noch ein vorheriger Abruf läuft.
+        """
+        if not self.in_flight.acquire(blocking=False):
+            logger.warning("Previous refresh still running, skipping this one.")
+            return False
+        threading.Thread(target=self._run, args=(self.executor,), name="refresh-coordinator", daemon=True).start()
+        return True
+
+    def is_busy(self) -> bool:
+        """
+        Gibt an, ob gerade ein Abruf läuft.
+        """
+        return self.in_flight.locked()
+
+    def _run(self, executor: ThreadPoolExecutor):
+        """
+        Führt den Abruf aus und legt das Ergebnis (oder den Fehler) in die Queue.
+        """
+        try:
+            self.results.put((self.fetch(executor), None))
+        except Exception as e:
+            logger.error("Error during background refresh: %s", e)
+            self.results.put((None, e))
+        finally:
+            if executor is not self.executor:
+                executor.shutdown(wait=False)  # Während des Abrufs durch set_max_workers ersetzt
+            self.in_flight.release()
+
+    def _drain(self):
+        """
+        Übergibt alle fertigen Ergebnisse im Tk-Thread an den Callback.
+        """
+        try:
+            while True:
+                result, error = self.results.get_nowait()
+                if error is None:
+                    self.on_result(result)
+        except queue.Empty:
+            pass
+        except Exception as e:
+            logger.error("Error applying refresh result: %s", e)
+        finally:
+            self._drain_job = self.root.after(self.poll_interval, self._drain)
+
+    def shutdown(self):
+        """
+        Beendet den Worker und den Thread-Pool.
+        """
+        if self._drain_job is not None:
+            self.root.after_cancel(self._drain_job)
+            self._drain_job = None
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,276 @@
+﻿import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from rate_limiter import RateLimitBudgetExceeded
+
+logger = logging.getLogger(__name__)
+
+# Vorübergehende Kraken-Fehler, bei denen sich eine Wiederholung lohnt und die den Schutzschalter auslösen
+TRANSIENT_ERRORS = ('EService:Unavailable', 'EService:Busy', 'EService:Deadline elapsed', 'EGeneral:Internal error')
+
+# Private Lese-Endpunkte, deren letzte Antwort bei offenem Schutzschalter ausgeliefert werden darf
+# (TradesHistory nicht: sync_trades blättert per Offset und darf keine veraltete Seite erhalten)
+CACHEABLE_PRIVATE = frozenset({'Balance', 'TradeBalance', 'OpenOrders'})
+
+class CircuitOpenError(Exception):
+    """
+    Der Schutzschalter des Endpunkts ist offen und es gibt keinen (ausreichend frischen) zwischengespeicherten Wert.
+    """
+
+class DeadlineExceeded(Exception):
+    """
+    Die Frist eines Aufrufs ist abgelaufen.
+    """
+
+def is_transient(errors: Iterable[str]) -> bool:
+    return any(error.startswith(TRANSIENT_ERRORS) for error in errors or ())
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Schutzschalter eines Endpunkts: nach failure_threshold aufeinanderfolgenden Fehlschlägen offen, nach
+        reset_timeout Sekunden halb offen (ein einzelner Probeaufruf), nach einem Erfolg wieder geschlossen.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        """
+        Gibt zurück, ob ein Aufruf durchgelassen wird (im halb offenen Zustand nur ein Probeaufruf zugleich).
+        """
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self.trial_in_flight = False
+            if self.state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        """
+        Gibt den Probeaufruf frei, wenn er gar nicht gesendet wurde (z. B. vom Rate-Limiter verworfen).
+        """
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != 'closed':
+                logger.info("Circuit closed again after a successful call.")
+            self.state = 'closed'
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        :return: True, wenn der Schutzschalter (jetzt) offen ist.
+        """
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = self.clock()
+            return self.state == 'open'
+
+class ResilientCaller:
+    def __init__(self, public_deadline: float = 10.0, private_deadline: float = 20.0, max_retries: int = 3,
+                 base_delay: float = 0.25, max_delay: float = 4.0, hedge_after: Optional[float] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, cacheable_private: Iterable[str] = CACHEABLE_PRIVATE,
+                 max_stale: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 jitter: Callable[[], float] = random.random):
+        """
+        Fristen, Wiederholungen, Hedging und Schutzschalter für API-Aufrufe.
+
+        Jeder Aufruf erhält eine Frist; der Versuch bekommt die verbleibende Zeit als Timeout. Öffentliche
+        Aufrufe (idempotent) werden bei Netzwerkfehlern und vorübergehenden Kraken-Fehlern mit exponentiellem
+        Backoff und vollem Jitter wiederholt, private Aufrufe nie (eine Order könnte doppelt ankommen).
+        Optional wird ein öffentlicher Aufruf, der nach hedge_after Sekunden noch läuft, ein zweites Mal
+        gesendet (mit eigenem Budget beim Rate-Limiter); die erste Antwort gewinnt. Je Endpunkt zählt ein
+        Schutzschalter die Fehlschläge; ist er offen, wird die letzte erfolgreiche Antwort (gleiche Parameter)
+        ausgeliefert, statt Kraken weiter zu belasten, sofern sie höchstens max_stale Sekunden alt ist. Aufrufe,
+        aus denen Orders geplant werden, übergeben allow_stale=False und erhalten nie eine zwischengespeicherte Antwort.
+
+        :param public_deadline: Die Frist öffentlicher Aufrufe in Sekunden (inklusive Wiederholungen).
+        :param private_deadline: Die Frist privater Aufrufe in Sekunden.
+        :param max_retries: Die maximale Anzahl Wiederholungen öffentlicher Aufrufe.
+        :param base_delay: Die Basis des exponentiellen Backoffs in Sekunden.
+        :param max_delay: Die maximale Wartezeit zwischen zwei Versuchen in Sekunden.
+        :param hedge_after: Nach so vielen Sekunden wird ein langsamer öffentlicher Aufruf erneut gesendet (None: aus).
+        :param failure_threshold: Fehlschläge in Folge, nach denen der Schutzschalter öffnet.
+        :param reset_timeout: Die Zeit in Sekunden, nach der ein offener Schutzschalter einen Probeaufruf zulässt.
+        :param cacheable_private: Private Endpunkte, deren letzte Antwort bei offenem Schutzschalter ausgeliefert wird.
+        :param max_stale: Das maximale Alter in Sekunden, bis zu dem eine zwischengespeicherte Antwort ausgeliefert wird.
+        :param clock: Die Zeitquelle (für Tests).
+        :param sleep: Die Wartefunktion (für Tests).
+        :param jitter: Liefert Zufallszahlen in [0, 1) für den Jitter (für Tests).
+        """
+        self.public_deadline = public_deadline
+        self.private_deadline = private_deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.cacheable_private = frozenset(cacheable_private)
+        self.max_stale = max_stale
+        self.clock = clock
+        self.sleep = sleep
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.cache: Dict[Tuple, Tuple[float, Dict]] = {}  # (Endpunkt, Parameter) -> (Zeitpunkt, Antwort)
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self.lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout, self.clock)
+            return breaker
+
+    @staticmethod
+    def _key(endpoint: str, params: Optional[Dict]) -> Tuple:
+        return endpoint, tuple(sorted((params or {}).items()))
+
+    def _cacheable(self, endpoint: str, public: bool) -> bool:
+        return public or endpoint in self.cacheable_private
+
+    def _cached(self, endpoint: str, params: Optional[Dict], public: bool, allow_stale: bool) -> Optional[Dict]:
+        """
+        Gibt die zwischengespeicherte Antwort zurück, sofern sie ausgeliefert werden darf und nicht zu alt ist.
+        """
+        if not allow_stale or not self._cacheable(endpoint, public):
+            return None
+        entry = self.cache.get(self._key(endpoint, params))
+        if entry is None or self.clock() - entry[0] > self.max_stale:
+            return None
+        return entry[1]
+
+    def guard(self, endpoint: str, params: Optional[Dict] = None, public: bool = False, allow_stale: bool = True) -> Optional[Dict]:
+        """
+        Prüft den Schutzschalter vor dem Aufruf (noch bevor Budget des Rate-Limiters verbraucht wird).
+
+        :param allow_stale: False, wenn keine zwischengespeicherte Antwort ausgeliefert werden darf (Orderplanung).
+        :return: None, wenn der Aufruf stattfinden soll, sonst die letzte erfolgreiche Antwort.
+        :raises CircuitOpenError: Wenn der Schutzschalter offen ist und kein ausreichend frischer Wert vorliegt.
+        """
+        if self.breaker(endpoint).allow():
+            return None
+        cached = self._cached(endpoint, params, public, allow_stale)
+        if cached is None:
+            raise CircuitOpenError(f"Circuit for {endpoint} is open.")
+        logger.debug("Circuit for %s is open, serving the last known response.", endpoint)
+        return cached
+
+    def run(self, endpoint: str, attempt: Callable[[float], Dict], params: Optional[Dict] = None, public: bool = False,
+            before_retry: Optional[Callable[[], None]] = None, allow_stale: bool = True) -> Dict:
+        """
+        Führt einen Aufruf mit Frist, Wiederholungen und optionalem Hedging aus und aktualisiert den Schutzschalter.
+
+        :param endpoint: Der API-Endpunkt.
+        :param attempt: Führt einen Versuch mit dem angegebenen Timeout (Sekunden) aus.
+        :param params: Die Anfrageparameter (Schlüssel des Caches).
+        :param public: True für öffentliche (idempotente) Endpunkte.
+        :param before_retry: Wird vor jeder Wiederholung und vor einem Hedge-Versuch aufgerufen (z. B. um Budget
+                             beim Rate-Limiter zu holen).
+        :param allow_stale: False, wenn bei offenem Schutzschalter keine zwischengespeicherte Antwort ausgeliefert werden darf.
+        :return: Die Antwort (bei offenem Schutzschalter ggf. die zwischengespeicherte).
+        """
+        breaker = self.breaker(endpoint)
+        deadline = self.clock() + (self.public_deadline if public else self.private_deadline)
+        retries = self.max_retries if public else 0
+        failure: Optional[Exception] = None
+        response: Optional[Dict] = None
+        for retry in range(retries + 1):
+            if retry:
+                delay = min(self.max_delay, self.base_delay * 2 ** (retry - 1)) * self.jitter()
+                if self.clock() + delay >= deadline:
+                    break
+                self.sleep(delay)
+                if before_retry is not None:
+                    try:
+                        before_retry()
+                    except RateLimitBudgetExceeded:
+                        breaker.release_trial()
+                        raise
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                failure = DeadlineExceeded(f"{endpoint} deadline exceeded.")
+                break
+            try:
+                response = self._hedged(attempt, remaining, before_retry) if public and self.hedge_after else attempt(remaining)
+                failure = None
+            except RateLimitBudgetExceeded:
+                breaker.release_trial()
+                raise
+            except Exception as e:
+                failure, response = e, None
+            if failure is None and not is_transient(response.get('error')):
+                breaker.record_success()
+                if not response.get('error') and self._cacheable(endpoint, public):
+                    self.cache[self._key(endpoint, params)] = (self.clock(), response)
+                return response
+            reason = failure if failure is not None else ", ".join(response['error'])
+            logger.warning("%s attempt %s failed: %s", endpoint, retry + 1, reason)
+            if breaker.record_failure():
+                break
+        if breaker.state == 'open':
+            cached = self._cached(endpoint, params, public, allow_stale)
+            if cached is not None:
+                logger.warning("Circuit for %s is open, serving the last known response.", endpoint)
+                return cached
+        if failure is not None:
+            raise failure
+        if response is None:
+            raise DeadlineExceeded(f"{endpoint} deadline exceeded.")
+        return response
+
+    def _hedged(self, attempt: Callable[[float], Dict], remaining: float,
+                before_hedge: Optional[Callable[[], None]] = None) -> Dict:
+        """
+        Sendet einen zweiten Versuch, wenn der erste nach hedge_after Sekunden noch läuft; die erste Antwort gewinnt.
+        Der zweite Versuch holt sich vorher über before_hedge eigenes Budget; wird er vom Rate-Limiter verworfen,
+        zählt nur noch der erste.
+        """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hedge")
+        futures: List = [self.executor.submit(attempt, remaining)]
+        done, _ = wait(futures, timeout=min(self.hedge_after, remaining))
+        if not done and remaining > self.hedge_after:
+            logger.debug("Hedging a request still running after %s s.", self.hedge_after)
+            futures.append(self.executor.submit(self._hedge, attempt, remaining - self.hedge_after, before_hedge))
+        end = self.clock() + remaining
+        pending = set(futures)
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(end - self.clock(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                if error is None or not isinstance(future.exception(), RateLimitBudgetExceeded):
+                    error = future.exception()
+        raise error if error is not None else DeadlineExceeded("Hedged request deadline exceeded.")
+
+    @staticmethod
+    def _hedge(attempt: Callable[[float], Dict], remaining: float, before_hedge: Optional[Callable[[], None]]) -> Dict:
+        if before_hedge is not None:
+            before_hedge()
+        return attempt(remaining)
@@ -0,0 +1,37 @@
+﻿from typing import Optional
+from indicators import SMA
+
+# Signale einer Strategie
+BUY = 1
+SELL = -1
+HOLD = 0
+
+class SmaThresholdStrategy:
+    def __init__(self, period: int = 15, threshold: float = 0.0):
+        """
+        Die Handelsregel von MyStrategy, unabhängig von backtrader: Kaufsignal, wenn der SMA um mehr als
+        threshold über dem Schlusskurs liegt, Verkaufssignal, wenn er um mehr als threshold darunter liegt.
+
+        Dieselbe Klasse wird im Backtest (MyStrategy) und im Live-Betrieb (LiveSignalEngine) verwendet.
+
+        :param period: Die Periode des SMA.
+        :param threshold: Der relative Abstand zwischen SMA und Schlusskurs (z. B. 0.01 für 1 %).
+        """
+        self.period = period
+        self.threshold = threshold
+        self.sma = SMA(period)
+
+    def on_bar(self, open_: float, high: float, low: float, close: float) -> int:
+        """
+        Verarbeitet einen abgeschlossenen Bar.
+
+        :return: BUY, SELL oder HOLD.
+        """
+        average: Optional[float] = self.sma.update(close)
+        if average is None:
+            return HOLD
+        if average > close * (1 + self.threshold):
+            return BUY
+        if average < close * (1 - self.threshold):
+            return SELL
+        return HOLD
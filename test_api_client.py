@@ -0,0 +1,181 @@
+﻿import threading
+import unittest
+from api_client import KrakenAPIClient
+from kraken_transport import ThreadSafeKrakenAPI
+from asset_pairs import AssetPairs
+from models.trade_ledger import TradeLedger
+
+class FakeKrakenAPI:
+    """
+    Ersetzt krakenex.API und liefert vorbereitete Antworten je Endpunkt.
+    """
+    def __init__(self, public=None, private=None):
+        self.public = public or {}
+        self.private = private or {}
+        self.calls = []
+
+    def query_public(self, method, data=None, timeout=None):
+        self.calls.append((method, data))
+        response = self.public[method]
+        return response(data) if callable(response) else response
+
+    def query_private(self, method, data=None, timeout=None):
+        self.calls.append((method, data))
+        response = self.private[method]
+        return response(data) if callable(response) else response
+
+def make_client(fake_api, asset_pairs=None):
+    client = KrakenAPIClient("key", "c2VjcmV0", ledger=TradeLedger(":memory:"),
+                             asset_pairs=asset_pairs or AssetPairs(fake_api.query_public, cache_file=None))
+    client.api = fake_api
+    return client
+
+class TestMarketPrices(unittest.TestCase):
+    def test_batched_ticker_maps_canonical_names(self):
+        """
+        Testet, dass mehrere Paare mit einer Anfrage abgefragt und die kanonischen Namen zurückgemappt werden.
+        """
+        fake_api = FakeKrakenAPI(public={'Ticker': {'error': [], 'result': {
+            'XXBTZEUR': {'c': ['90000.1', '0.1']},
+            'ADAEUR': {'c': ['0.85', '10']},
+        }}})
+        client = make_client(fake_api)
+        prices = client.get_market_prices(['XBTEUR', 'ADAEUR'])
+        self.assertEqual(prices, {'XBTEUR': 90000.1, 'ADAEUR': 0.85})
+        self.assertEqual([call for call in fake_api.calls if call[0] == 'Ticker'], [('Ticker', {'pair': 'XBTEUR,ADAEUR'})])
+
+    def test_batched_ticker_falls_back_on_error(self):
+        """
+        Testet den Rückfall auf Einzelanfragen, wenn die Sammelanfrage fehlschlägt.
+        """
+        def ticker(data):
+            if data['pair'] == 'ADAEUR':
+                return {'error': [], 'result': {'ADAEUR': {'c': ['0.85', '10']}}}
+            return {'error': ['EQuery:Unknown asset pair'], 'result': {}}
+        client = make_client(FakeKrakenAPI(public={'Ticker': ticker}))
+        self.assertEqual(client.get_market_prices(['ADAEUR', 'FOOEUR']), {'ADAEUR': 0.85})
+
+def make_trade(pair, time, side, price):
+    return {'ordertxid': 'O' + str(time), 'pair': pair, 'time': time, 'type': side, 'ordertype': 'market',
+            'price': str(price), 'cost': '1.0', 'fee': '0.0', 'vol': '1.0'}
+
+class TestBatchOrders(unittest.TestCase):
+    def test_same_pair_orders_use_add_order_batch(self):
+        """
+        Testet, dass Orders desselben Paares in einem AddOrderBatch-Aufruf landen und die Ergebnisse je Order zurückkommen.
+        """
+        def add_order_batch(data):
+            return {'error': [], 'result': {'orders': [{'txid': 'TX1'}, {'error': 'EOrder:Insufficient funds'}]}}
+        api = FakeKrakenAPI(private={
+            'AddOrderBatch': add_order_batch,
+            'AddOrder': {'error': [], 'result': {'txid': ['TX2']}},
+        })
+        client = make_client(api)
+        orders = [
+            {'pair': 'ADAEUR', 'side': 'buy', 'volume': 10},
+            {'pair': 'SOLEUR', 'side': 'sell', 'volume': 1.5},
+            {'pair': 'ADAEUR', 'side': 'buy', 'volume': 20, 'ordertype': 'limit', 'price': 0.5},
+        ]
+        results = client.execute_trades(orders)
+        self.assertEqual([leg['ok'] for leg in results], [True, True, False])
+        self.assertEqual(results[0]['txid'], 'TX1')
+        self.assertEqual(results[2]['error'], 'EOrder:Insufficient funds')
+        batch_data = next(data for method, data in api.calls if method == 'AddOrderBatch')
+        self.assertEqual(batch_data['pair'], 'ADAEUR')
+        self.assertEqual(batch_data['orders[1][ordertype]'], 'limit')
+        self.assertEqual(batch_data['orders[1][price]'], '0.5')
+        self.assertEqual(len([method for method, _ in api.calls if method.startswith('AddOrder')]), 2)
+
+    def test_batch_falls_back_to_single_orders(self):
+        api = FakeKrakenAPI(private={
+            'AddOrderBatch': {'error': ['EGeneral:Unknown method']},
+            'AddOrder': {'error': [], 'result': {'txid': ['TX']}},
+        })
+        results = make_client(api).execute_trades([{'pair': 'ADAEUR', 'side': 'buy', 'volume': 1}] * 2)
+        self.assertTrue(all(leg['ok'] for leg in results))
+        self.assertEqual([method for method, _ in api.calls].count('AddOrder'), 2)
+
+    def test_pairs_are_sent_concurrently(self):
+        """
+        Testet, dass die Orders verschiedener Paare gleichzeitig gesendet werden.
+        """
+        barrier = threading.Barrier(2, timeout=2)
+        def add_order(data):
+            barrier.wait()  # bricht ab, wenn die zweite Order erst nach der ersten gesendet wird
+            return {'error': [], 'result': {'txid': [data['pair']]}}
+        api = FakeKrakenAPI(private={'AddOrder': add_order})
+        results = make_client(api).execute_trades([{'pair': 'ADAEUR', 'side': 'buy', 'volume': 1},
+                                                   {'pair': 'SOLEUR', 'side': 'sell', 'volume': 2}])
+        self.assertEqual([leg['txid'] for leg in results], [['ADAEUR'], ['SOLEUR']])
+
+    def test_thread_safe_nonces_increase(self):
+        api = ThreadSafeKrakenAPI()
+        nonces = [api._nonce() for _ in range(100)]
+        self.assertEqual(nonces, sorted(set(nonces)))
+
+def fake_trades_history(history, page_size=2, fail_at=None):
+    """
+    TradesHistory wie bei Kraken: jüngster Trade zuerst, 'start' exklusiv, Seiten über 'ofs'.
+    Die Seiten mit den Offsets in fail_at schlagen je einmal fehl.
+    """
+    def trades_history(data):
+        if fail_at and data['ofs'] == fail_at[0]:
+            fail_at.pop(0)
+            return {'error': ['EService:Unavailable'], 'result': {}}
+        matching = sorted(((txid, trade) for txid, trade in history.items() if trade['time'] > data.get('start', 0)),
+                          key=lambda item: item[1]['time'], reverse=True)
+        return {'error': [], 'result': {'trades': dict(matching[data['ofs']:data['ofs'] + page_size]), 'count': len(matching)}}
+    return trades_history
+
+class TestTradeLedger(unittest.TestCase):
+    def test_sync_pages_and_resumes_from_watermark(self):
+        """
+        Testet, dass alle Seiten geladen werden und der nächste Abgleich bei der Marke des letzten Durchlaufs fortsetzt.
+        """
+        history = {
+            'T1': make_trade('ADAEUR', 1700000100.0, 'buy', 0.8),
+            'T2': make_trade('ADAEUR', 1700000200.0, 'sell', 0.9),
+            'T3': make_trade('XXBTZEUR', 1700000300.5, 'buy', 91000),
+        }
+        fake_api = FakeKrakenAPI(private={'TradesHistory': fake_trades_history(history)})
+        client = make_client(fake_api)
+
+        self.assertEqual(client.sync_trades(), 3)
+        self.assertEqual([data for method, data in fake_api.calls if method == 'TradesHistory'], [{'ofs': 0}, {'ofs': 2}])
+        self.assertEqual(client.get_buy_price('ADAEUR'), 0.8)
+        self.assertEqual(client.get_buy_price('XBTEUR'), 91000.0)
+
+        fake_api.calls.clear()
+        self.assertEqual(client.sync_trades(), 0)
+        self.assertEqual(fake_api.calls, [('TradesHistory', {'start': 1700000299, 'ofs': 0})])
+
+    def test_interrupted_sync_is_resumed(self):
+        """
+        Testet, dass nach einem abgebrochenen Abgleich auch die älteren Seiten nachgeladen werden.
+        """
+        history = {f'T{i}': make_trade('ADAEUR', 1700000000.0 + 100 * i, 'buy', 0.1 * i) for i in range(1, 7)}
+        fake_api = FakeKrakenAPI(private={'TradesHistory': fake_trades_history(history, fail_at=[2])})
+        client = make_client(fake_api)
+
+        self.assertEqual(client.sync_trades(), 2)  # nur die jüngste Seite, dann Abbruch
+        self.assertIsNone(client.ledger.get_sync_watermark())
+
+        history['T7'] = make_trade('ADAEUR', 1700000700.0, 'sell', 0.9)
+        fake_api.calls.clear()
+        self.assertEqual(client.sync_trades(), 5)
+        self.assertEqual([data for method, data in fake_api.calls if method == 'TradesHistory'],
+                         [{'ofs': 0}, {'ofs': 2}, {'ofs': 4}, {'ofs': 6}])
+        self.assertEqual(client.ledger.get_sync_watermark(), 1700000700.0)
+        self.assertAlmostEqual(client.get_buy_price('ADAEUR'), 0.6)
+
+    def test_buy_price_uses_fallback_without_network(self):
+        """
+        Testet, dass ohne gespeicherten Kauf der übergebene Ersatzpreis ohne Netzwerkanfrage verwendet wird.
+        """
+        fake_api = FakeKrakenAPI()
+        client = make_client(fake_api)
+        self.assertEqual(client.get_buy_price('CQTEUR', fallback_price=0.0054), 0.0054)
+        self.assertEqual(fake_api.calls, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from asset_pairs import AssetPairs, UnknownPairError
+from models import Favorites
+from test_api_client import FakeKrakenAPI, make_client
+
+ASSET_PAIRS = {'error': [], 'result': {
+    'XXBTZEUR': {'altname': 'XBTEUR', 'wsname': 'XBT/EUR', 'base': 'XXBT', 'quote': 'ZEUR', 'pair_decimals': 1, 'lot_decimals': 8},
+    'ADAEUR': {'altname': 'ADAEUR', 'wsname': 'ADA/EUR', 'base': 'ADA', 'quote': 'ZEUR', 'pair_decimals': 6, 'lot_decimals': 8},
+    'XETHZEUR': {'altname': 'ETHEUR', 'wsname': 'ETH/EUR', 'base': 'XETH', 'quote': 'ZEUR', 'pair_decimals': 2, 'lot_decimals': 4},
+}}
+ASSETS = {'error': [], 'result': {
+    'XXBT': {'altname': 'XBT'}, 'XETH': {'altname': 'ETH'}, 'ADA': {'altname': 'ADA'},
+    'ZEUR': {'altname': 'EUR'}, 'ADA.S': {'altname': 'ADA.S'},
+}}
+
+def make_metadata_api(**private):
+    return FakeKrakenAPI(public={'AssetPairs': ASSET_PAIRS, 'Assets': ASSETS}, private=private)
+
+class TestAssetPairs(unittest.TestCase):
+    def test_lookups_in_both_directions(self):
+        api = make_metadata_api()
+        asset_pairs = AssetPairs(api.query_public, cache_file=None)
+        self.assertEqual(asset_pairs.resolve_pair('XBT/EUR'), 'XXBTZEUR')
+        self.assertEqual(asset_pairs.altname('XXBTZEUR'), 'XBTEUR')
+        self.assertEqual(asset_pairs.wsname('ETHEUR'), 'ETH/EUR')
+        self.assertEqual(asset_pairs.pair_for_asset('XXBT'), 'XBTEUR')
+        self.assertEqual(asset_pairs.pair_for_asset('ETH', 'ZEUR'), 'ETHEUR')
+        self.assertIsNone(asset_pairs.pair_for_asset('ADA.S'))
+        self.assertEqual(asset_pairs.asset_altname('XXBT'), 'XBT')
+        self.assertEqual(asset_pairs.format_volume('ETHEUR', 1.23456789), '1.2345')
+        self.assertEqual(asset_pairs.format_price('XBTEUR', 50000.06), '50000.1')
+        self.assertFalse(asset_pairs.is_valid_pair('FOOEUR'))
+        self.assertEqual(len(api.calls), 2)
+
+    def test_disk_cache_honours_ttl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, 'asset_pairs.json')
+            now = [1000.0]
+            first = make_metadata_api()
+            AssetPairs(first.query_public, cache_file, ttl=3600, clock=lambda: now[0]).ensure_loaded()
+            second = make_metadata_api()
+            cached = AssetPairs(second.query_public, cache_file, ttl=3600, clock=lambda: now[0])
+            self.assertEqual(cached.altname('XBT/EUR'), 'XBTEUR')
+            self.assertEqual(second.calls, [])
+            now[0] += 3600
+            self.assertTrue(cached.ensure_loaded())
+            self.assertEqual([method for method, _ in second.calls], ['AssetPairs', 'Assets'])
+
+    def test_check_balance_maps_legacy_asset_codes(self):
+        api = make_metadata_api(Balance={'error': [], 'result': {'XXBT': '0.5', 'ADA': '100', 'ZEUR': '20', 'ADA.S': '5'}})
+        client = make_client(api)
+        self.assertEqual(client.check_balance(['XBTEUR', 'ADAEUR']), {'XBT': 0.5, 'ADA': 100.0})
+
+    def test_order_path_formats_volume_and_rejects_unknown_pairs(self):
+        api = make_metadata_api(AddOrder={'error': [], 'result': {'txid': ['TX']}})
+        client = make_client(api)
+        client.execute_trade('ETHEUR', 0.123456, 'sell')
+        self.assertEqual(api.calls[-1], ('AddOrder', {'type': 'sell', 'ordertype': 'market', 'volume': '0.1234', 'pair': 'ETHEUR'}))
+        with self.assertRaises(UnknownPairError):
+            client.execute_trade('FOOEUR', 1.0, 'buy')
+
+    def test_ticker_results_are_mapped_through_metadata(self):
+        """
+        Testet, dass kanonische Namen, die die X/Z-Heuristik nicht auflöst, über die Metadaten zugeordnet werden.
+        """
+        pairs = dict(ASSET_PAIRS['result'], X1INCHEUR={'altname': '1INCHEUR', 'wsname': '1INCH/EUR', 'base': '1INCH', 'quote': 'ZEUR'})
+        api = FakeKrakenAPI(public={'AssetPairs': {'error': [], 'result': pairs}, 'Assets': ASSETS, 'Ticker': {'error': [], 'result': {
+            'X1INCHEUR': {'c': ['0.3', '1']}, 'XXBTZEUR': {'c': ['90000.0', '1']}}}})
+        client = make_client(api)
+        self.assertEqual(client.get_market_prices(['1INCHEUR', 'XBTEUR']), {'1INCHEUR': 0.3, 'XBTEUR': 90000.0})
+
+    def test_favorites_are_validated_and_normalized(self):
+        with tempfile.TemporaryDirectory() as directory:
+            asset_pairs = AssetPairs(make_metadata_api().query_public, cache_file=None)
+            favorites = Favorites(os.path.join(directory, 'favorites.json'), asset_pairs=asset_pairs)
+            favorites.add_favorite('XBT/EUR')
+            self.assertEqual(favorites.get_favorites(), ['XBTEUR'])
+            with self.assertRaises(ValueError):
+                favorites.add_favorite('FOOEUR')
+            favorites.favorites.append('BAREUR')
+            self.assertEqual(favorites.invalid_favorites(), ['BAREUR'])
+
+if __name__ == '__main__':
+    unittest.main()
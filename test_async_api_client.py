@@ -0,0 +1,100 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import unittest
+import urllib.parse
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from asset_pairs import AssetPairs
+from async_api_client import AsyncKrakenAPIClient, _no_blocking_query
+from models.trade_ledger import TradeLedger
+
+API_SECRET = base64.b64encode(b"test-secret").decode()
+
+ASSET_PAIRS = {
+    'XXBTZEUR': {'altname': 'XBTEUR', 'wsname': 'XBT/EUR', 'base': 'XXBT', 'quote': 'ZEUR', 'lot_decimals': 8, 'pair_decimals': 1},
+    'ADAEUR': {'altname': 'ADAEUR', 'wsname': 'ADA/EUR', 'base': 'ADA', 'quote': 'ZEUR', 'lot_decimals': 8, 'pair_decimals': 6},
+}
+ASSETS = {'XXBT': {'altname': 'XBT'}, 'ADA': {'altname': 'ADA'}, 'ZEUR': {'altname': 'EUR'}}
+
+class FakeKrakenServer:
+    """
+    Lokaler Ersatz für api.kraken.com, der Signaturen prüft und die empfangenen Nonces protokolliert.
+    """
+    def __init__(self, ticker_delay: float = 0.0, metadata: bool = False, balance: dict = None):
+        self.ticker_delay = ticker_delay
+        self.balance_result = balance or {'ADA': '12.5', 'ZEUR': '100.0'}
+        self.nonces = []
+        self.app = web.Application()
+        self.app.router.add_get('/0/public/Ticker', self.ticker)
+        self.app.router.add_post('/0/private/Balance', self.balance)
+        if metadata:
+            self.app.router.add_get('/0/public/AssetPairs', self.asset_pairs)
+            self.app.router.add_get('/0/public/Assets', self.assets)
+
+    async def asset_pairs(self, request):
+        return web.json_response({'error': [], 'result': ASSET_PAIRS})
+
+    async def assets(self, request):
+        return web.json_response({'error': [], 'result': ASSETS})
+
+    async def ticker(self, request):
+        await asyncio.sleep(self.ticker_delay)
+        pairs = request.query['pair'].split(",")
+        result = {("XXBTZEUR" if pair == "XBTEUR" else pair): {'c': ['1.5', '1']} for pair in pairs}
+        return web.json_response({'error': [], 'result': result})
+
+    async def balance(self, request):
+        body = await request.text()
+        data = dict(urllib.parse.parse_qsl(body))
+        message = b'/0/private/Balance' + hashlib.sha256((data['nonce'] + body).encode()).digest()
+        expected = base64.b64encode(hmac.new(base64.b64decode(API_SECRET), message, hashlib.sha512).digest()).decode()
+        if request.headers.get('API-Sign') != expected:
+            return web.json_response({'error': ['EAPI:Invalid signature']})
+        nonce = int(data['nonce'])
+        if self.nonces and nonce <= self.nonces[-1]:
+            return web.json_response({'error': ['EAPI:Invalid nonce']})
+        self.nonces.append(nonce)
+        return web.json_response({'error': [], 'result': self.balance_result})
+
+class TestAsyncKrakenAPIClient(unittest.IsolatedAsyncioTestCase):
+    async def start_server(self, **kwargs):
+        fake = FakeKrakenServer(**kwargs)
+        server = TestServer(fake.app)
+        await server.start_server()
+        self.addAsyncCleanup(server.close)
+        client = AsyncKrakenAPIClient("key", API_SECRET, ledger=TradeLedger(":memory:"),
+                                      base_url=str(server.make_url("")), timeout=0.5,
+                                      asset_pairs=AssetPairs(_no_blocking_query, cache_file=None))
+        self.addAsyncCleanup(client.close)
+        return fake, client
+
+    async def test_concurrent_private_calls_use_increasing_nonces(self):
+        """
+        Testet, dass parallel gestartete private Anfragen gültig signiert und mit steigenden Nonces ankommen.
+        """
+        fake, client = await self.start_server()
+        balances = await asyncio.gather(*(client.check_balance(['ADAEUR']) for _ in range(10)))
+        self.assertEqual(balances, [{'ADA': 12.5}] * 10)
+        self.assertEqual(len(fake.nonces), 10)
+
+    async def test_batched_prices_and_deadline(self):
+        """
+        Testet die Sammelabfrage der Preise und dass eine überschrittene Frist None statt eines Hängers liefert.
+        """
+        fake, client = await self.start_server()
+        self.assertEqual(await client.get_market_prices(['XBTEUR', 'ADAEUR']), {'XBTEUR': 1.5, 'ADAEUR': 1.5})
+        fake.ticker_delay = 2.0
+        self.assertIsNone(await client.get_market_price('ADAEUR'))
+
+    async def test_balance_maps_legacy_assets_via_asset_pairs(self):
+        """
+        Testet, dass Legacy-Assets wie 'XXBT' über die asynchron geladenen Metadaten dem Paar 'XBTEUR' zugeordnet werden.
+        """
+        fake, client = await self.start_server(metadata=True, balance={'XXBT': '0.5', 'ADA': '12.5', 'ZEUR': '100.0'})
+        self.assertEqual(await client.check_balance(['XBTEUR', 'ADAEUR']), {'XBT': 0.5, 'ADA': 12.5})
+        self.assertEqual(await client.get_market_prices(['XBTEUR']), {'XBTEUR': 1.5})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import unittest
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from backtesting import run_backtrader_backtest
+from ohlc_store import OHLCStore
+from param_sweep import run_sweep
+from portfolio_backtest import align_series, backtest_portfolio
+from vector_backtest import run_vectorized_backtest, sma
+
+def make_ohlc(bars: int = 300, seed: int = 7) -> pd.DataFrame:
+    """
+    Erzeugt eine reproduzierbare synthetische OHLC-Zeitreihe (Random Walk).
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.002, bars))
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * 1.001,
+        'low': np.minimum(open_, close) * 0.999,
+        'close': close,
+        'volume': 1.0,
+    }, index=pd.date_range('2024-01-01', periods=bars, freq='D'))
+
+class TestVectorizedBacktest(unittest.TestCase):
+    def test_sma_matches_rolling_mean(self):
+        close = make_ohlc(50)['close']
+        np.testing.assert_allclose(sma(close.to_numpy(), 15), close.rolling(15).mean().to_numpy())
+
+    def test_parity_with_backtrader(self):
+        """
+        Testet, dass die vektorisierte Engine dieselben Trades und denselben Endwert liefert wie backtrader.
+        """
+        data = make_ohlc()
+        fills, final_value = run_backtrader_backtest(data, fee=0.0026, cash=1e6)
+        result = run_vectorized_backtest(data['open'].to_numpy(), data['close'].to_numpy(), fee=0.0026, cash=1e6)
+        self.assertEqual([fill[0] for fill in fills], result['fill_bars'].tolist())
+        np.testing.assert_allclose([fill[1] for fill in fills], result['fill_sizes'])
+        np.testing.assert_allclose([fill[2] for fill in fills], result['fill_prices'])
+        np.testing.assert_allclose([fill[3] for fill in fills], result['commissions'])
+        self.assertAlmostEqual(final_value, result['equity'][-1], places=6)
+
+class TestParamSweep(unittest.TestCase):
+    def test_sweep_matches_single_runs_and_is_ranked(self):
+        """
+        Testet, dass der Sweep im Prozess-Pool dieselben Ergebnisse wie Einzelläufe liefert und nach Sharpe sortiert ist.
+        """
+        data = make_ohlc(400)
+        open_, close = data['open'].to_numpy(), data['close'].to_numpy()
+        grid = {'period': [5, 15], 'threshold': [0.0, 0.01], 'fee': [0.0026]}
+        table = run_sweep(open_, close, grid, processes=2, cash=1e4)
+        self.assertEqual(len(table), 4)
+        self.assertTrue(table['sharpe'].is_monotonic_decreasing)
+        row = table[(table['period'] == 15) & (table['threshold'] == 0.01)].iloc[0]
+        single = run_vectorized_backtest(open_, close, period=15, threshold=0.01, cash=1e4)
+        self.assertAlmostEqual(row['total_return'], single['equity'][-1] / 1e4 - 1)
+        self.assertEqual(row['trades'], len(single['fill_bars']))
+
+    def test_ruined_combination_ranks_last(self):
+        """
+        Testet, dass eine Kombination, deren Portfoliowert auf 0 oder darunter fällt, unabhängig von rank_by zuletzt steht.
+        """
+        data = make_ohlc(400)
+        open_, close = data['open'].to_numpy(), data['close'].to_numpy()
+        grid = {'period': [5], 'threshold': [0.0, 1.0], 'fee': [0.0026]}  # Schwelle 1.0: kein einziges Signal
+        for rank_by in ('sharpe', 'total_return'):
+            table = run_sweep(open_, close, grid, processes=1, cash=1.0, rank_by=rank_by)
+            self.assertEqual(table['threshold'].tolist(), [1.0, 0.0])
+            self.assertTrue(table.iloc[-1]['ruined'])
+            self.assertEqual(table.iloc[-1]['sharpe'], -np.inf)
+
+    def test_threshold_parity_with_backtrader(self):
+        data = make_ohlc(200)
+        fills, final_value = run_backtrader_backtest(data, cash=1e6, period=10, threshold=0.01)
+        result = run_vectorized_backtest(data['open'].to_numpy(), data['close'].to_numpy(), period=10, threshold=0.01, cash=1e6)
+        self.assertEqual([fill[0] for fill in fills], result['fill_bars'].tolist())
+        self.assertAlmostEqual(final_value, result['equity'][-1], places=6)
+
+def make_series(bars: int, seed: int, offset: int = 0):
+    data = make_ohlc(bars, seed)
+    day = 86400
+    return {
+        'time': 1700000000 + (np.arange(bars) + offset) * day,
+        'open': data['open'].to_numpy(),
+        'close': data['close'].to_numpy(),
+    }
+
+class TestPortfolioBacktest(unittest.TestCase):
+    def test_align_series_fills_gaps_and_marks_late_pairs(self):
+        series = {'ADAEUR': make_series(10, 1), 'SOLEUR': make_series(5, 2, offset=5)}
+        times, opens, closes, tradable = align_series(series)
+        self.assertEqual(len(times), 10)
+        self.assertFalse(tradable[1, :5].any())
+        self.assertTrue(np.isnan(closes[1, :5]).all())
+        np.testing.assert_allclose(closes[1, 5:], series['SOLEUR']['close'])
+
+    def test_shared_cash_pool_and_attribution(self):
+        """
+        Testet, dass sich der Endwert aus Startkapital und Gewinn je Paar zusammensetzt und das Kapital nie negativ wird.
+        """
+        series = {'ADAEUR': make_series(300, 1), 'SOLEUR': make_series(250, 2, offset=50), 'SHIBEUR': make_series(300, 3)}
+        result = backtest_portfolio(series, period=10, cash=1e4, allocation=0.5, workers=2)
+        attribution = result['attribution']
+        self.assertEqual(sorted(attribution.index), sorted(series))
+        self.assertGreater(attribution['trades'].sum(), 0)
+        self.assertTrue((result['cash'] >= -1e-9).all())
+        self.assertAlmostEqual(result['equity'][-1], 1e4 + attribution['total_pnl'].sum(), places=6)
+        self.assertGreaterEqual(result['runtime'], 0)
+
+class FakeOHLCAPI:
+    """
+    Liefert Kraken-OHLC-Antworten aus einer festen Kerzenliste; die letzte Kerze gilt als noch offen.
+    """
+    def __init__(self, candles):
+        self.candles = candles
+        self.calls = []
+
+    def query_public(self, method, data=None, timeout=None):
+        self.calls.append(data)
+        since = data.get('since', 0)
+        rows = [[t, str(c), str(c + 1), str(c - 1), str(c), str(c), '1.0', 3] for t, c in self.candles if t > since]
+        return {'error': [], 'result': {'XXBTZEUR': rows, 'last': self.candles[-2][0]}}
+
+class TestOHLCStore(unittest.TestCase):
+    def test_incremental_update_and_backtrader_feed(self):
+        """
+        Testet das inkrementelle Nachladen über den 'since'-Cursor und das Lesen über den backtrader-Feed.
+        """
+        day = 86400
+        api = FakeOHLCAPI([(1700000000 + i * day, 100.0 + i) for i in range(30)])
+        with tempfile.TemporaryDirectory() as directory:
+            store = OHLCStore(api, directory)
+            self.assertEqual(store.update('XBTEUR'), 30)
+            api.candles = api.candles[:-1] + [(api.candles[-1][0], 200.0)] + [(1700000000 + i * day, 100.0 + i) for i in range(30, 35)]
+            self.assertEqual(store.update('XBTEUR'), 5)
+            self.assertEqual(api.calls[1]['since'], 1700000000 + 28 * day)
+
+            columns = store.load('XBTEUR')
+            self.assertIsInstance(columns['close'], np.memmap)
+            self.assertEqual(len(columns['time']), 35)
+            self.assertEqual(columns['close'][29], 200.0)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'XBTEUR_1440', 'meta.json')))
+
+            cerebro = bt.Cerebro(stdstats=False)
+            cerebro.adddata(store.backtrader_feed('XBTEUR'))
+            closes = []
+            class Collect(bt.Strategy):
+                def next(self):
+                    closes.append(self.data.close[0])
+            cerebro.addstrategy(Collect)
+            cerebro.run()
+            self.assertEqual(closes, columns['close'].tolist())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+import unittest
+import config
+
+class TestKeyringBackendCache(unittest.TestCase):
+    def setUp(self):
+        config._keyring = None
+
+    def tearDown(self):
+        config._keyring = None
+
+    def test_cached_backend_is_loaded_without_probing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, 'keyring_backend.json')
+            with open(cache_file, 'w') as f:
+                json.dump({'backend': 'keyring.backends.null.Keyring'}, f)
+            keyring = config.get_keyring(cache_file)
+            self.assertEqual(type(keyring.get_keyring()).__module__, 'keyring.backends.null')
+            self.assertIs(config.get_keyring(cache_file), keyring)
+
+    def test_invalid_cache_falls_back_to_probing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, 'keyring_backend.json')
+            with open(cache_file, 'w') as f:
+                json.dump({'backend': 'keyring.backends.missing.Keyring'}, f)
+            backend = config.get_keyring(cache_file).get_keyring()
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)['backend']
+            # The probed backend replaces the entry unless it is the fail backend or the chainer
+            self.assertIn(cached, ('keyring.backends.missing.Keyring', f"{type(backend).__module__}.{type(backend).__qualname__}"))
+
+if __name__ == '__main__':
+    unittest.main()
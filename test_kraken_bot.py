@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import unittest
+from kraken_bot import HeadlessBot
+from paper_exchange import MarketReplay, PaperExchange
+from utils import log_startup_report, resident_memory_mb
+
+class TestHeadlessBot(unittest.TestCase):
+    def test_headless_imports_no_gui_modules(self):
+        code = "import sys, main, kraken_bot; print(sorted(m for m in ('tkinter', 'pystray', 'PIL', 'gui', 'krakenex', 'keyring') if m in sys.modules))"
+        output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+        self.assertEqual(output, "[]")
+
+    def test_refresh_against_paper_exchange(self):
+        replay = MarketReplay([(1700000000.0, 'ADAEUR', 2.0, 1.0)])
+        exchange = PaperExchange(replay, balances={'ZEUR': 100.0, 'ADA': 10.0})
+        bot = HeadlessBot(exchange, ['ADAEUR'], update_interval=0)
+        rows = bot.refresh()
+        self.assertEqual([row[0] for row in rows], ['ADAEUR'])
+        self.assertAlmostEqual(rows[0][4], 20.0)
+        bot.stop()
+        bot._shutdown()
+
+    def test_startup_report(self):
+        report = log_startup_report("headless", 0.0)
+        self.assertEqual(report['mode'], "headless")
+        if sys.platform.startswith("linux"):
+            self.assertGreater(resident_memory_mb(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
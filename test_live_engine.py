@@ -0,0 +1,138 @@
+﻿import unittest
+import numpy as np
+import pandas as pd
+from indicators import SMA, EMA, RSI, ATR
+from live_engine import LiveSignalEngine
+from strategy import SmaThresholdStrategy, BUY, SELL
+from vector_backtest import sma, sma_signals
+
+class FakeTradingClient:
+    def __init__(self, failures=0):
+        self.orders = []
+        self.failures = failures
+
+    def execute_trade(self, pair, volume, side):
+        if self.failures:
+            self.failures -= 1
+            raise Exception("EOrder:Insufficient funds")
+        self.orders.append((pair, volume, side))
+
+class TestIndicators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))
+
+    def test_sma_matches_full_recalculation(self):
+        indicator = SMA(15)
+        values = [indicator.update(price) for price in self.close]
+        self.assertTrue(all(value is None for value in values[:14]))
+        np.testing.assert_allclose(values[14:], sma(self.close, 15)[14:])
+
+    def test_ema_matches_pandas(self):
+        indicator = EMA(10)
+        values = np.array([indicator.update(price) for price in self.close][9:], dtype=float)
+        seeded = np.r_[self.close[:10].mean(), self.close[10:]]
+        expected = pd.Series(seeded).ewm(span=10, adjust=False).mean().to_numpy()
+        np.testing.assert_allclose(values, expected)
+
+    def test_rsi_and_atr_ranges(self):
+        rsi, atr = RSI(14), ATR(14)
+        for price in self.close:
+            rsi.update(price)
+            atr.update(price * 1.01, price * 0.99, price)
+        self.assertTrue(0 <= rsi.value <= 100)
+        self.assertGreater(atr.value, 0)
+        rising = RSI(3)
+        for price in range(10):
+            rising.update(float(price))
+        self.assertEqual(rising.value, 100.0)
+
+class TestLiveSignalEngine(unittest.TestCase):
+    def test_strategy_matches_vectorized_signals(self):
+        close = 100 * np.exp(np.cumsum(np.random.default_rng(5).normal(0, 0.01, 300)))
+        strategy = SmaThresholdStrategy(10, 0.005)
+        signals = [strategy.on_bar(price, price, price, price) for price in close]
+        np.testing.assert_array_equal(signals, sma_signals(close, 10, 0.005))
+
+    def test_orders_only_when_armed(self):
+        """
+        Testet, dass Ticks zu Bars zusammengefasst werden und nur eine scharf geschaltete Engine Orders sendet.
+        """
+        client = FakeTradingClient()
+        engine = LiveSignalEngine(client, lambda: SmaThresholdStrategy(3), interval=60, volumes={'ADAEUR': 10.0})
+        engine.warmup('ADAEUR', [1.0, 1.0])
+        engine.on_price('ADAEUR', 0.5, timestamp=0)
+        engine.on_price('ADAEUR', 0.7, timestamp=30)  # gleicher Bar
+        engine.on_price('ADAEUR', 0.5, timestamp=60)  # schließt Bar 0 mit Schlusskurs 0.7 -> Kaufsignal
+        self.assertEqual(engine.signals[-1][1:], ('ADAEUR', BUY, False))
+        engine.set_armed(True)
+        engine.on_price('ADAEUR', 0.5, timestamp=120)  # Bar 1 schließt mit 0.5 -> Kaufsignal
+        engine.stop()
+        engine.executor.shutdown(wait=True)
+        self.assertEqual(client.orders, [('ADAEUR', 10.0, 'buy')])
+        self.assertEqual(engine.signals[-1][1:], ('ADAEUR', BUY, True))
+
+    def test_one_order_while_signal_holds(self):
+        """
+        Testet, dass ein über mehrere Bars anhaltendes Kaufsignal nur eine Order auslöst und erst ein
+        Verkaufssignal die nächste.
+        """
+        client = FakeTradingClient()
+        engine = LiveSignalEngine(client, lambda: SmaThresholdStrategy(3), interval=1, volumes={'ADAEUR': 10.0})
+        engine.set_armed(True)
+        engine.warmup('ADAEUR', [1.0, 1.0])
+        for second, price in enumerate([0.5, 0.5, 0.5, 0.5, 2.0, 2.0]):
+            engine.on_price('ADAEUR', price, timestamp=second)
+        engine.stop()
+        engine.executor.shutdown(wait=True)
+        self.assertEqual(client.orders, [('ADAEUR', 10.0, 'buy'), ('ADAEUR', 10.0, 'sell')])
+        sent = [signal for _, _, signal, order_sent in engine.signals if order_sent]
+        self.assertEqual(sent, [BUY, SELL])
+        self.assertGreater(len(engine.signals), 2)
+
+    def test_no_order_without_volume(self):
+        client = FakeTradingClient()
+        engine = LiveSignalEngine(client, lambda: SmaThresholdStrategy(2), interval=1)
+        engine.set_armed(True)
+        for second, price in enumerate([5.0, 4.0, 6.0, 6.0]):
+            engine.on_price('SOLEUR', price, timestamp=second)
+        engine.executor.shutdown(wait=True)
+        self.assertEqual(client.orders, [])
+        self.assertEqual(engine.signals[-1][2], SELL)
+
+    def test_no_sell_without_position(self):
+        """
+        Testet, dass ein Verkaufssignal ohne vorherigen Kauf der Engine keine Order auslöst.
+        """
+        client = FakeTradingClient()
+        engine = LiveSignalEngine(client, lambda: SmaThresholdStrategy(3), interval=1, volumes={'ADAEUR': 10.0})
+        engine.set_armed(True)
+        engine.warmup('ADAEUR', [1.0, 1.0])
+        with self.assertLogs(level='DEBUG') as logs:
+            for second, price in enumerate([2.0, 2.0, 2.0]):
+                engine.on_price('ADAEUR', price, timestamp=second)
+        engine.stop()
+        engine.executor.shutdown(wait=True)
+        self.assertEqual(client.orders, [])
+        self.assertEqual([signal for _, _, signal, _ in engine.signals], [SELL, SELL])
+        self.assertIn("no position bought by the engine", logs.output[-1])
+
+    def test_rejected_order_waits_for_next_crossover(self):
+        """
+        Testet, dass nach einer abgelehnten Order dasselbe Signal erst nach einem Signalwechsel erneut gesendet wird.
+        """
+        client = FakeTradingClient(failures=1)
+        engine = LiveSignalEngine(client, lambda: SmaThresholdStrategy(3), interval=1, volumes={'ADAEUR': 10.0})
+        engine.set_armed(True)
+        engine.warmup('ADAEUR', [1.0, 1.0])
+        # Schlusskurse 0.5, 0.5, 0.5, 0.3 -> Kauf (abgelehnt), Kauf, kein Signal, Kauf
+        for second, price in enumerate([0.5, 0.5, 0.5, 0.3, 0.3]):
+            engine.on_price('ADAEUR', price, timestamp=second)
+            engine.executor.submit(lambda: None).result()  # abgelehnte Order abwarten
+        engine.stop()
+        engine.executor.shutdown(wait=True)
+        self.assertEqual(client.orders, [('ADAEUR', 10.0, 'buy')])
+        self.assertEqual([order_sent for _, _, _, order_sent in engine.signals], [True, False, True])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+import websockets
+from market_stream import TickerStream, to_ws_name
+
+class FakeKrakenWebSocket:
+    """
+    Lokaler Ersatz für ws.kraken.com: bestätigt Abonnements, sendet Ticker-Nachrichten und trennt
+    die erste Verbindung, um das Wiederverbinden zu prüfen.
+    """
+    def __init__(self):
+        self.subscriptions = []
+        self.loop = None
+        self.port = None
+        self.ready = threading.Event()
+        self.stop_event = None
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True)
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        async with websockets.serve(self.handler, "127.0.0.1", 0) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self.ready.set()
+            await self.stop_event.wait()
+
+    async def handler(self, websocket):
+        subscribe = json.loads(await websocket.recv())
+        self.subscriptions.append(subscribe)
+        await websocket.send(json.dumps({'event': 'subscriptionStatus', 'status': 'subscribed'}))
+        price = "0.50" if len(self.subscriptions) == 1 else "0.55"
+        await websocket.send(json.dumps([42, {'c': [price, '1.0']}, 'ticker', 'ADA/EUR']))
+        if len(self.subscriptions) == 1:
+            return  # erste Verbindung trennen
+        await websocket.wait_closed()
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait(5)
+        return f"ws://127.0.0.1:{self.port}"
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.stop_event.set)
+        self.thread.join(5)
+
+class TestTickerStream(unittest.TestCase):
+    def test_ws_names(self):
+        self.assertEqual(to_ws_name('ADAEUR'), 'ADA/EUR')
+        self.assertEqual(to_ws_name('EURCHF'), 'EUR/CHF')
+        self.assertEqual(to_ws_name('RENDEREUR'), 'RENDER/EUR')
+
+    def test_reconnects_and_resubscribes(self):
+        """
+        Testet, dass der Stream nach einem Verbindungsabbruch neu verbindet, neu abonniert und die Preise aktualisiert.
+        """
+        server = FakeKrakenWebSocket()
+        url = server.start()
+        updates = []
+        stream = TickerStream(['ADAEUR', 'SOLEUR'], on_price=lambda pair, price: updates.append((pair, price)),
+                              url=url, min_backoff=0.05)
+        stream.start()
+        try:
+            deadline = time.time() + 5
+            while len(updates) < 2 and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            stream.stop()
+            server.stop()
+        self.assertEqual(updates, [('ADAEUR', 0.5), ('ADAEUR', 0.55)])
+        self.assertEqual(len(server.subscriptions), 2)
+        self.assertEqual(server.subscriptions[1]['pair'], ['ADA/EUR', 'SOL/EUR'])
+        self.assertEqual(stream.get_prices(), {'ADAEUR': 0.55})
+
+if __name__ == '__main__':
+    unittest.main()
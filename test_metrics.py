@@ -0,0 +1,51 @@
+import unittest
+import urllib.request
+from metrics import Histogram, MetricsRegistry, MetricsServer
+from rate_limiter import RateLimitBudgetExceeded
+from test_api_client import FakeKrakenAPI, make_client
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_buckets_and_quantiles(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.99), 1.0)
+
+    def test_client_calls_record_latency_errors_and_rate_limits(self):
+        registry = MetricsRegistry()
+        api = FakeKrakenAPI(private={
+            'Balance': {'error': ['EAPI:Rate limit exceeded'], 'result': {}},
+            'AddOrder': {'error': ['EGeneral:Invalid arguments:volume']},
+        })
+        client = make_client(api)
+        client.metrics = registry
+        client._query_private('Balance')
+        client._query_private('AddOrder', {'volume': '0'})
+        def dropped(*args, **kwargs):
+            raise RateLimitBudgetExceeded("Dropped")
+        client.scheduler.call = dropped
+        with self.assertRaises(RateLimitBudgetExceeded):
+            client._query_private('TradesHistory')
+        self.assertEqual(registry.requests, {'Balance': 1, 'AddOrder': 1})
+        self.assertEqual(registry.errors[('AddOrder', 'EGeneral:Invalid arguments')], 1)
+        self.assertEqual(registry.rate_limited, {('Balance', 'kraken'): 1, ('TradesHistory', 'local'): 1})
+
+    def test_prometheus_endpoint(self):
+        registry = MetricsRegistry()
+        registry.observe_call('Ticker', 0.2)
+        with registry.timer('update_balance'):
+            pass
+        server = MetricsServer(registry, port=0).start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+                body = response.read().decode()
+        finally:
+            server.stop()
+        self.assertIn('kraken_api_request_duration_seconds_bucket{endpoint="Ticker",le="0.25"} 1', body)
+        self.assertIn('kraken_api_requests_total{endpoint="Ticker"} 1', body)
+        self.assertIn('kraken_bot_cycle_duration_seconds_count{cycle="update_balance"} 1', body)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+﻿import asyncio
+import json
+import unittest
+import zlib
+from order_book import OrderBook, OrderBookStream
+from test_api_client import FakeKrakenAPI, make_client
+
+ASKS = [["0.05005", "0.00000500", "1582905487.684110"], ["0.05010", "0.00000500", "1582905486.187983"]]
+BIDS = [["0.05000", "0.00000500", "1582905487.439814"], ["0.04995", "0.00001000", "1582905487.439815"]]
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+class TestOrderBook(unittest.TestCase):
+    def test_checksum_format(self):
+        """
+        Testet die Kraken-Prüfsumme: Asks aufsteigend, dann Bids absteigend, ohne Punkt und führende Nullen.
+        """
+        book = OrderBook(depth=10)
+        book.apply_snapshot(ASKS, BIDS)
+        self.assertEqual(book.checksum(), zlib.crc32(b"5005500" b"5010500" b"5000500" b"49951000"))
+
+    def test_updates_delete_and_truncate(self):
+        book = OrderBook(depth=2)
+        book.apply_snapshot(ASKS, BIDS)
+        book.apply_update(asks=[["0.05001", "1.0", "0"]], bids=[["0.05000", "0.00000000", "0"]])
+        self.assertEqual(list(book.asks.keys()), [0.05001, 0.05005])
+        self.assertEqual(book.best(), (0.04995, 0.05001))
+
+    def test_estimate_fill_walks_levels(self):
+        book = OrderBook()
+        book.apply_snapshot([["100.0", "1.0", "0"], ["101.0", "2.0", "0"]], [["99.0", "1.0", "0"], ["98.0", "1.0", "0"]])
+        buy = book.estimate_fill('buy', 2.0)
+        self.assertAlmostEqual(buy['average_price'], 100.5)
+        self.assertAlmostEqual(buy['slippage'], 0.005)
+        self.assertTrue(buy['complete'])
+        sell = book.estimate_fill('sell', 3.0)
+        self.assertAlmostEqual(sell['average_price'], 98.5)
+        self.assertAlmostEqual(sell['slippage'], 0.5 / 99)
+        self.assertFalse(sell['complete'])
+
+class TestOrderBookStream(unittest.TestCase):
+    def test_checksum_mismatch_resubscribes_book_channel(self):
+        """
+        Testet, dass eine falsche Prüfsumme das Buch ungültig macht, den book-Kanal neu abonniert und
+        Änderungen bis zum neuen WebSocket-Snapshot verwirft.
+        """
+        websocket = FakeWebSocket()
+        loop = asyncio.new_event_loop()
+        stream = OrderBookStream(['XBTEUR'], depth=10)
+        stream.loop, stream.websocket = loop, websocket
+        stream.handle_message([336, {'as': ASKS, 'bs': BIDS}, 'book-10', 'XBT/EUR'])
+        book = stream.get_book('XBTEUR')
+        self.assertIsNotNone(book)
+
+        update = [["0.05005", "0.00000600", "1582905488.0"]]
+        expected = OrderBook(depth=10)
+        expected.apply_snapshot(ASKS, BIDS)
+        expected.apply_update(asks=update)
+        stream.handle_message([336, {'a': update, 'c': str(expected.checksum())}, 'book-10', 'XBT/EUR'])
+        self.assertEqual(stream.resync_count, 0)
+
+        stream.handle_message([336, {'a': [["0.05010", "0.1", "0"]]}, {'b': [], 'c': '12345'}, 'book-10', 'XBT/EUR'])
+        stream.handle_message([336, {'a': [["0.05011", "0.1", "0"]], 'c': '1'}, 'book-10', 'XBT/EUR'])
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        self.assertIsNone(stream.get_book('XBTEUR'))
+        self.assertEqual(stream.resync_count, 1)
+        self.assertEqual([(message['event'], message['pair']) for message in websocket.sent],
+                         [('unsubscribe', ['XBT/EUR']), ('subscribe', ['XBT/EUR'])])
+        self.assertEqual(websocket.sent[1]['subscription'], {'name': 'book', 'depth': 10})
+        self.assertNotIn(0.05011, book.asks)
+
+        stream.handle_message([336, {'as': ASKS, 'bs': BIDS}, 'book-10', 'XBT/EUR'])
+        self.assertIs(stream.get_book('XBTEUR'), book)
+        self.assertEqual(book.asks[0.05005][1], "0.00000500")
+
+    def test_client_estimate_from_rest_depth(self):
+        api = FakeKrakenAPI(public={'Depth': {'error': [], 'result': {'XXBTZEUR': {
+            'asks': [["100.0", "1.0", 0], ["102.0", "1.0", 0]], 'bids': [["99.0", "5.0", 0]]}}}})
+        client = make_client(api)
+        estimate = client.estimate_fill('XBTEUR', 2.0, 'buy')
+        self.assertAlmostEqual(estimate['average_price'], 101.0)
+        self.assertEqual(api.calls, [('Depth', {'pair': 'XBTEUR', 'count': 100})])
+
+if __name__ == '__main__':
+    unittest.main()
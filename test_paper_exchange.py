@@ -0,0 +1,65 @@
+import unittest
+from live_engine import LiveSignalEngine
+from paper_exchange import MarketReplay, PaperExchange
+
+START = 1700000000.0
+
+def make_exchange(events=None, **kwargs):
+    replay = MarketReplay(events if events is not None else [
+        (START, 'ADAEUR', 1.00, 10.0), (START + 60, 'ADAEUR', 0.95, 10.0), (START + 120, 'ADAEUR', 1.10, 10.0),
+        (START, 'XBTEUR', 50000.0, 1.0),
+    ])
+    return PaperExchange(replay, **kwargs)
+
+class TestPaperExchange(unittest.TestCase):
+    def test_market_order_applies_fee_and_balances(self):
+        exchange = make_exchange(fee=0.01, spread=0.0)
+        self.assertEqual(exchange.get_market_price('ADAEUR'), 1.0)
+        exchange.execute_trade('ADAEUR', 100.0, 'buy')
+        balances = exchange.check_balance(['ADAEUR'])
+        self.assertAlmostEqual(balances['ADA'], 100.0)
+        self.assertAlmostEqual(exchange.get_cash_balance(), 10000.0 - 100.0 * 1.01)
+        exchange.sync_trades()
+        self.assertAlmostEqual(exchange.get_buy_price('ADAEUR'), 1.0)
+
+    def test_insufficient_funds_are_rejected(self):
+        exchange = make_exchange(balances={'ZEUR': 10.0})
+        with self.assertRaisesRegex(Exception, "EOrder:Insufficient funds"):
+            exchange.execute_trade('XBTEUR', 1.0, 'buy')
+        with self.assertRaisesRegex(Exception, "EOrder:Insufficient funds"):
+            exchange.execute_trade('ADAEUR', 1.0, 'sell')
+
+    def test_asset_metadata_keeps_non_fiat_z_assets(self):
+        exchange = make_exchange([(START, 'ZRXEUR', 0.3, 100.0)])
+        assets = exchange.backend.query_public('Assets')['result']
+        self.assertEqual({name: info['altname'] for name, info in assets.items()}, {'ZRX': 'ZRX', 'ZEUR': 'EUR'})
+        self.assertEqual(exchange.asset_pairs.pair_for_asset('ZRX'), 'ZRXEUR')
+
+    def test_large_market_order_walks_the_book(self):
+        exchange = make_exchange(spread=0.0, level_value=100.0)
+        estimate = exchange.estimate_fill('ADAEUR', 1000.0, 'buy')
+        self.assertGreater(estimate['slippage'], 0)
+        exchange.execute_trade('ADAEUR', 1000.0, 'buy')
+        trade = next(iter(exchange.backend.trades.values()))
+        self.assertGreater(float(trade['price']), 1.0)
+
+    def test_resting_limit_order_fills_on_replayed_trade(self):
+        exchange = make_exchange(fee=0.0)
+        result = exchange.execute_trades([{'pair': 'ADAEUR', 'side': 'buy', 'volume': 10.0, 'ordertype': 'limit', 'price': 0.96}])
+        self.assertTrue(result[0]['ok'])
+        self.assertEqual(len(exchange.backend.open_orders), 1)
+        exchange.run_replay(until=START + 60)
+        self.assertEqual(exchange.backend.open_orders, {})
+        self.assertAlmostEqual(exchange.get_cash_balance(), 10000.0 - 9.6)
+
+    def test_replay_drives_live_engine_with_market_time(self):
+        replay = MarketReplay.synthetic(['ADAEUR'], START, duration=6 * 3600, step=60, seed=1)
+        exchange = PaperExchange(replay)
+        engine = LiveSignalEngine(exchange, interval=60, clock=exchange.clock.time)
+        exchange.add_listener(engine.on_price)
+        self.assertEqual(exchange.run_replay(step=3600), 6 * 60)
+        self.assertAlmostEqual(exchange.clock.time(), replay.times[-1])
+        engine.stop()
+
+if __name__ == '__main__':
+    unittest.main()
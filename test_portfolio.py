@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from models import Portfolio
+
+class TestPortfolioJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.portfolio_file = os.path.join(self.directory.name, "portfolio.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_mutations_survive_restart_without_snapshot(self):
+        portfolio = Portfolio(self.portfolio_file)
+        portfolio.add_asset('BTC', 1.5)
+        portfolio.add_asset('ADA', 100.0)
+        portfolio.remove_asset('ADA', 100.0)
+        portfolio.add_asset('BTC', 0.5)
+        portfolio.close()
+        self.assertFalse(os.path.exists(self.portfolio_file))
+        self.assertEqual(Portfolio(self.portfolio_file).get_portfolio(), {'BTC': 2.0})
+
+    def test_torn_last_record_is_ignored(self):
+        portfolio = Portfolio(self.portfolio_file)
+        portfolio.add_asset('BTC', 1.0)
+        portfolio.close()
+        with open(portfolio.journal.journal_file, 'ab') as f:
+            f.write(b'{"asset": "BTC", "amo')  # Abbruch mitten im Schreiben
+        restored = Portfolio(self.portfolio_file)
+        self.assertEqual(restored.get_portfolio(), {'BTC': 1.0})
+        restored.add_asset('ETH', 2.0)
+        restored.close()
+        self.assertEqual(Portfolio(self.portfolio_file).get_portfolio(), {'BTC': 1.0, 'ETH': 2.0})
+
+    def test_corrupt_record_before_the_end_is_an_error(self):
+        portfolio = Portfolio(self.portfolio_file)
+        portfolio.add_asset('BTC', 1.0)
+        portfolio.close()
+        with open(portfolio.journal.journal_file, 'ab') as f:
+            f.write(b'{"asset": "BTC", "amo\n{"asset": "ETH", "amount": 2.0}\n')
+        with self.assertRaises(ValueError):
+            Portfolio(self.portfolio_file)
+
+    def test_timer_syncs_last_record(self):
+        portfolio = Portfolio(self.portfolio_file)
+        portfolio.journal.group_interval = 0.05
+        synced = threading.Event()
+        sync = portfolio.journal.sync
+        portfolio.journal.sync = lambda: (sync(), synced.set())
+        portfolio.journal.last_sync = time.monotonic()
+        portfolio.add_asset('BTC', 1.0)  # kein weiterer Eintrag, der fsync auslösen würde
+        self.assertTrue(synced.wait(2))
+        self.assertEqual(portfolio.journal.unsynced, 0)
+        portfolio.close()
+
+    def test_compaction_writes_plain_snapshot_and_replay_is_idempotent(self):
+        """
+        Testet, dass der Snapshot das bisherige Dateiformat hat und ein nach dem Snapshot noch vorhandenes
+        Journal (Abbruch vor dem Leeren) beim Laden keinen anderen Zustand ergibt.
+        """
+        portfolio = Portfolio(self.portfolio_file)
+        portfolio.add_asset('BTC', 1.0)
+        portfolio.add_asset('BTC', 1.0)
+        portfolio.clear_portfolio()
+        portfolio.add_asset('SOL', 3.0)
+        portfolio.journal.sync()
+        with open(portfolio.journal.journal_file, 'rb') as f:
+            journal = f.read()
+        portfolio.compact()
+        portfolio.close()
+        with open(self.portfolio_file) as f:
+            self.assertEqual(json.load(f), {'SOL': 3.0})
+        self.assertEqual(os.path.getsize(portfolio.journal.journal_file), 0)
+
+        with open(portfolio.journal.journal_file, 'wb') as f:
+            f.write(journal)
+        self.assertEqual(Portfolio(self.portfolio_file).get_portfolio(), {'SOL': 3.0})
+
+    def test_save_compacts_after_threshold(self):
+        portfolio = Portfolio(self.portfolio_file)
+        portfolio.journal.compact_every = 3
+        portfolio.add_asset('BTC', 1.0)
+        portfolio.save_portfolio()
+        self.assertFalse(os.path.exists(self.portfolio_file))
+        portfolio.add_asset('BTC', 1.0)
+        portfolio.add_asset('ETH', 1.0)
+        portfolio.save_portfolio()
+        portfolio.close()
+        with open(self.portfolio_file) as f:
+            self.assertEqual(json.load(f), {'BTC': 2.0, 'ETH': 1.0})
+
+    def test_records_past_threshold_compact_without_save(self):
+        portfolio = Portfolio(self.portfolio_file)
+        portfolio.journal.compact_every = 3
+        for amount in (1.0, 2.0, 3.0, 4.0):
+            portfolio.add_asset('BTC', amount)
+        with open(self.portfolio_file) as f:
+            self.assertEqual(json.load(f), {'BTC': 6.0})  # Snapshot nach dem dritten Eintrag
+        with open(portfolio.journal.journal_file) as f:
+            self.assertEqual([json.loads(line) for line in f], [{'asset': 'BTC', 'amount': 10.0}])
+        portfolio.close()
+        self.assertEqual(Portfolio(self.portfolio_file).get_portfolio(), {'BTC': 10.0})
+
+if __name__ == '__main__':
+    unittest.main()
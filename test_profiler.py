@@ -0,0 +1,49 @@
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+from profiler import SamplingProfiler
+
+def busy_loop(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_samples_all_threads_and_writes_collapsed_and_pstats(self):
+        stop_event = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop_event,), name="busy-worker")
+        worker.start()
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = SamplingProfiler(interval=0.002, duration=None, output_dir=directory)
+            try:
+                self.assertTrue(profiler.start())
+                self.assertFalse(profiler.start())
+                time.sleep(0.2)
+                collapsed_file, pstats_file = profiler.stop()
+            finally:
+                stop_event.set()
+                worker.join()
+            self.assertFalse(profiler.running)
+            with open(collapsed_file, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            busy = [line for line in lines if line.startswith("busy-worker;") and "busy_loop (test_profiler.py:" in line]
+            self.assertTrue(busy)
+            self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+            stats = pstats.Stats(pstats_file)
+            functions = {name for _, _, name in stats.stats}
+            self.assertIn('busy_loop', functions)
+            self.assertGreater(stats.total_tt, 0)
+
+    def test_duration_stops_automatically(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = SamplingProfiler(interval=0.001, duration=0.05, output_dir=directory)
+            profiler.start()
+            deadline = time.monotonic() + 5
+            while profiler.running and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertFalse(profiler.running)
+            self.assertIsNotNone(profiler.last_files)
+
+if __name__ == '__main__':
+    unittest.main()
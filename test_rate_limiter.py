@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+from rate_limiter import RateLimitScheduler, RateLimitBudgetExceeded, PRIORITY_ORDER, PRIORITY_REFRESH, PRIORITY_BACKGROUND
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestRateLimitScheduler(unittest.TestCase):
+    def test_endpoint_costs_and_decay(self):
+        """
+        Testet die Kosten je Endpunkt und den zeitlichen Abbau des Zählers.
+        """
+        clock = FakeClock()
+        scheduler = RateLimitScheduler(clock=clock)
+        scheduler.acquire('TradesHistory')
+        scheduler.acquire('Balance')
+        scheduler.acquire('AddOrder', PRIORITY_ORDER)
+        self.assertEqual(scheduler.get_budget(), (12.0, 15))
+        clock.now = 3.0
+        self.assertAlmostEqual(scheduler.get_budget()[0], 12.99)
+
+    def test_reserve_is_kept_for_orders(self):
+        """
+        Testet, dass nachrangige Anfragen bei knappem Budget verworfen werden, Aufträge aber die Reserve nutzen.
+        """
+        scheduler = RateLimitScheduler(clock=FakeClock(), max_wait=1.0)
+        scheduler.buckets['private'].tokens = 2.0
+        with self.assertRaises(RateLimitBudgetExceeded):
+            scheduler.acquire('Balance', PRIORITY_BACKGROUND)
+        with self.assertRaises(RateLimitBudgetExceeded):
+            scheduler.acquire('Balance', PRIORITY_REFRESH)
+        scheduler.acquire('QueryOrders', PRIORITY_ORDER)
+        self.assertEqual(scheduler.get_budget()[0], 1.0)
+        self.assertEqual(scheduler.dropped, 2)
+
+    def test_identical_refresh_calls_are_coalesced(self):
+        """
+        Testet, dass gleichzeitige identische Aktualisierungsanfragen nur einmal gesendet werden.
+        """
+        scheduler = RateLimitScheduler()
+        started = threading.Event()
+        calls = []
+        def fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return {'error': [], 'result': {'ZEUR': '1.0'}}
+        results = []
+        first = threading.Thread(target=lambda: results.append(scheduler.call('Balance', fetch)))
+        first.start()
+        started.wait(1)
+        results.append(scheduler.call('Balance', fetch))
+        first.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0], results[1])
+
+if __name__ == '__main__':
+    unittest.main()
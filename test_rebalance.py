@@ -0,0 +1,46 @@
+import unittest
+from rebalance import plan_rebalance, execute_rebalance
+
+class FakeBatchClient:
+    def __init__(self, fail_pairs=()):
+        self.fail_pairs = set(fail_pairs)
+        self.batches = []
+
+    def execute_trades(self, orders):
+        self.batches.append([order['pair'] for order in orders])
+        return [dict(order, ok=order['pair'] not in self.fail_pairs, txid=None, error=None) for order in orders]
+
+class TestRebalance(unittest.TestCase):
+    def test_plan_sells_first_and_skips_small_differences(self):
+        holdings = {'ADAEUR': 2000.0, 'SOLEUR': 1.0, 'DOTEUR': 100.0}
+        prices = {'ADAEUR': 0.5, 'SOLEUR': 100.0, 'DOTEUR': 4.25}
+        weights = {'ADAEUR': 0.25, 'SOLEUR': 0.25, 'DOTEUR': 0.25, 'XRPEUR': 0.25}
+        prices['XRPEUR'] = 0.5
+        orders = plan_rebalance(holdings, prices, weights, cash=198.0, fee=0.0, min_order_value=10.0)
+        total = 198.0 + 1000.0 + 100.0 + 425.0
+        self.assertEqual([order['side'] for order in orders], ['sell', 'buy', 'buy'])
+        self.assertEqual([order['pair'] for order in orders], ['ADAEUR', 'SOLEUR', 'XRPEUR'])
+        self.assertAlmostEqual(orders[0]['volume'], (1000.0 - total / 4) / 0.5)
+        self.assertAlmostEqual(orders[2]['volume'], total / 4 / 0.5)
+
+    def test_buys_are_scaled_to_available_cash(self):
+        orders = plan_rebalance({}, {'ADAEUR': 1.0, 'SOLEUR': 1.0}, {'ADAEUR': 0.5, 'SOLEUR': 0.5}, cash=100.0, fee=0.01)
+        self.assertAlmostEqual(sum(order['value'] for order in orders) * 1.01, 100.0)
+        with self.assertRaises(ValueError):
+            plan_rebalance({}, {}, {'ADAEUR': 0.8, 'SOLEUR': 0.8}, cash=100.0)
+
+    def test_execute_in_two_round_trips(self):
+        orders = [{'pair': 'ADAEUR', 'side': 'sell', 'volume': 1.0}, {'pair': 'SOLEUR', 'side': 'buy', 'volume': 1.0},
+                  {'pair': 'DOTEUR', 'side': 'buy', 'volume': 1.0}]
+        client = FakeBatchClient()
+        results = execute_rebalance(client, orders)
+        self.assertEqual(client.batches, [['ADAEUR'], ['SOLEUR', 'DOTEUR']])
+        self.assertTrue(all(leg['ok'] for leg in results))
+
+        failing = FakeBatchClient(fail_pairs={'ADAEUR'})
+        results = execute_rebalance(failing, orders)
+        self.assertEqual(failing.batches, [['ADAEUR']])
+        self.assertEqual([leg['ok'] for leg in results], [False, False, False])
+
+if __name__ == '__main__':
+    unittest.main()
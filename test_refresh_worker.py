@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+from refresh_worker import MAX_REFRESH_WORKERS, RefreshWorker
+
+class FakeRoot:
+    """
+    Ersetzt das Tk-Hauptfenster; geplante Callbacks werden nur gemerkt und im Test von Hand ausgeführt.
+    """
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+    def after_cancel(self, job):
+        pass
+
+class TestRefreshWorker(unittest.TestCase):
+    def test_skips_overlapping_refresh_and_delivers_on_drain(self):
+        """
+        Testet, dass ein zweiter Abruf während eines laufenden übersprungen und das Ergebnis über die Queue zugestellt wird.
+        """
+        release = threading.Event()
+        results = []
+        def fetch(executor):
+            release.wait(5)
+            return executor.submit(lambda: "rows").result()
+        root = FakeRoot()
+        worker = RefreshWorker(root, fetch, results.append, max_workers=2)
+        self.assertTrue(worker.request_refresh())
+        self.assertFalse(worker.request_refresh())
+        release.set()
+        for _ in range(100):
+            if not worker.is_busy():
+                break
+            time.sleep(0.01)
+        root.scheduled.pop(0)()
+        self.assertEqual(results, ["rows"])
+        self.assertTrue(worker.request_refresh())
+        worker.shutdown()
+
+    def test_resize_during_refresh_keeps_old_pool_until_done(self):
+        """
+        Testet, dass ein laufender Abruf nach set_max_workers noch Aufgaben an den alten Pool übergeben kann.
+        """
+        started, release = threading.Event(), threading.Event()
+        results = []
+        def fetch(executor):
+            started.set()
+            release.wait(5)
+            return executor.submit(lambda: "rows").result()
+        root = FakeRoot()
+        worker = RefreshWorker(root, fetch, results.append, max_workers=2)
+        old_executor = worker.executor
+        worker.request_refresh()
+        started.wait(5)
+        worker.set_max_workers(1)
+        release.set()
+        for _ in range(100):
+            if not worker.is_busy():
+                break
+            time.sleep(0.01)
+        root.scheduled.pop(0)()
+        self.assertEqual(results, ["rows"])
+        self.assertTrue(old_executor._shutdown)
+        worker.shutdown()
+
+    def test_larger_parallelism_is_clamped_with_warning(self):
+        worker = RefreshWorker(FakeRoot(), lambda executor: None, lambda rows: None, max_workers=1)
+        with self.assertLogs(level='WARNING') as logs:
+            worker.set_max_workers(8)
+        self.assertEqual(worker.max_workers, MAX_REFRESH_WORKERS)
+        self.assertIn("exceeds", logs.output[0])
+        worker.executor.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
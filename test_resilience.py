@@ -0,0 +1,125 @@
+import threading
+import time
+import unittest
+from rate_limiter import RateLimitBudgetExceeded
+from resilience import CircuitOpenError, ResilientCaller
+from test_api_client import FakeKrakenAPI, make_client
+
+OK = {'error': [], 'result': {'value': 1}}
+BUSY = {'error': ['EService:Busy'], 'result': {}}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def make_caller(clock, **kwargs):
+    return ResilientCaller(clock=clock, sleep=clock.sleep, jitter=lambda: 1.0, **kwargs)
+
+class TestResilientCaller(unittest.TestCase):
+    def test_public_calls_retry_with_backoff_within_deadline(self):
+        clock = FakeClock()
+        caller = make_caller(clock, public_deadline=10.0)
+        responses = [ConnectionError("reset"), BUSY, OK]
+        timeouts = []
+        def attempt(timeout):
+            timeouts.append(timeout)
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        self.assertEqual(caller.run('Ticker', attempt, {'pair': 'XBTEUR'}, public=True), OK)
+        self.assertEqual(timeouts, [10.0, 9.75, 9.25])
+        self.assertEqual(caller.breaker('Ticker').state, 'closed')
+
+    def test_private_calls_are_not_retried(self):
+        caller = make_caller(FakeClock())
+        calls = []
+        def attempt(timeout):
+            calls.append(timeout)
+            raise TimeoutError("read timeout")
+        with self.assertRaises(TimeoutError):
+            caller.run('AddOrder', attempt)
+        self.assertEqual(len(calls), 1)
+
+    def test_open_circuit_serves_last_known_value(self):
+        clock = FakeClock()
+        caller = make_caller(clock, failure_threshold=2, reset_timeout=30.0, max_retries=0)
+        params = {'pair': 'XBTEUR'}
+        self.assertEqual(caller.run('Ticker', lambda timeout: OK, params, public=True), OK)
+        self.assertEqual(caller.run('Ticker', lambda timeout: BUSY, params, public=True), BUSY)
+        self.assertEqual(caller.run('Ticker', lambda timeout: BUSY, params, public=True), OK)
+        self.assertEqual(caller.breaker('Ticker').state, 'open')
+        self.assertEqual(caller.guard('Ticker', params, public=True), OK)
+        with self.assertRaises(CircuitOpenError):
+            caller.guard('Ticker', {'pair': 'ETHEUR'}, public=True)
+        clock.now += 30.0
+        self.assertIsNone(caller.guard('Ticker', params, public=True))
+        self.assertEqual(caller.guard('Ticker', params, public=True), OK)  # only one trial call while half open
+        caller.run('Ticker', lambda timeout: OK, params, public=True)
+        self.assertEqual(caller.breaker('Ticker').state, 'closed')
+
+    def test_stale_cache_is_not_served(self):
+        clock = FakeClock()
+        caller = make_caller(clock, failure_threshold=1, reset_timeout=300.0, max_retries=0, max_stale=60.0)
+        caller.run('Balance', lambda timeout: OK)
+        self.assertEqual(caller.run('Balance', lambda timeout: BUSY), OK)
+        with self.assertRaises(CircuitOpenError):
+            caller.guard('Balance', allow_stale=False)  # Orderplanung erhält keine zwischengespeicherte Antwort
+        self.assertEqual(caller.guard('Balance'), OK)
+        clock.now += 61.0
+        with self.assertRaises(CircuitOpenError):
+            caller.guard('Balance')
+
+    def test_slow_public_call_is_hedged(self):
+        caller = ResilientCaller(hedge_after=0.05)
+        release = threading.Event()
+        attempts = []
+        def attempt(timeout):
+            attempts.append(timeout)
+            if len(attempts) == 1:
+                release.wait(2)
+                return {'error': [], 'result': 'slow'}
+            return {'error': [], 'result': 'fast'}
+        acquired = []
+        start = time.monotonic()
+        response = caller.run('Ticker', attempt, public=True, before_retry=lambda: acquired.append('Ticker'))
+        release.set()
+        self.assertEqual(response['result'], 'fast')
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(acquired, ['Ticker'])  # der Hedge-Versuch holt eigenes Budget
+        caller.executor.shutdown()
+
+    def test_hedge_is_skipped_without_budget(self):
+        caller = ResilientCaller(hedge_after=0.02)
+        attempts = []
+        def attempt(timeout):
+            attempts.append(timeout)
+            time.sleep(0.1)
+            return OK
+        def no_budget():
+            raise RateLimitBudgetExceeded("Dropped Ticker call, rate limit budget too low.")
+        self.assertEqual(caller.run('Ticker', attempt, public=True, before_retry=no_budget), OK)
+        self.assertEqual(len(attempts), 1)
+        caller.executor.shutdown()
+
+    def test_client_retries_public_calls_through_scheduler(self):
+        responses = [ConnectionError("reset"), {'error': [], 'result': {'XXBTZEUR': {'c': ['90000.0', '1']}}}]
+        def ticker(data):
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        api = FakeKrakenAPI(public={'Ticker': ticker, 'AssetPairs': {'error': ['EGeneral:Unknown method']}})
+        client = make_client(api)
+        client.resilience = ResilientCaller(sleep=lambda seconds: None)
+        self.assertEqual(client.get_market_price('XBTEUR'), 90000.0)
+        self.assertEqual([method for method, _ in api.calls].count('Ticker'), 2)
+
+if __name__ == '__main__':
+    unittest.main()
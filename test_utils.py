@@ -0,0 +1,95 @@
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+import unittest
+from utils import TextWidgetHandler, parse_module_levels, setup_logging
+
+class FakeTextWidget:
+    """
+    Ersetzt das tkinter Text-Widget (ohne Display); der Inhalt wird als Zeilenliste gehalten.
+    """
+    def __init__(self):
+        self.lines = []
+        self.jobs = []
+
+    def after(self, delay, callback):
+        self.jobs.append(callback)
+        return len(self.jobs)
+
+    def after_cancel(self, job):
+        pass
+
+    def insert(self, index, text):
+        self.lines.extend(text.splitlines())
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+class TestTextWidgetHandler(unittest.TestCase):
+    def test_batches_records_from_threads_into_bounded_console(self):
+        """
+        Testet, dass Einträge aus Fremd-Threads gesammelt geschrieben werden und die Konsole begrenzt bleibt.
+        """
+        widget = FakeTextWidget()
+        handler = TextWidgetHandler(widget, max_lines=5, level=logging.INFO)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger("test_utils.console")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        try:
+            worker = threading.Thread(target=lambda: [logger.info(f"line {i}") for i in range(8)])
+            worker.start()
+            worker.join()
+            logger.debug("suppressed")
+            self.assertEqual(widget.lines, [])
+            widget.jobs.pop(0)()
+            self.assertEqual(widget.lines, [f"line {i}" for i in range(3, 8)])
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+class TestSetupLogging(unittest.TestCase):
+    def test_rotates_compressed_json_lines_with_module_levels(self):
+        """
+        Testet die Ausgabe über den Listener-Thread als JSON-Zeilen, die gzip-Rotation und die Modul-Stufen.
+        """
+        root_logger = logging.getLogger()
+        old_handlers, old_level = list(root_logger.handlers), root_logger.level
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = os.path.join(directory, "bot.log")
+            listener = setup_logging(log_file, max_bytes=300, backup_count=2, json_lines=True, compress=True,
+                                     module_levels={'test_utils.quiet': logging.WARNING})
+            try:
+                for i in range(10):
+                    logging.getLogger("test_utils.loud").info(f"message {i}")
+                logging.getLogger("test_utils.quiet").info("suppressed")
+            finally:
+                listener.stop()
+                for handler in listener.handlers:
+                    handler.close()
+                root_logger.handlers[:] = old_handlers
+                root_logger.setLevel(old_level)
+            self.assertTrue(os.path.exists(log_file + ".1.gz"))
+            with gzip.open(log_file + ".1.gz", "rt", encoding="utf-8") as f:
+                entry = json.loads(f.readline())
+            self.assertEqual(entry['logger'], "test_utils.loud")
+            with open(log_file, encoding="utf-8") as f:
+                self.assertNotIn("suppressed", f.read())
+
+    def test_invalid_module_levels_are_skipped(self):
+        with self.assertLogs('utils', level=logging.WARNING):  # über den Modul-Logger, per Modul-Stufe steuerbar
+            levels = parse_module_levels("api_client=debug, foo=VERBOSE, =INFO, urllib3=30")
+        self.assertEqual(levels, {'api_client': logging.DEBUG, 'urllib3': 30})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,44 +1,255 @@
-﻿import logging
-import tkinter as tk
+﻿import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Standard-Log-Stufen je Modul: laute Bibliotheken und große Antworten bleiben standardmäßig aus
+DEFAULT_MODULE_LEVELS = {
+    'api_client': logging.INFO,
+    'urllib3': logging.WARNING,
+    'websockets': logging.WARNING,
+    'asyncio': logging.WARNING,
+}
 
 class TextWidgetHandler(logging.Handler):
     """
     Ein benutzerdefinierter Logging-Handler, der Log-Nachrichten in ein tkinter Text-Widget schreibt.
+
+    emit() legt die Log-Einträge nur in einen Ringpuffer und darf aus beliebigen Threads aufgerufen werden.
+    Formatiert und in das Widget geschrieben wird gesammelt per after-Timer im Tk-Thread; das Widget
+    behält höchstens max_lines Zeilen.
     """
-    def __init__(self, text_widget: tk.Text):
+    def __init__(self, text_widget: 'tkinter.Text', max_lines: int = 1000, batch_size: int = 200,
+                 poll_interval: int = 100, level: int = logging.NOTSET):
         """
         Initialisiert den Handler mit dem angegebenen Text-Widget.
 
         :param text_widget: Das tkinter Text-Widget, in das die Log-Nachrichten geschrieben werden sollen.
+        :param max_lines: Die maximale Anzahl Zeilen im Widget; ältere Zeilen werden entfernt.
+        :param batch_size: Die maximale Anzahl Einträge, die pro Timer-Durchlauf geschrieben werden.
+        :param poll_interval: Das Intervall in Millisekunden, in dem der Puffer geleert wird.
+        :param level: Die Mindeststufe; niedrigere Einträge werden vor dem Formatieren verworfen.
         """
-        super().__init__()
+        super().__init__(level)
         self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.records = deque(maxlen=max_lines)
+        self._drain_job = self.text_widget.after(self.poll_interval, self.drain)
+
+    def handle(self, record):
+        """
+        Filtert den Log-Eintrag und legt ihn ohne Sperre und ohne Formatierung in den Puffer.
 
+        :param record: Das LogRecord-Objekt, das die Log-Nachricht enthält.
+        """
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    @timed('text_widget_emit')
     def emit(self, record):
         """
-        Schreibt die Log-Nachricht in das Text-Widget.
+        Legt die Log-Nachricht in den Puffer (thread-sicher).
 
         :param record: Das LogRecord-Objekt, das die Log-Nachricht enthält.
         """
+        self.records.append(record)
+
+    @timed('text_widget_drain')
+    def drain(self):
+        """
+        Schreibt die gepufferten Log-Nachrichten gesammelt in das Text-Widget (läuft im Tk-Thread).
+        """
+        import tkinter as tk
+        lines = []
+        try:
+            while len(lines) < self.batch_size:
+                record = self.records.popleft()
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+        except IndexError:
+            pass
         try:
-            msg = self.format(record)
-            self.text_widget.insert(tk.END, msg + "\n")
-            self.text_widget.see(tk.END)  # Scrollt zum Ende des Text-Widgets
-        except Exception:
-            self.handleError(record)
+            if lines:
+                self.text_widget.insert(tk.END, "\n".join(lines) + "\n")
+                line_count = int(self.text_widget.index("end-1c").split(".")[0]) - 1
+                if line_count > self.max_lines:
+                    self.text_widget.delete("1.0", f"{line_count - self.max_lines + 1}.0")
+                self.text_widget.see(tk.END)  # Scrollt zum Ende des Text-Widgets
+        except tk.TclError:
+            return  # Widget wurde zerstört
+        self._drain_job = self.text_widget.after(1 if self.records else self.poll_interval, self.drain)
+
+    def close(self):
+        """
+        Beendet den Timer und schließt den Handler.
+        """
+        if self._drain_job is not None:
+            import tkinter as tk
+            try:
+                self.text_widget.after_cancel(self._drain_job)
+            except tk.TclError:
+                pass
+            self._drain_job = None
+        super().close()
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formatiert Log-Einträge als eine JSON-Zeile pro Eintrag.
+    """
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def _gzip_rotator(source: str, dest: str):
+    """
+    Komprimiert eine rotierte Log-Datei mit gzip und entfernt das Original.
+    """
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
 
-def setup_logging():
+def parse_module_levels(spec: str) -> Dict[str, int]:
+    """
+    Liest Modul-Log-Stufen aus einer Zeichenkette wie 'api_client=DEBUG,urllib3=WARNING'. Ungültige
+    Einträge (unbekannte Stufe, fehlender Name) werden protokolliert und übersprungen.
+
+    :param spec: Die Zeichenkette mit kommagetrennten Zuweisungen.
+    :return: Ein Dictionary Logger-Name -> Log-Stufe.
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        level = level.strip().upper()
+        # getLevelName liefert für unbekannte Namen den String 'Level X' statt einer Zahl
+        value = int(level) if level.isdigit() else logging.getLevelName(level)
+        if not name.strip() or not isinstance(value, int):
+            logger.warning("Ignoring invalid log level setting '%s'.", item)
+            continue
+        levels[name.strip()] = value
+    return levels
+
+def setup_logging(log_file: str = "kraken_bot.log", level: int = logging.INFO, max_bytes: int = 5 * 1024 * 1024,
+                  backup_count: int = 5, when: Optional[str] = None, json_lines: bool = False, compress: bool = False,
+                  module_levels: Optional[Dict[str, int]] = None) -> QueueListener:
     """
     Konfiguriert das Logging-System mit einem Datei-Handler und einem Stream-Handler.
+
+    Die Handler laufen in einem eigenen Listener-Thread; die aufrufenden Threads legen die Einträge nur
+    in eine Queue. Die Log-Datei wird nach Größe (max_bytes) oder Zeit (when) rotiert.
+
+    :param log_file: Der Pfad zur Log-Datei.
+    :param level: Die Stufe des Root-Loggers.
+    :param max_bytes: Die maximale Dateigröße vor der Rotation (nur ohne 'when').
+    :param backup_count: Die Anzahl aufbewahrter rotierter Dateien.
+    :param when: Zeitbasierte Rotation, z. B. 'midnight' oder 'H' (siehe TimedRotatingFileHandler).
+    :param json_lines: True, um die Datei im JSON-Lines-Format zu schreiben.
+    :param compress: True, um rotierte Dateien mit gzip zu komprimieren.
+    :param module_levels: Log-Stufen je Modul; ergänzt DEFAULT_MODULE_LEVELS und die Umgebungsvariable KRAKEN_BOT_LOG_LEVELS.
+    :return: Der gestartete QueueListener (wird beim Beenden automatisch gestoppt).
+    """
+    if when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(log_file, when=when, backupCount=backup_count, encoding="utf-8")
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    if compress:
+        file_handler.namer = lambda name: name + ".gz"
+        file_handler.rotator = _gzip_rotator
+    file_handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
+    stream_handler = logging.StreamHandler()  # Log-Nachrichten in die Konsole schreiben
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(QueueHandler(log_queue))
+
+    levels = dict(DEFAULT_MODULE_LEVELS)
+    levels.update(parse_module_levels(os.environ.get("KRAKEN_BOT_LOG_LEVELS", "")))
+    levels.update(module_levels or {})
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+def _stop_listener(listener: QueueListener):
+    """
+    Stoppt den Listener beim Beenden, sofern er nicht bereits gestoppt wurde, und schreibt die Queue leer.
+    """
+    if getattr(listener, '_thread', None) is not None:
+        listener.stop()
+
+def resident_memory_mb() -> Optional[float]:
+    """
+    Gibt den aktuell belegten Arbeitsspeicher (RSS) des Prozesses in MB zurück.
+
+    Unter Linux wird /proc/self/status gelesen; sonst dient der Spitzenwert aus resource.getrusage als Näherung.
+
+    :return: Der Speicherverbrauch in MB oder None, falls er nicht ermittelt werden kann (z. B. unter Windows).
+    """
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def log_startup_report(mode: str, started: float) -> Dict[str, object]:
+    """
+    Protokolliert Startzeit und Speicherverbrauch, um GUI- und Headless-Modus vergleichen zu können.
+
+    :param mode: Der Betriebsmodus (z. B. 'gui' oder 'headless').
+    :param started: Der Startzeitpunkt (time.perf_counter()).
+    :return: Die Kennzahlen (Modus, Startzeit in ms, RSS in MB, geladene Module, GUI-Module geladen).
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler("kraken_bot.log"),  # Log-Nachrichten in eine Datei schreiben
-            logging.StreamHandler()  # Log-Nachrichten in die Konsole schreiben
-        ]
-    )
+    report = {
+        'mode': mode,
+        'startup_ms': (time.perf_counter() - started) * 1000,
+        'rss_mb': resident_memory_mb(),
+        'modules': len(sys.modules),
+        'gui_loaded': any(name in sys.modules for name in ('tkinter', 'pystray', 'PIL')),
+    }
+    rss = f"{report['rss_mb']:.1f} MB" if report['rss_mb'] is not None else "unknown"
+    logger.info("Started in %s mode after %.0f ms, resident memory %s, %s modules loaded, GUI modules loaded: %s.",
+                mode, report['startup_ms'], rss, report['modules'], report['gui_loaded'])
+    return report
 
 def get_api_credentials():
     """
@@ -0,0 +1,79 @@
+﻿import numpy as np
+from typing import Dict
+
+def sma(close: np.ndarray, period: int) -> np.ndarray:
+    """
+    Berechnet den einfachen gleitenden Durchschnitt über die gesamte Zeitreihe.
+
+    :param close: Die Schlusskurse.
+    :param period: Die Periode des Durchschnitts.
+    :return: Ein Array gleicher Länge; die ersten period - 1 Werte sind NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    result = np.full(close.shape, np.nan)
+    if len(close) >= period:
+        cumsum = np.cumsum(np.insert(close, 0, 0.0))
+        result[period - 1:] = (cumsum[period:] - cumsum[:-period]) / period
+    return result
+
+def sma_signals(close: np.ndarray, period: int, threshold: float = 0.0) -> np.ndarray:
+    """
+    Berechnet die Signale von MyStrategy: +1 (Kauf), wenn der SMA um mehr als threshold über dem
+    Schlusskurs liegt, -1 (Verkauf), wenn er um mehr als threshold darunter liegt, sonst 0.
+
+    :param close: Die Schlusskurse.
+    :param period: Die Periode des SMA.
+    :param threshold: Der relative Abstand zwischen SMA und Schlusskurs (z. B. 0.01 für 1 %).
+    :return: Ein int8-Array mit den Signalen je Bar.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    average = sma(close, period)
+    signals = np.zeros(len(average), dtype=np.int8)
+    signals[average > close * (1 + threshold)] = 1
+    signals[average < close * (1 - threshold)] = -1
+    return signals
+
+def run_vectorized_backtest(open_: np.ndarray, close: np.ndarray, period: int = 15, fee: float = 0.0026,
+                            stake: float = 1.0, cash: float = 10000.0, threshold: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Führt das Backtesting von MyStrategy als Array-Operationen über die gesamte Zeitreihe aus.
+
+    Wie bei backtrader wird ein Signal am Ende von Bar t zum Eröffnungskurs von Bar t + 1 ausgeführt;
+    ein Signal im letzten Bar wird nicht mehr ausgeführt. Die Gebühr ist prozentual auf den
+    Ordervolumenwert (wie KrakenBotGUI.trading_fee). Barmittel werden nicht begrenzt, d. h. es gibt
+    keine abgelehnten Orders.
+
+    :param open_: Die Eröffnungskurse.
+    :param close: Die Schlusskurse.
+    :param period: Die Periode des SMA.
+    :param fee: Die Handelsgebühr (z. B. 0.0026 für 0,26 %).
+    :param stake: Die Stückzahl pro Order.
+    :param cash: Das Startkapital.
+    :param threshold: Der relative Abstand zwischen SMA und Schlusskurs für ein Signal.
+    :return: Ein Dictionary mit 'fill_bars', 'fill_sizes', 'fill_prices', 'commissions', 'position',
+             'cash' und 'equity' (die letzten drei je Bar).
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    signals = sma_signals(close, period, threshold)
+    order_bars = np.flatnonzero(signals[:-1])
+    fill_bars = order_bars + 1
+    fill_sizes = signals[order_bars].astype(np.float64) * stake
+    fill_prices = open_[fill_bars]
+    commissions = np.abs(fill_sizes) * fill_prices * fee
+
+    position_change = np.zeros(len(close))
+    cash_change = np.zeros(len(close))
+    np.add.at(position_change, fill_bars, fill_sizes)
+    np.add.at(cash_change, fill_bars, -(fill_sizes * fill_prices) - commissions)
+    position = np.cumsum(position_change)
+    cash_curve = cash + np.cumsum(cash_change)
+    return {
+        'fill_bars': fill_bars,
+        'fill_sizes': fill_sizes,
+        'fill_prices': fill_prices,
+        'commissions': commissions,
+        'position': position,
+        'cash': cash_curve,
+        'equity': cash_curve + position * close,
+    }